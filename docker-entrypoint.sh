@@ -0,0 +1,38 @@
+#!/bin/sh
+# Inicio del contenedor: gunicorn con workers ASGI (uvicorn) o WSGI síncronos
+set -e
+
+SERVER_MODE="${SERVER_MODE:-asgi}"
+WORKERS="${GUNICORN_WORKERS:-3}"
+# Timeout amplio: subidas y descargas de adjuntos de varios GB
+TIMEOUT="${GUNICORN_TIMEOUT:-3600}"
+
+# Configuración inválida (p. ej. cache por proceso con varios workers): no arrancar
+python manage.py check --deploy
+
+# Cache en la base: la tabla se crea una vez (no hace nada si ya existe o si
+# el backend no es 'db')
+python manage.py createcachetable
+
+# Métricas multiproceso: directorio vacío en cada arranque del contenedor
+if [ -n "$METRICS_DIR" ]; then
+    rm -rf "$METRICS_DIR"
+    mkdir -p "$METRICS_DIR"
+fi
+
+case "$SERVER_MODE" in
+    asgi)
+        # Cada worker atiende muchos requests a la vez en un event loop;
+        # las vistas síncronas corren en hilos
+        exec gunicorn --bind 0.0.0.0:8000 --workers "$WORKERS" --timeout "$TIMEOUT" \
+            --worker-class uvicorn_worker.UvicornWorker sigmaops.asgi:application
+        ;;
+    wsgi)
+        exec gunicorn --bind 0.0.0.0:8000 --workers "$WORKERS" --timeout "$TIMEOUT" \
+            sigmaops.wsgi:application
+        ;;
+    *)
+        echo "SERVER_MODE inválido: $SERVER_MODE (asgi | wsgi)" >&2
+        exit 1
+        ;;
+esac
@@ -35,11 +35,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'tickets.middleware.EstaticosMiddleware',  # WhiteNoise (síncrono y async)
+    'tickets.middleware.InstrumentacionMiddleware',  # Métricas por vista (/metrics)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tickets.middleware.LecturasMiddleware',  # Réplicas de lectura
     'tickets.middleware.RolMiddleware',  # Middleware de roles
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -63,6 +65,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'sigmaops.wsgi.application'
+ASGI_APPLICATION = 'sigmaops.asgi.application'
 
 # Database - MariaDB/MySQL
 DATABASES = {
@@ -80,6 +83,123 @@ DATABASES = {
     }
 }
 
+# Base local SQLite para desarrollo, datos sintéticos y benchmarks
+# (DB_ENGINE=sqlite; las tablas se crean con generar_datos --crear-tablas)
+if os.getenv('DB_ENGINE', 'mysql') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f"{os.getenv('DB_NAME', 'claro_sigmaops')}.sqlite3",
+    }
+
+# Pool de conexiones a MariaDB por worker (tickets/pool.py): las conexiones se
+# reutilizan entre requests, con ping previo y reciclo por antigüedad.
+# DB_POOL_SIZE=0 vuelve al backend de Django (una conexión nueva por request)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+if DB_POOL_SIZE > 0 and DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    DATABASES['default']['ENGINE'] = 'tickets.backends.mysql'
+    DATABASES['default']['POOL'] = {
+        'SIZE': DB_POOL_SIZE,
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'RECYCLE': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+        'PRE_PING': os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true',
+    }
+
+# Réplicas de lectura (tickets/routers.py): hosts separados por coma (host o
+# host:puerto) o, con DB_ENGINE=sqlite, nombres de base. Solo las vistas de
+# lectura las usan; tras una escritura la sesión lee de la primaria
+DB_REPLICAS = [r.strip() for r in os.getenv('DB_REPLICAS', '').split(',') if r.strip()]
+for numero, replica in enumerate(DB_REPLICAS, 1):
+    DATABASES[f'replica_{numero}'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[f'replica_{numero}']['NAME'] = BASE_DIR / f'{replica}.sqlite3'
+    else:
+        host, _, puerto = replica.partition(':')
+        DATABASES[f'replica_{numero}'].update(HOST=host, PORT=puerto or DATABASES['default']['PORT'])
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['tickets.routers.ReplicaRouter']
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '10'))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))
+
+# Cache de Django: versiones de tickets y catálogos, snapshot del dashboard y
+# fragmentos HTML. 'locmem' (por proceso) o 'file' para desarrollo; en
+# producción una cache compartida por todos los workers y pods para que las
+# invalidaciones lleguen a todos: 'db' (tabla CACHE_LOCATION, la crea el
+# entrypoint con createcachetable) o 'redis' (CACHE_LOCATION redis://host:6379/0).
+# Sin DEBUG el default es 'db'; 'manage.py check --deploy' falla con 'locmem' y varios workers
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem' if DEBUG else 'db')
+# Workers por pod (los mismos que arranca el entrypoint), para las comprobaciones
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', '3'))
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'sigmaops'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'sigmaops_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/0'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION') or CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': 'sigmaops',
+    }
+}
+if CACHE_BACKEND != 'redis':
+    # Filas y secciones por ticket: el default de Django (300) se llena enseguida
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '20000'))}
+
+# Snapshot de estadísticas del dashboard (segundos)
+DASHBOARD_STATS_TTL = int(os.getenv('DASHBOARD_STATS_TTL', '300'))
+
+# Listado de tickets: paginación 'cursor' (keyset) u 'offset', y TTL del conteo
+TICKET_LIST_PAGINATION = os.getenv('TICKET_LIST_PAGINATION', 'cursor')
+TICKET_LIST_COUNT_TTL = int(os.getenv('TICKET_LIST_COUNT_TTL', '60'))
+
+# Vistas async (dashboard, listado): consultas independientes en hilos paralelos,
+# cada uno con su conexión. Solo con conexiones baratas (pool, CONN_MAX_AGE o
+# SQLite): con DB_POOL_SIZE=0 se ejecutan en serie. Cada request toma hasta una
+# conexión del pool por consulta paralela: dimensionar DB_POOL_SIZE en consecuencia
+ASYNC_PARALLEL_QUERIES = os.getenv('ASYNC_PARALLEL_QUERIES', 'True').lower() == 'true'
+
+# Cache de roles por proceso en RolMiddleware (segundos / entradas)
+ROL_CACHE_TTL = int(os.getenv('ROL_CACHE_TTL', '60'))
+ROL_CACHE_SIZE = int(os.getenv('ROL_CACHE_SIZE', '1024'))
+
+# Secciones cacheadas del detalle de ticket (segundos; la versión del
+# ticket invalida antes de vencer)
+TICKET_FRAGMENT_TTL = int(os.getenv('TICKET_FRAGMENT_TTL', '600'))
+
+# Pronóstico de SLA (evaluar_sla): días de historial de SLA cerrados y
+# probabilidades de incumplimiento para marcar riesgo / crítico
+SLA_HISTORY_DAYS = int(os.getenv('SLA_HISTORY_DAYS', '90'))
+SLA_RISK_THRESHOLD = float(os.getenv('SLA_RISK_THRESHOLD', '0.4'))
+SLA_CRITICAL_THRESHOLD = float(os.getenv('SLA_CRITICAL_THRESHOLD', '0.7'))
+
+# Métricas Prometheus. /metrics exige el token Bearer o una IP de las redes
+# permitidas (p. ej. la red de pods, para el scraping directo); sin ninguno
+# de los dos responde 403. METRICS_DIR: directorio donde cada worker vuelca
+# sus valores para que /metrics exponga la suma del pod (vacío = por proceso).
+# Umbral de consultas repetidas en un request para marcarlo como posible N+1
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [red.strip() for red in os.getenv('METRICS_ALLOWED_NETWORKS', '').split(',') if red.strip()]
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv('METRICS_N_PLUS_ONE_THRESHOLD', '5'))
+
+# Auditoría asíncrona: tamaño de la cola, eventos por escritura, segundos
+# entre escrituras y espera máxima al encolar con la cola llena
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'True').lower() == 'true'
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'True').lower() == 'true'
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', '0'))
+
+# Retención de auditoría (retener_auditoria): meses en la tabla auditoria,
+# meses en tablas de archivo y directorio de los JSONL comprimidos
+AUDIT_HOT_MONTHS = int(os.getenv('AUDIT_HOT_MONTHS', '3'))
+AUDIT_RETENTION_MONTHS = int(os.getenv('AUDIT_RETENTION_MONTHS', '12'))
+AUDIT_ARCHIVE_DIR = Path(os.getenv('AUDIT_ARCHIVE_DIR', BASE_DIR / 'archivo'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -106,6 +226,11 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Adjuntos de tickets: directorio del almacenamiento por contenido (SHA-256)
+# y tamaño máximo por archivo en bytes
+ATTACHMENT_ROOT = Path(os.getenv('ATTACHMENT_ROOT', MEDIA_ROOT / 'adjuntos'))
+ATTACHMENT_MAX_BYTES = int(os.getenv('ATTACHMENT_MAX_BYTES', str(10 * 1024 ** 3)))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -4,10 +4,12 @@ URL configuration for sigmaops project.
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
+from tickets.metrics import metricas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('tickets.urls')),
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
+    path('metrics', metricas, name='metrics'),
 ]
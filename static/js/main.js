@@ -18,4 +18,97 @@ document.addEventListener('DOMContentLoaded', function() {
             item.classList.add('active');
         }
     });
+
+    // Selects con autocompletado: las opciones se piden al servidor al escribir
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(select => {
+        const input = document.createElement('input');
+        input.type = 'text';
+        input.className = 'form-input autocomplete-input';
+        input.placeholder = 'Escriba para buscar...';
+        select.parentNode.insertBefore(input, select);
+
+        let timer = null;
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            const query = this.value.trim();
+            if (query.length < 2) return;
+            timer = setTimeout(() => {
+                fetch(`${select.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        const actual = select.value;
+                        Array.from(select.options).forEach(option => {
+                            if (option.value && option.value !== actual) option.remove();
+                        });
+                        data.results.forEach(item => {
+                            if (String(item.id) === actual) return;
+                            select.add(new Option(item.text, item.id));
+                        });
+                        if (!actual && data.results.length) select.value = data.results[0].id;
+                    });
+            }, 250);
+        });
+    });
+
+    // Timeline de observaciones: pide las anteriores por cursor al llegar al final
+    const timeline = document.getElementById('timeline');
+    const masObservaciones = document.getElementById('timelineMore');
+    if (timeline && masObservaciones) {
+        let cargando = false;
+        const cargarAnteriores = () => {
+            if (cargando || !masObservaciones.dataset.cursor) return;
+            cargando = true;
+            fetch(`${timeline.dataset.url}?cursor=${encodeURIComponent(masObservaciones.dataset.cursor)}`)
+                .then(response => response.json())
+                .then(data => {
+                    timeline.insertAdjacentHTML('beforeend', data.html);
+                    masObservaciones.dataset.cursor = data.next || '';
+                    if (!data.next) masObservaciones.remove();
+                })
+                .finally(() => { cargando = false; });
+        };
+        masObservaciones.addEventListener('click', cargarAnteriores);
+        if ('IntersectionObserver' in window) {
+            new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) cargarAnteriores();
+            }, { rootMargin: '200px' }).observe(masObservaciones);
+        }
+    }
+
+    // Alta de ticket: sugiere tickets abiertos parecidos mientras se escribe
+    const duplicados = document.getElementById('duplicados');
+    const titulo = document.getElementById('id_titulo');
+    const descripcion = document.getElementById('id_descripcion');
+    if (duplicados && titulo) {
+        const lista = duplicados.querySelector('.duplicados-lista');
+        let timer = null;
+        const buscarDuplicados = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const params = new URLSearchParams({
+                    titulo: titulo.value.trim(),
+                    descripcion: descripcion ? descripcion.value.trim().slice(0, 1000) : '',
+                });
+                fetch(`${duplicados.dataset.url}?${params}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        lista.replaceChildren(...data.results.map(item => {
+                            const li = document.createElement('li');
+                            const enlace = document.createElement('a');
+                            enlace.href = item.url;
+                            enlace.target = '_blank';
+                            enlace.className = 'ticket-code';
+                            enlace.textContent = item.codigo;
+                            const detalle = document.createElement('span');
+                            detalle.textContent = ` ${item.titulo} · ${item.estado} · ${Math.round(item.similitud * 100)}%`;
+                            li.append(enlace, detalle);
+                            return li;
+                        }));
+                        duplicados.hidden = !data.results.length;
+                    });
+            }, 400);
+        };
+        titulo.addEventListener('input', buscarDuplicados);
+        if (descripcion) descripcion.addEventListener('input', buscarDuplicados);
+    }
 });
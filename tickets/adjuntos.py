@@ -0,0 +1,235 @@
+"""
+Almacenamiento de archivos adjuntos direccionado por contenido.
+
+La subida se escribe por bloques directo a un temporal en ATTACHMENT_ROOT
+mientras se calcula su SHA-256 (AdjuntoUploadHandler), sin pasar por la
+memoria del worker ni por un segundo archivo temporal. Al terminar, el
+temporal se coloca en ab/cd/<sha256>; si ese contenido ya existía la fila
+nueva de archivos_adjuntos apunta al mismo archivo.
+
+Subidas y borrados del mismo contenido pueden cruzarse entre workers. El
+borrado renombra el archivo a una lápida y recién entonces verifica que no
+haya filas que lo referencien (si las hay lo restaura); la subida vuelve a
+colocar su archivo después del COMMIT de su fila. Así, en cualquier orden,
+el contenido de una fila confirmada queda en disco.
+
+Las descargas se sirven con FileResponse por bloques, con soporte de un
+rango de bytes (Range / If-Range) para reanudar descargas grandes.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.db import transaction
+
+from .models import ArchivoAdjunto
+
+
+RAIZ = Path(getattr(settings, 'ATTACHMENT_ROOT', Path(settings.MEDIA_ROOT) / 'adjuntos'))
+TAMANO_MAXIMO = getattr(settings, 'ATTACHMENT_MAX_BYTES', 10 * 1024 ** 3)
+BLOQUE = 1024 * 1024
+
+_SHA256_RE = re.compile(r'[0-9a-f]{64}')
+_RANGO_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def ruta_relativa(sha256):
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def ruta_absoluta(relativa):
+    """Ruta en disco de un adjunto; None si la ruta guardada no es un hash válido"""
+    sha256 = os.path.basename(relativa or '')
+    if not _SHA256_RE.fullmatch(sha256) or relativa != ruta_relativa(sha256):
+        return None
+    return RAIZ / relativa
+
+
+class ArchivoSubido(UploadedFile):
+    """Archivo ya escrito en disco por AdjuntoUploadHandler, con su SHA-256"""
+
+    def __init__(self, ruta, name, content_type, size, charset, sha256):
+        super().__init__(open(ruta, 'rb'), name, content_type, size, charset)
+        self.ruta = ruta
+        self.sha256 = sha256
+        # Ruta por contenido creada por guardar_adjunto y aún no confirmada
+        self.enlazado = None
+
+    def temporary_file_path(self):
+        return self.ruta
+
+    def close(self):
+        # Si no se guardó con guardar_adjunto, el temporal se elimina; si la
+        # fila no llegó a confirmarse, también el contenido que se enlazó
+        super().close()
+        try:
+            os.unlink(self.ruta)
+        except FileNotFoundError:
+            pass
+        if self.enlazado:
+            relativa, self.enlazado = self.enlazado, None
+            borrar_si_huerfano(relativa)
+
+
+class AdjuntoUploadHandler(FileUploadHandler):
+    """
+    Escribe cada archivo del multipart por bloques en ATTACHMENT_ROOT/tmp
+    calculando el SHA-256 incremental. Corta la subida al superar
+    ATTACHMENT_MAX_BYTES (``excedido`` queda en True).
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(self, request=None, tamano_maximo=None):
+        super().__init__(request)
+        self.tamano_maximo = tamano_maximo or TAMANO_MAXIMO
+        self.excedido = False
+        self.temporal = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        directorio = RAIZ / 'tmp'
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.temporal = tempfile.NamedTemporaryFile(dir=directorio, suffix='.subida', delete=False)
+        self.sha256 = hashlib.sha256()
+        self.tamano = 0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.tamano += len(raw_data)
+        if self.tamano > self.tamano_maximo:
+            self.excedido = True
+            self._descartar()
+            raise StopUpload(connection_reset=True)
+        self.temporal.write(raw_data)
+        self.sha256.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.temporal.close()
+        subido = ArchivoSubido(
+            self.temporal.name, self.file_name, self.content_type, self.tamano,
+            self.charset, self.sha256.hexdigest(),
+        )
+        self.temporal = None
+        return subido
+
+    def upload_interrupted(self):
+        self._descartar()
+
+    def _descartar(self):
+        if self.temporal is not None:
+            self.temporal.close()
+            os.unlink(self.temporal.name)
+            self.temporal = None
+
+
+def guardar_adjunto(ticket, subido, usuario_id=None, descripcion=None):
+    """
+    Registra el adjunto y deja el archivo subido en su ruta por contenido.
+    Si el contenido es nuevo se enlaza antes del INSERT (se puede descargar
+    enseguida); tras el COMMIT el temporal reemplaza a la ruta por contenido,
+    restaurándola si un borrado concurrente la quitó.
+    """
+    relativa = ruta_relativa(subido.sha256)
+    destino = RAIZ / relativa
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(subido.ruta, destino)
+        subido.enlazado = relativa
+    except FileExistsError:
+        # Mismo contenido ya almacenado: se reutiliza
+        pass
+    except OSError:
+        # Sin enlaces duros en el volumen: se coloca solo tras el COMMIT
+        pass
+    try:
+        adjunto = ArchivoAdjunto.objects.create(
+            ticket=ticket, usuario_id=usuario_id,
+            nombre_archivo=os.path.basename(subido.name)[:255],
+            tipo_mime=(subido.content_type or '')[:100] or None,
+            ruta_almacenamiento=relativa, tamano_bytes=subido.size,
+            descripcion=descripcion or None,
+        )
+    except Exception:
+        # Quita el temporal y el contenido enlazado si nadie más lo usa
+        subido.close()
+        raise
+
+    def colocar():
+        os.replace(subido.ruta, destino)
+        subido.enlazado = None
+        subido.close()
+    transaction.on_commit(colocar)
+    return adjunto
+
+
+def borrar_si_huerfano(relativa):
+    """
+    Borra el archivo en disco si ningún adjunto lo referencia. Primero lo
+    renombra a una lápida: una subida que se confirme después lo vuelve a
+    colocar, y si la fila ya está confirmada el archivo se restaura.
+    """
+    ruta = ruta_absoluta(relativa)
+    if ruta is None:
+        return
+    lapida = ruta.with_name(f'{ruta.name}.{uuid.uuid4().hex}.borrar')
+    try:
+        os.rename(ruta, lapida)
+    except FileNotFoundError:
+        return
+    if ArchivoAdjunto.objects.filter(ruta_almacenamiento=relativa).exists():
+        os.replace(lapida, ruta)
+    else:
+        os.unlink(lapida)
+
+
+def liberar_contenido(relativa):
+    """Borra el archivo en disco si ningún adjunto lo referencia (tras el COMMIT)"""
+    transaction.on_commit(lambda: borrar_si_huerfano(relativa))
+
+
+def parsear_rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivo de un único rango ``bytes=``; None si no hay
+    rango utilizable (se responde completo) y False si es insatisfacible
+    """
+    coincide = _RANGO_RE.fullmatch((cabecera or '').strip())
+    if not coincide or coincide.group(1) == coincide.group(2) == '':
+        return None
+    inicio, fin = coincide.groups()
+    if inicio == '':
+        # Sufijo: los últimos N bytes
+        largo = int(fin)
+        if largo == 0:
+            return False
+        return max(tamano - largo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+class TramoArchivo:
+    """Lectura acotada a ``largo`` bytes desde la posición actual del archivo"""
+
+    def __init__(self, archivo, largo):
+        self.archivo = archivo
+        self.restante = largo
+
+    def read(self, tamano=-1):
+        if self.restante <= 0:
+            return b''
+        if tamano < 0 or tamano > self.restante:
+            tamano = self.restante
+        datos = self.archivo.read(tamano)
+        self.restante -= len(datos)
+        return datos
+
+    def close(self):
+        self.archivo.close()
@@ -4,47 +4,57 @@ Configuración del Admin de Django para el sistema de tickets
 from django.contrib import admin
 from .models import (
     Rol, Usuario, Estado, Categoria, Proveedor, 
-    DataCenter, Elemento, Ticket, Observacion
+    DataCenter, Elemento, Ticket, Observacion, Auditoria
 )
+from .retencion import auditoria_caliente
+from .routers import permitir_replica
+
+
+class LecturaReplicaAdmin(admin.ModelAdmin):
+    """Los changelists leen de una réplica si está configurada"""
+
+    def changelist_view(self, request, extra_context=None):
+        permitir_replica(request)
+        return super().changelist_view(request, extra_context)
 
 
 @admin.register(Rol)
-class RolAdmin(admin.ModelAdmin):
+class RolAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre']
     search_fields = ['nombre']
 
 
 @admin.register(Usuario)
-class UsuarioAdmin(admin.ModelAdmin):
+class UsuarioAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'correo', 'rol', 'creado_en']
     list_filter = ['rol']
     search_fields = ['nombre', 'correo']
 
 
 @admin.register(Estado)
-class EstadoAdmin(admin.ModelAdmin):
+class EstadoAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'descripcion']
 
 
 @admin.register(Categoria)
-class CategoriaAdmin(admin.ModelAdmin):
+class CategoriaAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'descripcion']
 
 
 @admin.register(Proveedor)
-class ProveedorAdmin(admin.ModelAdmin):
+class ProveedorAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'contacto', 'activo']
     list_filter = ['activo']
 
 
 @admin.register(DataCenter)
-class DataCenterAdmin(admin.ModelAdmin):
+class DataCenterAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'ubicacion', 'tipo']
     list_filter = ['tipo']
 
 
 @admin.register(Elemento)
-class ElementoAdmin(admin.ModelAdmin):
+class ElementoAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'nombre', 'tipo']
     list_filter = ['tipo']
     search_fields = ['nombre']
@@ -57,7 +67,7 @@ class ObservacionInline(admin.TabularInline):
 
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(LecturaReplicaAdmin):
     list_display = ['codigo', 'titulo', 'prioridad', 'estado', 'categoria', 'dc', 'fecha_inicio']
     list_filter = ['estado', 'prioridad', 'categoria', 'dc', 'proveedor']
     search_fields = ['codigo', 'titulo', 'descripcion']
@@ -66,7 +76,28 @@ class TicketAdmin(admin.ModelAdmin):
 
 
 @admin.register(Observacion)
-class ObservacionAdmin(admin.ModelAdmin):
+class ObservacionAdmin(LecturaReplicaAdmin):
     list_display = ['id', 'ticket', 'tipo', 'usuario', 'fecha']
     list_filter = ['tipo']
     search_fields = ['comentario']
+
+
+@admin.register(Auditoria)
+class AuditoriaAdmin(LecturaReplicaAdmin):
+    list_display = ['fecha', 'entidad', 'accion', 'entidad_id', 'usuario']
+    list_filter = ['accion', 'entidad']
+    list_select_related = ['usuario']
+    # Solo los meses calientes; el COUNT total sin filtros se omite
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return auditoria_caliente().select_related('usuario')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,101 @@
+"""
+Consultas independientes en paralelo desde las vistas async.
+
+El ORM async de Django ejecuta cada consulta en el hilo síncrono del
+request, una detrás de otra. en_paralelo corre cada función en un hilo del
+executor con su propia conexión, así el tiempo de la vista es el de la
+consulta más lenta y no la suma de todas.
+
+Cada hilo abre su conexión y la devuelve al terminar: solo conviene si
+obtenerla es barato (pool de tickets/pool.py, CONN_MAX_AGE o SQLite). Con
+una conexión nueva por request (DB_POOL_SIZE=0) cada hilo pagaría el
+handshake con MariaDB, más lento que las consultas en serie.
+
+transmitir adapta las respuestas en streaming (exportación, descargas) al
+servidor ASGI, que junta un iterador síncrono completo antes de enviarlo.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connection
+
+
+PARALELO = getattr(settings, 'ASYNC_PARALLEL_QUERIES', True)
+# Bytes mínimos por salto al hilo del request al transmitir bajo ASGI
+BLOQUE_TRANSMISION = 256 * 1024
+
+
+def _aislada(funcion):
+    # Conexión propia del hilo: se cierra (o se conserva según CONN_MAX_AGE)
+    # igual que al terminar un request
+    close_old_connections()
+    try:
+        return funcion()
+    finally:
+        close_old_connections()
+
+
+def _en_serie(funciones):
+    return [funcion() for funcion in funciones]
+
+
+def conexiones_baratas():
+    """True si abrir la conexión de cada hilo no implica un handshake nuevo"""
+    return (
+        'POOL' in connection.settings_dict
+        or connection.settings_dict['CONN_MAX_AGE'] != 0
+        or connection.vendor == 'sqlite'
+    )
+
+
+def _en_serie_requerido():
+    # En el hilo del request: es el que tiene su conexión y su transacción
+    return connection.in_atomic_block or not conexiones_baratas()
+
+
+async def en_paralelo(*funciones):
+    """
+    Ejecuta funciones síncronas sin dependencias entre sí y retorna sus
+    resultados en el mismo orden. Dentro de una transacción se ejecutan en
+    serie en el hilo del request, para que vean sus escrituras; también sin
+    conexiones baratas (ver conexiones_baratas).
+    """
+    if not PARALELO or await sync_to_async(_en_serie_requerido)():
+        return await sync_to_async(_en_serie)(funciones)
+    return list(await asyncio.gather(*(
+        sync_to_async(_aislada, thread_sensitive=False)(funcion) for funcion in funciones
+    )))
+
+
+def _siguiente_bloque(partes, minimo):
+    bloque, tamano = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        tamano += len(parte)
+        if tamano >= minimo:
+            break
+    return b''.join(bloque)
+
+
+async def _por_bloques(partes, minimo):
+    # Cada bloque se lee en el hilo del request (el de su conexión a la base)
+    siguiente = sync_to_async(_siguiente_bloque)
+    while True:
+        bloque = await siguiente(partes, minimo)
+        if not bloque:
+            return
+        yield bloque
+
+
+def transmitir(request, response):
+    """
+    Bajo ASGI reemplaza el contenido síncrono de una respuesta en streaming
+    por un iterador async que lo consume por bloques de BLOQUE_TRANSMISION:
+    Django haría list() del iterador síncrono y enviaría todo al final. Bajo
+    WSGI la respuesta queda igual (un iterador async ahí se juntaría entero).
+    """
+    if isinstance(request, ASGIRequest) and not response.is_async:
+        response.streaming_content = _por_bloques(iter(response.streaming_content), BLOQUE_TRANSMISION)
+    return response
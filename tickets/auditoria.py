@@ -0,0 +1,154 @@
+"""
+Registro de auditoría asíncrono y por lotes en la tabla auditoria.
+
+Las señales solo construyen el evento y lo encolan (tras el COMMIT de la
+transacción que lo originó); un hilo por proceso vacía la cola con
+bulk_create cada AUDIT_FLUSH_INTERVAL segundos o al juntar AUDIT_BATCH_SIZE
+eventos. La cola es acotada: si se llena, el evento espera a lo más
+AUDIT_ENQUEUE_TIMEOUT segundos y luego se descarta, contándolo en /metrics.
+Al terminar el proceso se escriben los eventos pendientes.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import metrics
+from .models import Auditoria
+
+
+logger = logging.getLogger(__name__)
+
+# Usuario (id en la tabla usuarios) del request en curso; lo fija RolMiddleware
+usuario_actual = contextvars.ContextVar('usuario_auditoria', default=None)
+
+
+class ColaAuditoria:
+    """Cola acotada de eventos de auditoría con un hilo escritor"""
+
+    def __init__(self, capacidad=10000, lote=500, intervalo=1.0, espera=0.0):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera = espera
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._detener = threading.Event()
+        self._despertar = threading.Event()
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def encolar(self, evento):
+        """Agrega el evento sin bloquear el request más de ``espera`` segundos"""
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(evento)
+        except queue.Full:
+            # Cola llena: espera acotada (contrapresión) y luego se descarta
+            metrics.auditoria_presion.inc()
+            try:
+                if not self.espera:
+                    raise
+                self._cola.put(evento, timeout=self.espera)
+            except queue.Full:
+                metrics.auditoria_descartados.inc()
+                return False
+        metrics.auditoria_encolados.inc()
+        if self._cola.qsize() >= self.lote:
+            self._despertar.set()
+        return True
+
+    def vaciar(self):
+        """Escribe todos los eventos pendientes en lotes; retorna cuántos escribió"""
+        escritos = 0
+        while True:
+            eventos = self._tomar(self.lote)
+            if not eventos:
+                return escritos
+            escritos += self._escribir(eventos)
+
+    def _tomar(self, cantidad):
+        eventos = []
+        try:
+            while len(eventos) < cantidad:
+                eventos.append(self._cola.get_nowait())
+        except queue.Empty:
+            pass
+        return eventos
+
+    def _escribir(self, eventos):
+        try:
+            close_old_connections()
+            Auditoria.objects.bulk_create(eventos, batch_size=self.lote)
+        except Exception:
+            metrics.auditoria_errores.inc(cantidad=len(eventos))
+            logger.exception('No se pudieron escribir %d eventos de auditoría', len(eventos))
+            return 0
+        metrics.auditoria_escritos.inc(cantidad=len(eventos))
+        metrics.auditoria_lotes.observe(valor=len(eventos))
+        return len(eventos)
+
+    def _asegurar_hilo(self):
+        # Se inicia en el primer evento de cada proceso (también tras un fork)
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='auditoria', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        # Escribe cada ``intervalo`` segundos o antes si se juntó un lote
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
+        self.vaciar()
+
+    def detener(self, timeout=10):
+        """Detiene el hilo escribiendo lo pendiente (al terminar el proceso)"""
+        hilo = self._hilo
+        if hilo is None or self._pid != os.getpid():
+            return
+        self._detener.set()
+        self._despertar.set()
+        hilo.join(timeout)
+        self._hilo = None
+
+
+cola = ColaAuditoria(
+    capacidad=getattr(settings, 'AUDIT_QUEUE_SIZE', 10000),
+    lote=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+    intervalo=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+    espera=getattr(settings, 'AUDIT_ENQUEUE_TIMEOUT', 0.0),
+)
+atexit.register(cola.detener)
+
+metrics.Medidor(
+    'sigmaops_audit_queue_depth', 'Eventos de auditoría pendientes en la cola', cola.pendientes,
+)
+
+
+def registrar(entidad, accion, entidad_id=None, descripcion=None, usuario_id=None):
+    """Encola un evento de auditoría después del COMMIT de la transacción actual"""
+    if not getattr(settings, 'AUDIT_ENABLED', True):
+        return
+    evento = Auditoria(
+        entidad=entidad, accion=accion, entidad_id=entidad_id,
+        usuario_id=usuario_id if usuario_id is not None else usuario_actual.get(),
+        descripcion=descripcion,
+    )
+    if getattr(settings, 'AUDIT_ASYNC', True):
+        transaction.on_commit(lambda: cola.encolar(evento))
+    else:
+        transaction.on_commit(lambda: Auditoria.objects.bulk_create([evento]))
@@ -0,0 +1,91 @@
+"""
+Backend MySQL/MariaDB (PyMySQL) con pool de conexiones por proceso.
+
+ENGINE = 'tickets.backends.mysql' y las opciones del pool en
+DATABASES[alias]['POOL'] (SIZE, TIMEOUT, RECYCLE, PRE_PING). Abrir la
+conexión la toma del pool y cerrarla la devuelve (ver tickets/pool.py).
+"""
+import weakref
+from functools import partial
+
+from django.db.backends.mysql.base import Database, DatabaseWrapper as MySQLDatabaseWrapper
+from django.utils.asyncio import async_unsafe
+from pymysql.constants.SERVER_STATUS import SERVER_STATUS_IN_TRANS
+
+from tickets.pool import PoolAgotado, obtener_pool
+
+
+# Conexiones con el estado de sesión ya inicializado (SQL_AUTO_IS_NULL,
+# nivel de aislamiento): al reutilizarlas no se repiten esos SET
+_inicializadas = weakref.WeakSet()
+
+
+def _conectar(parametros):
+    conexion = Database.connect(**parametros)
+    # Mismo ajuste que el backend de Django
+    if conexion.encoders.get(bytes) is bytes:
+        conexion.encoders.pop(bytes)
+    return conexion
+
+
+def _responde(conexion):
+    try:
+        conexion.ping(reconnect=False)
+    except Database.Error:
+        return False
+    return True
+
+
+def _cerrar(conexion):
+    conexion.close()
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+
+    def crear_pool(self, conn_params):
+        opciones = self.settings_dict.get('POOL', {})
+        return obtener_pool(
+            self.alias,
+            crear=partial(_conectar, conn_params),
+            verificar=_responde,
+            cerrar=_cerrar,
+            tamano=opciones.get('SIZE', 10),
+            espera=opciones.get('TIMEOUT', 30),
+            reciclar=opciones.get('RECYCLE', 3600),
+            pre_ping=opciones.get('PRE_PING', True),
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.pool = self.crear_pool(conn_params)
+        try:
+            return self.pool.obtener()
+        except PoolAgotado as error:
+            raise Database.OperationalError(str(error)) from error
+
+    def init_connection_state(self):
+        if self.connection in _inicializadas:
+            return
+        super().init_connection_state()
+        _inicializadas.add(self.connection)
+
+    def _close(self):
+        conexion = self.connection
+        if conexion is None:
+            return
+        if self.in_atomic_block:
+            # Django conserva la referencia a una conexión cerrada dentro de
+            # un atomic: no puede volver al pool
+            self.pool.descartar(conexion, 'transaccion')
+            return
+        try:
+            # Una transacción sin terminar no pasa al próximo préstamo
+            if conexion.server_status & SERVER_STATUS_IN_TRANS:
+                conexion.rollback()
+        except Database.Error:
+            self.pool.descartar(conexion)
+            return
+        if self.errors_occurred and not _responde(conexion):
+            self.pool.descartar(conexion)
+            return
+        self.pool.devolver(conexion)
@@ -0,0 +1,111 @@
+"""
+Cache de tablas de referencia (catálogos) por proceso con sello de versión.
+
+Cada proceso guarda la lista completa de cada catálogo junto a la versión
+con que la cargó. La versión vive en la cache compartida de Django y se
+incrementa al guardar o borrar una fila, así todos los workers recargan
+el catálogo en su siguiente lectura.
+
+Las versiones se siembran con la hora en nanosegundos: si la clave se
+pierde (reinicio o desalojo de la cache) la nueva nunca coincide con una
+versión ya usada, así no se vuelve a servir una lista o un fragmento viejo.
+"""
+import time
+
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator
+
+from .models import Estado, Categoria, Proveedor, DataCenter, Elemento, Usuario
+
+
+MODELOS_CATALOGO = {
+    'estados': Estado,
+    'categorias': Categoria,
+    'proveedores': Proveedor,
+    'data_centers': DataCenter,
+    'elementos': Elemento,
+    'usuarios': Usuario,
+}
+
+_locales = {}
+
+
+def _clave_version(nombre):
+    return f'catalogos:version:{nombre}'
+
+
+def nueva_version():
+    """Semilla de una versión, mayor que cualquier versión sembrada antes"""
+    return time.time_ns()
+
+
+def leer_versiones(claves):
+    """Versiones de las claves en una lectura; siembra las que falten"""
+    versiones = cache.get_many(claves)
+    faltantes = [clave for clave in claves if clave not in versiones]
+    if faltantes:
+        for clave in faltantes:
+            cache.add(clave, nueva_version(), timeout=None)
+        versiones.update(cache.get_many(faltantes))
+    # Sin cache disponible cada lectura da una versión distinta (recarga siempre)
+    return [versiones.get(clave) or nueva_version() for clave in claves]
+
+
+def incrementar_version(clave):
+    """Incrementa la versión; si la clave no existe la siembra de nuevo"""
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, nueva_version(), timeout=None)
+
+
+def version_catalogo(nombre):
+    """Versión vigente del catálogo en la cache compartida"""
+    return leer_versiones([_clave_version(nombre)])[0]
+
+
+def versiones_catalogos():
+    """Versiones de todos los catálogos en una sola lectura de la cache"""
+    return tuple(leer_versiones([_clave_version(nombre) for nombre in MODELOS_CATALOGO]))
+
+
+def catalogo(nombre):
+    """Lista de instancias del catálogo, recargada solo si cambió la versión"""
+    version = version_catalogo(nombre)
+    local = _locales.get(nombre)
+    if local is None or local[0] != version:
+        filas = list(MODELOS_CATALOGO[nombre].objects.order_by('pk'))
+        local = (version, filas)
+        _locales[nombre] = local
+    return local[1]
+
+
+def invalidar_catalogo(modelo):
+    """Incrementa la versión del catálogo asociado al modelo"""
+    for nombre, clase in MODELOS_CATALOGO.items():
+        if clase is modelo:
+            incrementar_version(_clave_version(nombre))
+            _locales.pop(nombre, None)
+
+
+class CatalogoChoiceIterator(ModelChoiceIterator):
+    """Opciones de un ModelChoiceField servidas desde el catálogo cacheado"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in catalogo(self.field.catalogo):
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(catalogo(self.field.catalogo)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(catalogo(self.field.catalogo))
+
+
+def usar_catalogo(field, nombre):
+    """Hace que un ModelChoiceField renderice sus opciones desde el catálogo"""
+    field.catalogo = nombre
+    field.iterator = CatalogoChoiceIterator
+    field.widget.choices = field.choices
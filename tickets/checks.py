@@ -0,0 +1,31 @@
+"""
+Comprobaciones de configuración de producción (manage.py check --deploy;
+el entrypoint del contenedor las corre antes de arrancar gunicorn).
+"""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+@register(deploy=True)
+def cache_compartida(app_configs, **kwargs):
+    """
+    Las versiones de catálogos y fragmentos viven en la cache: con una cache
+    por proceso las invalidaciones no llegan a los demás workers ni pods
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if not backend.endswith('.LocMemCache'):
+        return []
+    workers = getattr(settings, 'GUNICORN_WORKERS', 1)
+    if workers > 1:
+        return [Error(
+            f'Cache por proceso (LocMemCache) con {workers} workers: los demás '
+            'procesos siguen sirviendo catálogos y fragmentos viejos',
+            hint='Usar CACHE_BACKEND=db o redis (o GUNICORN_WORKERS=1)',
+            id='tickets.E001',
+        )]
+    return [Warning(
+        'Cache por proceso (LocMemCache): si hay más de un pod las '
+        'invalidaciones no llegan a los demás',
+        hint='Usar CACHE_BACKEND=db o redis',
+        id='tickets.W001',
+    )]
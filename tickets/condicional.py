@@ -0,0 +1,51 @@
+"""
+Respuestas condicionales (ETag / If-None-Match) del detalle y el listado.
+
+El ETag sale de los sellos de versión de la cache (ver fragmentos): la
+comprobación no consulta la base ni renderiza, y si el cliente ya tiene la
+versión se responde 304. Como la página incluye datos de la sesión, el
+ETag también lleva el usuario, su rol y el secreto CSRF.
+
+No se emite ETag si la respuesta se armó con datos de una réplica (pueden
+estar atrasados respecto del sello) ni si la página muestra mensajes.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .routers import leyo_de_replica
+
+
+def etag_pagina(request, nombre, sello):
+    """ETag de la página ``nombre`` con el sello dado para el usuario del request"""
+    partes = (
+        nombre, sello, request.user.pk, request.user.get_username(),
+        getattr(request, 'rol_nombre', None), request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    )
+    return quote_etag(hashlib.md5(repr(partes).encode()).hexdigest())
+
+
+def _sin_mensajes(request):
+    # len() no marca los mensajes como leídos
+    return not len(messages.get_messages(request))
+
+
+def no_modificada(request, etag):
+    """HttpResponseNotModified si el cliente ya tiene ``etag``; si no, None"""
+    if _sin_mensajes(request):
+        return get_conditional_response(request, etag=etag)
+    return None
+
+
+def con_validador(request, response, etag):
+    """
+    Agrega el ETag a la respuesta; el navegador la revalida en cada visita
+    (no-cache) en vez de reutilizarla sin preguntar
+    """
+    if response.status_code == 200 and not leyo_de_replica() and _sin_mensajes(request):
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
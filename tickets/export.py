@@ -0,0 +1,134 @@
+"""
+Exportación en streaming del listado de tickets a CSV y XLSX.
+
+Ambos formatos se generan fila a fila: el XLSX se escribe como un zip en
+modo streaming (sin seek), así que nunca se arma el archivo en memoria.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+
+# (encabezado, campo de values())
+COLUMNAS = [
+    ('Código', 'codigo'),
+    ('Título', 'titulo'),
+    ('Estado', 'estado__nombre'),
+    ('Prioridad', 'prioridad'),
+    ('Categoría', 'categoria__nombre'),
+    ('Data Center', 'dc__nombre'),
+    ('Proveedor', 'proveedor__nombre'),
+    ('Elemento', 'elemento__nombre'),
+    ('Asignado', 'usuario_asignado__nombre'),
+    ('Fecha Inicio', 'fecha_inicio'),
+    ('Fecha Cierre', 'fecha_cierre'),
+]
+CAMPOS = [campo for _, campo in COLUMNAS]
+
+
+def _celdas(fila):
+    return ['' if fila[campo] is None else fila[campo] for campo in CAMPOS]
+
+
+class _Eco:
+    """Pseudo-archivo que retorna lo escrito, para csv.writer"""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_csv(filas):
+    """Genera el CSV línea a línea (con BOM para que Excel respete UTF-8)"""
+    writer = csv.writer(_Eco())
+    yield '\ufeff' + writer.writerow([encabezado for encabezado, _ in COLUMNAS])
+    for fila in filas:
+        yield writer.writerow(_celdas(fila))
+
+
+class _Buffer:
+    """Destino no posicionable para ZipFile; se vacía después de cada bloque"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+_NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_PKG = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_PARTES_FIJAS = {
+    '[Content_Types].xml': (
+        _XML + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        _XML + f'<Relationships xmlns="{_NS_PKG}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        _XML + f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+        '<sheets><sheet name="Tickets" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        _XML + f'<Relationships xmlns="{_NS_PKG}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de control no permitidos en XML 1.0
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _fila_xml(valores):
+    celdas = ''.join(
+        '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>'
+        % escape(_INVALIDOS_XML.sub('', str(valor)))
+        for valor in valores
+    )
+    return f'<row>{celdas}</row>'
+
+
+def filas_xlsx(filas, lote=500):
+    """Genera los bytes de un libro XLSX de una hoja, en bloques de ``lote`` filas"""
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in _PARTES_FIJAS.items():
+            libro.writestr(nombre, contenido)
+        yield buffer.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write((
+                _XML + f'<worksheet xmlns="{_NS_MAIN}"><sheetData>'
+                + _fila_xml(encabezado for encabezado, _ in COLUMNAS)
+            ).encode())
+            bloque = []
+            for fila in filas:
+                bloque.append(_fila_xml(_celdas(fila)))
+                if len(bloque) >= lote:
+                    hoja.write(''.join(bloque).encode())
+                    bloque = []
+                    yield buffer.vaciar()
+            hoja.write((''.join(bloque) + '</sheetData></worksheet>').encode())
+    yield buffer.vaciar()
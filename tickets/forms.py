@@ -2,7 +2,47 @@
 Formularios para el sistema de tickets
 """
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import Ticket, Observacion
+from .catalogos import usar_catalogo
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select que solo incluye en el HTML la opción seleccionada; el resto se
+    pide al endpoint de autocompletado mientras el usuario escribe.
+    """
+
+    def __init__(self, url, attrs=None):
+        attrs = dict(attrs or {})
+        attrs['data-autocomplete-url'] = url
+        super().__init__(attrs)
+
+    def _seleccionados(self, value):
+        """Valores que son pk válidas; los demás los informa la validación del campo"""
+        campo_pk = self.choices.queryset.model._meta.pk
+        seleccionados = []
+        for v in value:
+            if v in ('', None):
+                continue
+            try:
+                seleccionados.append(campo_pk.to_python(v))
+            except (ValidationError, ValueError, TypeError):
+                pass
+        return seleccionados
+
+    def optgroups(self, name, value, attrs=None):
+        seleccionados = self._seleccionados(value)
+        opciones = [('', '---------')]
+        if seleccionados:
+            queryset = self.choices.queryset.filter(pk__in=seleccionados)
+            opciones += [(obj.pk, str(obj)) for obj in queryset]
+        todas, self.choices = self.choices, opciones
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
 
 
 class TicketForm(forms.ModelForm):
@@ -33,7 +73,10 @@ class TicketForm(forms.ModelForm):
             'estado': forms.Select(attrs={'class': 'form-select'}),
             'categoria': forms.Select(attrs={'class': 'form-select'}),
             'proveedor': forms.Select(attrs={'class': 'form-select'}),
-            'elemento': forms.Select(attrs={'class': 'form-select'}),
+            'elemento': AutocompleteSelect(
+                reverse_lazy('autocompletar', args=['elementos']),
+                attrs={'class': 'form-select'},
+            ),
             'dc': forms.Select(attrs={'class': 'form-select'}),
             'fecha_inicio': forms.DateInput(attrs={
                 'class': 'form-input',
@@ -43,12 +86,29 @@ class TicketForm(forms.ModelForm):
                 'class': 'form-input',
                 'type': 'date'
             }),
-            'usuario_asignado': forms.Select(attrs={'class': 'form-select'}),
+            'usuario_asignado': AutocompleteSelect(
+                reverse_lazy('autocompletar', args=['usuarios']),
+                attrs={'class': 'form-select'},
+            ),
         }
         labels = {
             'dc': 'Data Center',
         }
 
+    # Selects cuyas opciones se sirven desde la cache de catálogos
+    # (elemento y usuario_asignado usan autocompletado)
+    CAMPOS_CATALOGO = {
+        'estado': 'estados',
+        'categoria': 'categorias',
+        'proveedor': 'proveedores',
+        'dc': 'data_centers',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo, nombre in self.CAMPOS_CATALOGO.items():
+            usar_catalogo(self.fields[campo], nombre)
+
 
 class ObservacionForm(forms.ModelForm):
     """Formulario para agregar observaciones"""
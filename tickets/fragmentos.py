@@ -0,0 +1,151 @@
+"""
+Cache de fragmentos HTML con sello de versión.
+
+Cada ticket tiene una versión en la cache compartida que se incrementa al
+cambiar el ticket o cualquiera de sus relaciones (ver signals). La clave
+de un fragmento incluye esa versión, una generación global y las
+versiones de los catálogos, así un cambio nunca sirve HTML antiguo: la
+clave anterior deja de leerse y expira por TTL. Los fragmentos por ticket
+son las secciones del detalle y las filas del listado.
+
+Las tarjetas de agregados del dashboard dependen de todos los tickets:
+usan la versión del conjunto, que se incrementa al guardar o borrar
+cualquier ticket.
+
+Como en los catálogos, una versión ausente se siembra con la hora en
+nanosegundos: tras un desalojo o reinicio de la cache nunca vuelve a un
+valor ya usado, así un fragmento o ETag anterior no coincide de nuevo.
+
+Un fragmento renderizado desde una réplica se guarda bajo su propia clave
+y solo por DB_REPLICA_MAX_LAG segundos: quien lee de la primaria (p. ej.
+tras escribir) nunca recibe HTML de una réplica atrasada.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalogos import incrementar_version, leer_versiones, versiones_catalogos
+from .routers import lee_de_replica, leyo_de_replica, marcar_cache_replica, ttl_lectura
+
+
+CLAVE_GENERACION = 'tickets:fragmentos:generacion'
+CLAVE_CONJUNTO = 'tickets:version:conjunto'
+TTL = getattr(settings, 'TICKET_FRAGMENT_TTL', 600)
+
+
+def _clave_version(ticket_id):
+    return f'tickets:version:{ticket_id}'
+
+
+def sellos_tickets(ticket_ids):
+    """Sellos de varios tickets en una sola lectura de las versiones"""
+    claves = {ticket_id: _clave_version(ticket_id) for ticket_id in ticket_ids}
+    *versiones, generacion = leer_versiones([*claves.values(), CLAVE_GENERACION])
+    catalogos = '.'.join(str(v) for v in versiones_catalogos())
+    comun = f'{generacion}-{catalogos}'
+    return {ticket_id: f'{version}-{comun}' for ticket_id, version in zip(claves, versiones)}
+
+
+def sello_ticket(ticket_id):
+    """Sello de versión del ticket, la generación global y los catálogos"""
+    return sellos_tickets([ticket_id])[ticket_id]
+
+
+def clave_fragmento(nombre, ticket_id):
+    return f'tickets:fragmento:{nombre}:{ticket_id}:{sello_ticket(ticket_id)}'
+
+
+def sello_conjunto():
+    """Sello de versión del conjunto de tickets, la generación global y los catálogos"""
+    conjunto, generacion = leer_versiones([CLAVE_CONJUNTO, CLAVE_GENERACION])
+    catalogos = '.'.join(str(v) for v in versiones_catalogos())
+    return f'{conjunto}-{generacion}-{catalogos}'
+
+
+def clave_conjunto(nombre, *partes):
+    """
+    Clave de un fragmento de agregados de todos los tickets; ``partes``
+    distingue variantes del mismo fragmento (p. ej. el filtro activo)
+    """
+    firma = hashlib.md5(repr(partes).encode()).hexdigest()
+    return f'tickets:fragmento:{nombre}:{firma}:{sello_conjunto()}'
+
+
+def _claves_lectura(clave):
+    # Las lecturas de réplica aceptan también lo renderizado desde otra réplica
+    return [clave, f'{clave}:replica'] if lee_de_replica() else [clave]
+
+
+def _clave_escritura(clave):
+    return f'{clave}:replica' if leyo_de_replica() else clave
+
+
+def _leido(valores, clave):
+    """Valor cacheado de la clave (o su variante de réplica) o None"""
+    for candidata in _claves_lectura(clave):
+        if candidata in valores:
+            if candidata != clave:
+                marcar_cache_replica()
+            return valores[candidata]
+    return None
+
+
+def obtener_cacheado(clave, renderizar, ttl=TTL):
+    """
+    Retorna el valor cacheado de la clave o lo genera con ``renderizar()``
+    (fragmentos y también resultados de consultas, ver stats)
+    """
+    valor = _leido(cache.get_many(_claves_lectura(clave)), clave)
+    if valor is not None:
+        return valor
+    valor = renderizar()
+    cache.set(_clave_escritura(clave), valor, ttl_lectura(ttl))
+    return valor
+
+
+def obtener_fragmento(nombre, ticket_id, renderizar):
+    """
+    Retorna el fragmento cacheado o lo genera con ``renderizar()``.
+    El sello se lee antes de renderizar: si el ticket cambia mientras tanto,
+    el resultado queda bajo la clave vieja y no se vuelve a servir.
+    """
+    return obtener_cacheado(clave_fragmento(nombre, ticket_id), renderizar)
+
+
+def obtener_fragmentos(nombre, tickets, renderizar):
+    """
+    Fragmentos de varios tickets en orden (filas del listado) con una
+    lectura de las versiones y otra de los fragmentos; ``renderizar(ticket)``
+    genera solo los que falten.
+    """
+    sellos = sellos_tickets([ticket.pk for ticket in tickets])
+    claves = [f'tickets:fragmento:{nombre}:{ticket.pk}:{sellos[ticket.pk]}' for ticket in tickets]
+    valores = cache.get_many([candidata for clave in claves for candidata in _claves_lectura(clave)])
+    resultado = []
+    nuevos = {}
+    for ticket, clave in zip(tickets, claves):
+        valor = _leido(valores, clave)
+        if valor is None:
+            valor = nuevos[_clave_escritura(clave)] = renderizar(ticket)
+        resultado.append(valor)
+    if nuevos:
+        cache.set_many(nuevos, ttl_lectura(TTL))
+    return resultado
+
+
+def invalidar_ticket(*ticket_ids):
+    """Incrementa la versión de los tickets indicados"""
+    for ticket_id in ticket_ids:
+        if ticket_id is not None:
+            incrementar_version(_clave_version(ticket_id))
+
+
+def invalidar_conjunto():
+    """Incrementa la versión del conjunto de tickets (agregados del dashboard)"""
+    incrementar_version(CLAVE_CONJUNTO)
+
+
+def invalidar_fragmentos():
+    """Invalida los fragmentos de todos los tickets (cargas masivas)"""
+    incrementar_version(CLAVE_GENERACION)
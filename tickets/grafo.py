@@ -0,0 +1,241 @@
+"""
+Índice en memoria del grafo de dependencias entre tickets (relacion_tickets).
+
+Una relación padre -> hijo de tipo "Depende de", "Sigue a" o "Duplicado
+de" significa que el padre queda bloqueado por el hijo: el impacto de un
+ticket es todo lo que depende de él, directa o transitivamente.
+
+Cada proceso guarda las aristas en listas de adyacencia junto a la versión
+con que las cargó. La versión vive en la cache compartida y cada alta,
+cambio o baja de una relación la incrementa y publica el cambio con esa
+versión (tras el COMMIT). Un proceso atrasado aplica solo los cambios que
+le faltan; si alguno ya no está en la cache recarga la tabla completa.
+La versión se siembra como la de los catálogos (ver catalogos.nueva_version):
+si la cache la pierde, el índice de cada proceso se recarga.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalogos import incrementar_version, leer_versiones, nueva_version
+from .models import RelacionTicket
+
+
+CLAVE_VERSION = 'grafo:version'
+CAMBIO_TTL = 3600
+# Con más cambios pendientes conviene recargar la tabla
+MAX_CAMBIOS = 500
+TIPOS_BLOQUEO = ('Depende de', 'Sigue a', 'Duplicado de')
+
+
+def _clave_cambio(version):
+    return f'grafo:cambio:{version}'
+
+
+class IndiceDependencias:
+    """Listas de adyacencia por ticket, indexadas por id de relación"""
+
+    def __init__(self, version=0):
+        self.version = version
+        self.relaciones = {}
+        # ticket -> {relación: (otro ticket, tipo)}
+        self.salientes = {}
+        self.entrantes = {}
+
+    def agregar(self, relacion_id, padre, hijo, tipo):
+        self.quitar(relacion_id)
+        self.relaciones[relacion_id] = (padre, hijo, tipo)
+        self.salientes.setdefault(padre, {})[relacion_id] = (hijo, tipo)
+        self.entrantes.setdefault(hijo, {})[relacion_id] = (padre, tipo)
+
+    def quitar(self, relacion_id):
+        arista = self.relaciones.pop(relacion_id, None)
+        if arista is None:
+            return
+        padre, hijo, _ = arista
+        for mapa, ticket in ((self.salientes, padre), (self.entrantes, hijo)):
+            vecinos = mapa.get(ticket)
+            if vecinos is not None:
+                vecinos.pop(relacion_id, None)
+                if not vecinos:
+                    del mapa[ticket]
+
+    def aplicar(self, cambio):
+        accion, relacion_id, *arista = cambio
+        if accion == 'alta':
+            self.agregar(relacion_id, *arista)
+        else:
+            self.quitar(relacion_id)
+
+    def vecinos(self, ticket_id, sentido, tipos):
+        mapa = self.entrantes if sentido == 'entrantes' else self.salientes
+        for otro, tipo in mapa.get(ticket_id, {}).values():
+            if tipo in tipos:
+                yield otro, tipo
+
+    def recorrer(self, origen, sentido, tipos=TIPOS_BLOQUEO, profundidad=None):
+        """
+        BFS desde ``origen``; retorna {ticket: (profundidad, anterior, tipo)}
+        sin incluir el origen. Los ciclos no se recorren dos veces.
+        """
+        visitados = {origen: (0, None, None)}
+        frontera = [origen]
+        nivel = 0
+        while frontera and (profundidad is None or nivel < profundidad):
+            nivel += 1
+            siguiente = []
+            for ticket in frontera:
+                for otro, tipo in self.vecinos(ticket, sentido, tipos):
+                    if otro not in visitados:
+                        visitados[otro] = (nivel, ticket, tipo)
+                        siguiente.append(otro)
+            frontera = siguiente
+        del visitados[origen]
+        return visitados
+
+    def ciclos(self, nodos=None, tipos=TIPOS_BLOQUEO):
+        """
+        Componentes fuertemente conexas con más de un ticket (o con una
+        relación consigo mismo), por Tarjan iterativo. ``nodos`` restringe
+        la búsqueda a ese subgrafo.
+        """
+        nodos = set(self.salientes) | set(self.entrantes) if nodos is None else set(nodos)
+        indices, bajos, en_pila, pila, resultado = {}, {}, set(), [], []
+        contador = 0
+        for raiz in nodos:
+            if raiz in indices:
+                continue
+            trabajo = [(raiz, None)]
+            while trabajo:
+                ticket, iterador = trabajo[-1]
+                if iterador is None:
+                    indices[ticket] = bajos[ticket] = contador
+                    contador += 1
+                    pila.append(ticket)
+                    en_pila.add(ticket)
+                    iterador = iter([otro for otro, _ in self.vecinos(ticket, 'salientes', tipos) if otro in nodos])
+                    trabajo[-1] = (ticket, iterador)
+                avanzo = False
+                for otro in iterador:
+                    if otro not in indices:
+                        trabajo.append((otro, None))
+                        avanzo = True
+                        break
+                    if otro in en_pila:
+                        bajos[ticket] = min(bajos[ticket], indices[otro])
+                if avanzo:
+                    continue
+                trabajo.pop()
+                if trabajo:
+                    anterior = trabajo[-1][0]
+                    bajos[anterior] = min(bajos[anterior], bajos[ticket])
+                if bajos[ticket] == indices[ticket]:
+                    componente = []
+                    while True:
+                        otro = pila.pop()
+                        en_pila.discard(otro)
+                        componente.append(otro)
+                        if otro == ticket:
+                            break
+                    lazo = any(o == ticket for o, _ in self.vecinos(ticket, 'salientes', tipos))
+                    if len(componente) > 1 or lazo:
+                        resultado.append(sorted(componente))
+        return resultado
+
+
+_local = None
+_lock = threading.Lock()
+
+
+def _version_compartida():
+    return leer_versiones([CLAVE_VERSION])[0]
+
+
+def _cargar(version):
+    nuevo = IndiceDependencias(version)
+    for arista in RelacionTicket.objects.values_list('id', 'ticket_padre_id', 'ticket_hijo_id', 'tipo_relacion'):
+        nuevo.agregar(*arista)
+    return nuevo
+
+
+def _sincronizar():
+    """Pone al día el índice del proceso (llamar con _lock tomado)"""
+    global _local
+    version = _version_compartida()
+    if _local is not None and _local.version == version:
+        return _local
+    if _local is not None and _local.version < version <= _local.version + MAX_CAMBIOS:
+        versiones = range(_local.version + 1, version + 1)
+        cambios = cache.get_many([_clave_cambio(v) for v in versiones])
+        if len(cambios) == len(versiones):
+            for v in versiones:
+                _local.aplicar(cambios[_clave_cambio(v)])
+            _local.version = version
+            return _local
+    # La versión se lee antes de la tabla: un cambio concurrente vuelve a aplicarse
+    _local = _cargar(version)
+    return _local
+
+
+def _publicar(cambio):
+    try:
+        version = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, nueva_version(), timeout=None)
+        version = cache.incr(CLAVE_VERSION)
+    cache.set(_clave_cambio(version), cambio, CAMBIO_TTL)
+
+
+def relacion_guardada(relacion):
+    cambio = ('alta', relacion.pk, relacion.ticket_padre_id, relacion.ticket_hijo_id, relacion.tipo_relacion)
+    transaction.on_commit(lambda: _publicar(cambio))
+
+
+def relacion_eliminada(relacion_id):
+    transaction.on_commit(lambda: _publicar(('baja', relacion_id)))
+
+
+def invalidar_grafo():
+    """Fuerza la recarga en todos los procesos (p. ej. tras cargas con bulk_create)"""
+    global _local
+    incrementar_version(CLAVE_VERSION)
+    with _lock:
+        _local = None
+
+
+def impacto(ticket_id, tipos=TIPOS_BLOQUEO, profundidad=None):
+    """
+    Tickets bloqueados por ``ticket_id`` directa o transitivamente:
+    ({ticket: (profundidad, bloqueado_por, tipo)}, ciclos del subárbol)
+    """
+    with _lock:
+        indice = _sincronizar()
+        bloqueados = indice.recorrer(ticket_id, 'entrantes', tipos, profundidad)
+        ciclos = indice.ciclos([ticket_id, *bloqueados], tipos)
+    return bloqueados, ciclos
+
+
+def dependencias(ticket_id, tipos=TIPOS_BLOQUEO, profundidad=None):
+    """Tickets de los que ``ticket_id`` depende directa o transitivamente"""
+    with _lock:
+        return _sincronizar().recorrer(ticket_id, 'salientes', tipos, profundidad)
+
+
+def crea_ciclo(padre, hijo, tipo, excluir=None):
+    """True si la relación padre -> hijo cerraría un ciclo de dependencias"""
+    if tipo not in TIPOS_BLOQUEO:
+        return False
+    if padre == hijo:
+        return True
+    with _lock:
+        indice = _sincronizar()
+        if excluir is not None and excluir in indice.relaciones:
+            # Al editar una relación se evalúa sin su arista actual
+            arista = indice.relaciones[excluir]
+            indice.quitar(excluir)
+            try:
+                return padre in indice.recorrer(hijo, 'salientes')
+            finally:
+                indice.agregar(excluir, *arista)
+        return padre in indice.recorrer(hijo, 'salientes')
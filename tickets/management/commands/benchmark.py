@@ -0,0 +1,174 @@
+"""
+Benchmark repetible de las vistas principales con el cliente de pruebas
+"""
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import resolve, reverse
+
+from tickets.middleware import RegistroConsultas, registro_actual
+from tickets.models import Ticket, Estado, Categoria, DataCenter
+from .generar_datos import USUARIO_BENCHMARK
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95) y consultas SQL de dashboard, listado, detalle '
+        'y alta/edición de tickets. Use --guardar/--comparar para detectar regresiones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=30)
+        parser.add_argument('--calentamiento', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--solo', nargs='*', help='Escenarios a ejecutar (por nombre)')
+        parser.add_argument('--guardar', help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento de p95 permitido al comparar (0.2 = 20%%)')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Permite ejecutar con DEBUG=False (nunca contra producción)')
+
+    def handle(self, *args, **options):
+        # Crea y borra tickets BENCH-*: igual que generar_datos, nunca en producción
+        if not settings.DEBUG and not options['forzar']:
+            raise CommandError('benchmark solo corre con DEBUG=True (o --forzar)')
+        self.rng = random.Random(options['semilla'])
+        if not Ticket.objects.exists():
+            raise CommandError('No hay tickets; ejecute primero generar_datos')
+
+        setup_test_environment()
+        try:
+            self.client = self._cliente()
+            resultados = {}
+            for nombre, escenario in self._escenarios():
+                if options['solo'] and nombre not in options['solo']:
+                    continue
+                for _ in range(options['calentamiento']):
+                    escenario()
+                resultados[nombre] = self._medir(escenario, options['iteraciones'])
+                self._imprimir(nombre, resultados[nombre])
+        finally:
+            Ticket.objects.filter(codigo__startswith='BENCH-').delete()
+            teardown_test_environment()
+
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2)
+        if options['comparar']:
+            self._comparar(resultados, options['comparar'], options['tolerancia'])
+
+    def _cliente(self):
+        User = get_user_model()
+        usuario, _ = User.objects.get_or_create(
+            username='benchmark', defaults={'email': USUARIO_BENCHMARK, 'is_staff': True}
+        )
+        client = Client()
+        client.force_login(usuario)
+        return client
+
+    def _escenarios(self):
+        rango = Ticket.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+        ids = list(Ticket.objects.filter(
+            id__in=[self.rng.randint(rango['minimo'], rango['maximo']) for _ in range(400)]
+        ).values_list('id', flat=True)) or [rango['minimo']]
+        creados = []
+        estados = list(Estado.objects.values_list('id', flat=True))
+        categorias = list(Categoria.objects.values_list('id', flat=True))
+        dcs = list(DataCenter.objects.values_list('id', flat=True))
+        contador = iter(range(10 ** 9))
+        rng = self.rng
+
+        def get(url, **params):
+            response = self.client.get(url, params)
+            if response.status_code != 200:
+                raise CommandError(f'{url} respondió {response.status_code}')
+            if hasattr(response, 'streaming_content'):
+                for _ in response.streaming_content:
+                    pass
+
+        def datos_ticket(codigo):
+            return {
+                'codigo': codigo, 'titulo': 'Ticket de benchmark', 'descripcion': 'carga sintética',
+                'prioridad': 'Media', 'estado': rng.choice(estados), 'categoria': rng.choice(categorias),
+                'dc': rng.choice(dcs), 'fecha_inicio': '2026-01-01',
+            }
+
+        def crear():
+            codigo = f'BENCH-{next(contador):08d}'
+            response = self.client.post(reverse('ticket_create'), datos_ticket(codigo))
+            if response.status_code != 302:
+                raise CommandError(f'Alta de ticket falló ({response.status_code})')
+            creados.append((resolve(response.url).kwargs['pk'], codigo))
+
+        def editar():
+            if not creados:
+                return crear()
+            pk, codigo = rng.choice(creados)
+            response = self.client.post(reverse('ticket_update', args=[pk]), datos_ticket(codigo))
+            if response.status_code != 302:
+                raise CommandError(f'Edición de ticket falló ({response.status_code})')
+
+        return [
+            ('dashboard', lambda: get(reverse('dashboard'))),
+            ('dashboard_tabla', lambda: get(reverse('dashboard_tickets'), sort='fecha', dir='desc')),
+            ('listado', lambda: get(reverse('ticket_list'))),
+            ('listado_filtrado', lambda: get(reverse('ticket_list'), estado=rng.choice(estados))),
+            ('listado_busqueda', lambda: get(reverse('ticket_list'), q=rng.choice(['caida enlace', 'cpu', 'bgp']))),
+            ('detalle', lambda: get(reverse('ticket_detail', args=[rng.choice(ids)]))),
+            ('alta', crear),
+            ('edicion', editar),
+        ]
+
+    def _medir(self, escenario, iteraciones):
+        tiempos, consultas = [], []
+        for _ in range(iteraciones):
+            # Cuenta las consultas de todos los hilos del request (en_paralelo
+            # usa conexiones propias): el registro de cada request suma al nuestro
+            registro = RegistroConsultas()
+            token = registro_actual.set(registro)
+            try:
+                inicio = time.perf_counter()
+                escenario()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                registro_actual.reset(token)
+            consultas.append(registro.total)
+        tiempos.sort()
+        return {
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+            'max_ms': round(tiempos[-1], 2),
+            'consultas_p50': statistics.median(consultas),
+            'consultas_max': max(consultas),
+        }
+
+    def _imprimir(self, nombre, r):
+        self.stdout.write(
+            f'{nombre:<18} p50 {r["p50_ms"]:>9.2f} ms   p95 {r["p95_ms"]:>9.2f} ms   '
+            f'consultas {r["consultas_p50"]:>5} (máx {r["consultas_max"]})'
+        )
+
+    def _comparar(self, resultados, ruta, tolerancia):
+        with open(ruta, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+        regresiones = []
+        for nombre, actual in resultados.items():
+            previo = anterior.get(nombre)
+            if not previo:
+                continue
+            if actual['p95_ms'] > previo['p95_ms'] * (1 + tolerancia):
+                regresiones.append(f'{nombre}: p95 {previo["p95_ms"]} -> {actual["p95_ms"]} ms')
+            if actual['consultas_max'] > previo['consultas_max']:
+                regresiones.append(f'{nombre}: consultas {previo["consultas_max"]} -> {actual["consultas_max"]}')
+        if regresiones:
+            raise CommandError('Regresiones detectadas:\n  ' + '\n  '.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a ' + ruta))
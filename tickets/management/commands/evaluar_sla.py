@@ -0,0 +1,28 @@
+"""
+Evalúa los SLA abiertos y publica el pronóstico de incumplimiento
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.sla import evaluar_sla
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la tabla sla_evaluacion (tiempo transcurrido, restante y '
+        'probabilidad de incumplir) y el resumen del dashboard. Pensado para '
+        'ejecutarse periódicamente (cron o CronJob de Kubernetes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por lote de inserción')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        resumen = evaluar_sla(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"SLA evaluados en {time.monotonic() - inicio:.1f}s: "
+            f"{resumen['vencido']} vencidos, {resumen['critico']} críticos, "
+            f"{resumen['riesgo']} en riesgo, {resumen['ok']} en plazo"
+        ))
@@ -0,0 +1,292 @@
+"""
+Genera un dataset sintético con volúmenes y distribuciones realistas
+para medir rendimiento en una base local (SQLite o MariaDB de pruebas)
+"""
+import importlib
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tickets.fragmentos import invalidar_fragmentos
+from tickets.grafo import invalidar_grafo
+from tickets.stats import invalidar_estadisticas
+from tickets.models import (
+    Rol, Usuario, Estado, Categoria, Proveedor, DataCenter, Elemento, Ticket,
+    Observacion, EstadoHistorico, SlaControl, RelacionTicket, Auditoria,
+)
+
+
+# Volúmenes con --escala 1
+VOLUMENES = {
+    'tickets': 200_000,
+    'observaciones': 2_000_000,
+    'historial': 1_000_000,
+    'auditoria': 5_000_000,
+    'elementos': 20_000,
+    'usuarios': 300,
+}
+
+ROLES = ['Super Admin', 'Administrador', 'Operador', 'Visor']
+ESTADOS = [('Pendiente', 25), ('En Proceso', 15), ('Cerrado', 60)]
+CATEGORIAS = ['Incidente', 'Requerimiento', 'Proyecto', 'Cambio', 'Problema', 'Consulta']
+PROVEEDORES = ['HPE', 'NTT', 'RedHat', 'DELL']
+DATA_CENTERS = [('DCL', 'Santiago'), ('DCC', 'Concepción'), ('DCANTF', 'Antofagasta'), ('DCCHI', 'Chillán')]
+PRIORIDADES = [('Baja', 30), ('Media', 45), ('Alta', 18), ('Crítica', 7)]
+PALABRAS = (
+    'caida enlace servicio nodo degradado latencia perdida paquetes cpu memoria disco '
+    'alarma reinicio firmware parche certificado vencido backup replica storage switch '
+    'puerto interfaz bgp ospf vlan cluster failover sosreport log kernel timeout dns'
+).split()
+
+USUARIO_BENCHMARK = 'bench@sigmaops.local'
+
+MIGRACIONES_INDICES = [
+    '0003_indices_autocompletar', '0004_indice_observaciones_fecha', '0007_indice_auditoria_fecha',
+    '0009_indice_adjuntos_ruta',
+]
+
+
+def _pesos_zipf(n, s=1.1):
+    """Pesos acumulados de una distribución Zipf sobre n elementos"""
+    return list(itertools.accumulate(1 / (i + 1) ** s for i in range(n)))
+
+
+@contextmanager
+def _fechas_manuales(*campos):
+    """Desactiva auto_now_add para poder cargar fechas históricas"""
+    originales = [(campo, campo.auto_now_add) for campo in campos]
+    for campo, _ in originales:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, valor in originales:
+            campo.auto_now_add = valor
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera tickets, observaciones, historial y auditoría sintéticos con '
+        'distribuciones sesgadas (ver VOLUMENES; --escala 1 = volumen completo)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=0.01, help='Fracción de VOLUMENES a generar')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--crear-tablas', action='store_true',
+                            help='Crea las tablas no administradas (managed = False) si no existen')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Permite ejecutar con DEBUG=False (nunca contra producción)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forzar']:
+            raise CommandError('generar_datos solo corre con DEBUG=True (o --forzar)')
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.vol = {k: max(1, int(v * options['escala'])) for k, v in VOLUMENES.items()}
+        self.ahora = timezone.now()
+
+        if options['crear_tablas']:
+            self._crear_tablas()
+
+        inicio = time.monotonic()
+        self._catalogos()
+        self._tickets()
+        self._sla_y_relaciones()
+        self._observaciones()
+        self._historial()
+        self._auditoria()
+        invalidar_estadisticas()
+        invalidar_fragmentos()
+        invalidar_grafo()
+        self.stdout.write(self.style.SUCCESS(
+            f'Dataset generado en {time.monotonic() - inicio:.1f}s '
+            '(ejecute reindexar_busqueda para el índice de búsqueda)'
+        ))
+
+    def _crear_tablas(self):
+        existentes = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for modelo in apps.get_app_config('tickets').get_models():
+                if not modelo._meta.managed and modelo._meta.db_table not in existentes:
+                    editor.create_model(modelo)
+                    self.stdout.write(f'Tabla creada: {modelo._meta.db_table}')
+            # Índices SQL de las migraciones sobre tablas no administradas
+            for migracion in MIGRACIONES_INDICES:
+                importlib.import_module(f'tickets.migrations.{migracion}').crear_indices(apps, editor)
+
+    def _insertar(self, modelo, filas, total, etiqueta):
+        """bulk_create por lotes desde un generador, con progreso"""
+        creados = 0
+        while True:
+            lote = list(itertools.islice(filas, self.lote))
+            if not lote:
+                break
+            with transaction.atomic():
+                modelo.objects.bulk_create(lote, batch_size=self.lote)
+            creados += len(lote)
+            self.stdout.write(f'\r{etiqueta}: {creados}/{total}', ending='')
+        self.stdout.write('')
+
+    def _catalogos(self):
+        roles = {r: Rol.objects.get_or_create(nombre=r)[0] for r in ROLES}
+        self.estados = [(Estado.objects.get_or_create(nombre=n)[0].pk, p) for n, p in ESTADOS]
+        self.categorias = [Categoria.objects.get_or_create(nombre=n)[0].pk for n in CATEGORIAS]
+        self.proveedores = [Proveedor.objects.get_or_create(nombre=n)[0].pk for n in PROVEEDORES]
+        self.data_centers = [
+            DataCenter.objects.get_or_create(nombre=n, defaults={'ubicacion': u})[0].pk
+            for n, u in DATA_CENTERS
+        ]
+
+        Usuario.objects.get_or_create(
+            correo=USUARIO_BENCHMARK,
+            defaults={'nombre': 'Benchmark', 'password_hash': '!', 'rol': roles['Super Admin']},
+        )
+        existentes = Usuario.objects.filter(correo__startswith='syn').count()
+        pesos_rol = [roles['Operador']] * 8 + [roles['Visor']] * 3 + [roles['Administrador']]
+        self._insertar(Usuario, (
+            Usuario(nombre=f'Operador {i}', correo=f'syn{i}@sigmaops.local',
+                    password_hash='!', rol=self.rng.choice(pesos_rol))
+            for i in range(existentes, self.vol['usuarios'])
+        ), self.vol['usuarios'], 'Usuarios')
+        self.usuarios = list(Usuario.objects.values_list('id', flat=True))
+
+        tipos = [t for t, _ in Elemento.TIPO_CHOICES]
+        existentes = Elemento.objects.filter(nombre__startswith='syn-').count()
+        self._insertar(Elemento, (
+            Elemento(nombre=f'syn-{tipos[i % len(tipos)].lower()}-{i:06d}', tipo=tipos[i % len(tipos)])
+            for i in range(existentes, self.vol['elementos'])
+        ), self.vol['elementos'], 'Elementos')
+        self.elementos = list(Elemento.objects.values_list('id', flat=True).order_by('id'))
+
+    def _texto(self, minimo, maximo):
+        return ' '.join(self.rng.choices(PALABRAS, k=self.rng.randint(minimo, maximo)))
+
+    def _tickets(self):
+        rng = self.rng
+        base = Ticket.objects.filter(codigo__startswith='SYN-').count()
+        total = self.vol['tickets']
+        cum_categorias = _pesos_zipf(len(self.categorias))
+        cum_elementos = _pesos_zipf(len(self.elementos))
+        estados, pesos_estado = zip(*self.estados)
+        prioridades, pesos_prioridad = zip(*PRIORIDADES)
+        hoy = date.today()
+        cerrado = self.estados[-1][0]
+
+        def filas():
+            for i in range(base, total):
+                inicio = hoy - timedelta(days=int(rng.expovariate(1 / 180)) % 730)
+                estado = rng.choices(estados, pesos_estado)[0]
+                cierre = None
+                if estado == cerrado:
+                    cierre = min(hoy, inicio + timedelta(days=int(rng.expovariate(1 / 5))))
+                yield Ticket(
+                    codigo=f'SYN-{i:08d}',
+                    titulo=self._texto(3, 8).capitalize(),
+                    descripcion=self._texto(20, 120),
+                    prioridad=rng.choices(prioridades, pesos_prioridad)[0],
+                    estado_id=estado,
+                    categoria_id=rng.choices(self.categorias, cum_weights=cum_categorias)[0],
+                    proveedor_id=rng.choice(self.proveedores) if rng.random() < 0.7 else None,
+                    elemento_id=rng.choices(self.elementos, cum_weights=cum_elementos)[0],
+                    dc_id=rng.choice(self.data_centers),
+                    fecha_inicio=inicio,
+                    fecha_actualizacion=cierre or inicio,
+                    fecha_cierre=cierre,
+                    usuario_creador_id=rng.choice(self.usuarios),
+                    usuario_asignado_id=rng.choice(self.usuarios) if rng.random() < 0.8 else None,
+                )
+
+        self._insertar(Ticket, filas(), total, 'Tickets')
+        self.tickets = list(
+            Ticket.objects.filter(codigo__startswith='SYN-').order_by('id').values_list('id', 'fecha_inicio')
+        )
+        # Pocos tickets concentran la mayor parte del seguimiento (incidentes largos)
+        self.cum_tickets = _pesos_zipf(len(self.tickets), s=0.8)
+
+    def _momento(self, dia):
+        inicio = datetime.combine(dia or date.today(), datetime.min.time(), tzinfo=self.ahora.tzinfo)
+        return min(self.ahora, inicio + timedelta(minutes=self.rng.randint(0, 60 * 24 * 20)))
+
+    def _ticket_sesgado(self):
+        return self.rng.choices(self.tickets, cum_weights=self.cum_tickets)[0]
+
+    def _sla_y_relaciones(self):
+        rng = self.rng
+        if not SlaControl.objects.filter(ticket_id=self.tickets[0][0]).exists():
+            with _fechas_manuales(SlaControl._meta.get_field('fecha_creacion')):
+                self._insertar(SlaControl, (
+                    SlaControl(
+                        ticket_id=pk, fecha_creacion=self._momento(dia),
+                        tiempo_objetivo_horas=rng.choice([4, 8, 24, 48, 72]),
+                    )
+                    for pk, dia in self.tickets
+                ), len(self.tickets), 'SLA')
+
+        tipos = [t for t, _ in RelacionTicket.TIPO_CHOICES]
+        n = len(self.tickets) // 50
+        self._insertar(RelacionTicket, (
+            RelacionTicket(
+                ticket_padre_id=self._ticket_sesgado()[0],
+                ticket_hijo_id=rng.choice(self.tickets)[0],
+                tipo_relacion=rng.choice(tipos),
+            )
+            for _ in range(n)
+        ), n, 'Relaciones')
+
+    def _observaciones(self):
+        rng = self.rng
+        tipos = [t for t, _ in Observacion.TIPO_CHOICES]
+        total = self.vol['observaciones']
+        with _fechas_manuales(Observacion._meta.get_field('fecha')):
+            def filas():
+                for _ in range(total):
+                    pk, dia = self._ticket_sesgado()
+                    yield Observacion(
+                        ticket_id=pk, usuario_id=rng.choice(self.usuarios),
+                        comentario=self._texto(5, 60), tipo=rng.choice(tipos),
+                        fecha=self._momento(dia),
+                    )
+            self._insertar(Observacion, filas(), total, 'Observaciones')
+
+    def _historial(self):
+        rng = self.rng
+        estados = [pk for pk, _ in self.estados]
+        total = self.vol['historial']
+        with _fechas_manuales(EstadoHistorico._meta.get_field('fecha_cambio')):
+            def filas():
+                for _ in range(total):
+                    pk, dia = self._ticket_sesgado()
+                    yield EstadoHistorico(
+                        ticket_id=pk, estado_id=rng.choice(estados),
+                        fecha_cambio=self._momento(dia), usuario_id=rng.choice(self.usuarios),
+                    )
+            self._insertar(EstadoHistorico, filas(), total, 'Historial')
+
+    def _auditoria(self):
+        rng = self.rng
+        entidades = [('tickets', 50), ('observaciones', 30), ('asignaciones', 10), ('usuarios', 10)]
+        nombres, pesos = zip(*entidades)
+        acciones = [('UPDATE', 55), ('INSERT', 30), ('LOGIN', 8), ('LOGOUT', 5), ('DELETE', 2)]
+        tipos_accion, pesos_accion = zip(*acciones)
+        total = self.vol['auditoria']
+        with _fechas_manuales(Auditoria._meta.get_field('fecha')):
+            def filas():
+                for _ in range(total):
+                    pk, dia = self._ticket_sesgado()
+                    yield Auditoria(
+                        entidad=rng.choices(nombres, pesos)[0],
+                        accion=rng.choices(tipos_accion, pesos_accion)[0],
+                        entidad_id=pk, usuario_id=rng.choice(self.usuarios),
+                        fecha=self._momento(dia),
+                    )
+            self._insertar(Auditoria, filas(), total, 'Auditoría')
@@ -0,0 +1,238 @@
+"""
+Importación masiva de tickets desde CSV o JSONL (migraciones desde proveedores)
+"""
+import codecs
+import csv
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from tickets.models import (
+    Ticket, Estado, Categoria, Proveedor, Elemento, DataCenter, Usuario
+)
+from tickets.search import indexar_tickets
+from tickets.similitud import indexar_similitudes
+from tickets.fragmentos import invalidar_fragmentos
+from tickets.stats import invalidar_estadisticas
+
+
+# Columna del archivo -> (campo FK del ticket, modelo, campo de búsqueda)
+REFERENCIAS = {
+    'estado': ('estado_id', Estado, 'nombre'),
+    'categoria': ('categoria_id', Categoria, 'nombre'),
+    'proveedor': ('proveedor_id', Proveedor, 'nombre'),
+    'elemento': ('elemento_id', Elemento, 'nombre'),
+    'dc': ('dc_id', DataCenter, 'nombre'),
+    'usuario_creador': ('usuario_creador_id', Usuario, 'correo'),
+    'usuario_asignado': ('usuario_asignado_id', Usuario, 'correo'),
+}
+
+CAMPOS_FECHA = ('fecha_inicio', 'fecha_actualizacion', 'fecha_cierre')
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+PRIORIDADES = {p.casefold(): p for p, _ in Ticket.PRIORIDAD_CHOICES}
+
+# Campos que se actualizan cuando el código ya existe (solo los que trae el
+# archivo: una columna ausente conserva el valor guardado)
+CAMPOS_UPSERT = [
+    'titulo', 'descripcion', 'prioridad', 'estado', 'categoria', 'proveedor',
+    'elemento', 'dc', 'fecha_inicio', 'fecha_actualizacion', 'fecha_cierre',
+    'usuario_creador', 'usuario_asignado',
+]
+
+
+class ErrorFila(ValueError):
+    """Fila con datos inválidos; se informa y se omite"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa tickets desde un archivo CSV o JSONL en lotes, '
+        'actualizando los existentes por código'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .jsonl')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto según la extensión')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por bulk_create')
+        parser.add_argument('--delimitador', default=',', help='Separador de columnas del CSV')
+        parser.add_argument('--encoding', default='utf-8-sig',
+                            help='Codificación del archivo (p. ej. latin-1, cp1252); por defecto UTF-8')
+        parser.add_argument('--errores', help='Archivo CSV donde escribir las filas rechazadas')
+        parser.add_argument('--dry-run', action='store_true', help='Valida sin escribir en la base de datos')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}')
+        formato = options['formato'] or ('jsonl' if ruta.suffix in ('.jsonl', '.ndjson') else 'csv')
+        self.lote = options['lote']
+        self.dry_run = options['dry_run']
+        self.caches = {}
+        try:
+            codecs.lookup(options['encoding'])
+        except LookupError:
+            raise CommandError(f'Codificación desconocida: {options["encoding"]}')
+
+        reporte = None
+        if options['errores']:
+            reporte_archivo = open(options['errores'], 'w', newline='', encoding='utf-8')
+            reporte = csv.writer(reporte_archivo)
+            reporte.writerow(['linea', 'codigo', 'error'])
+
+        procesadas = importadas = errores = 0
+        pendientes = {}
+        inicio = time.monotonic()
+        try:
+            with open(ruta, newline='', encoding=options['encoding']) as archivo:
+                for linea, fila in self._leer(archivo, formato, options['delimitador']):
+                    procesadas += 1
+                    try:
+                        ticket, campos = self._construir(fila)
+                    except ErrorFila as exc:
+                        errores += 1
+                        if reporte:
+                            reporte.writerow([linea, (fila or {}).get('codigo', ''), str(exc)])
+                        continue
+                    # Un código repetido dentro del lote conserva la última fila
+                    pendientes[ticket.codigo] = (ticket, campos)
+                    if len(pendientes) >= self.lote:
+                        importadas += self._guardar(pendientes.values())
+                        pendientes = {}
+                        self._progreso(procesadas, importadas, errores, inicio)
+                if pendientes:
+                    importadas += self._guardar(pendientes.values())
+        except UnicodeDecodeError as exc:
+            raise CommandError(
+                f'El archivo no está en {options["encoding"]} ({exc.reason} en el byte {exc.start}); '
+                'indicar la codificación con --encoding'
+            )
+        finally:
+            if reporte:
+                reporte_archivo.close()
+
+        if not self.dry_run:
+            invalidar_estadisticas()
+            invalidar_fragmentos()
+        self._progreso(procesadas, importadas, errores, inicio)
+        estilo = self.style.SUCCESS if not errores else self.style.WARNING
+        self.stdout.write(estilo(
+            f'Importación {"simulada " if self.dry_run else ""}finalizada: '
+            f'{importadas} tickets, {errores} filas con error'
+        ))
+
+    def _leer(self, archivo, formato, delimitador):
+        """Genera (número de línea, dict) sin cargar el archivo en memoria"""
+        if formato == 'csv':
+            lector = csv.DictReader(archivo, delimiter=delimitador)
+            for fila in lector:
+                yield lector.line_num, fila
+            return
+        for linea, texto in enumerate(archivo, 1):
+            if not texto.strip():
+                continue
+            try:
+                fila = json.loads(texto)
+            except ValueError:
+                fila = None
+            if not isinstance(fila, dict):
+                fila = {'__error__': 'JSON inválido'}
+            yield linea, fila
+
+    def _resolver(self, columna, valor):
+        """Id de la referencia por nombre/correo usando un cache en memoria"""
+        campo, modelo, buscar = REFERENCIAS[columna]
+        clave_cache = (modelo, buscar)
+        if clave_cache not in self.caches:
+            cache = {}
+            for nombre, pk in modelo.objects.values_list(buscar, 'id').order_by('-id').iterator():
+                cache[str(nombre).strip().casefold()] = pk
+            self.caches[clave_cache] = cache
+        pk = self.caches[clave_cache].get(valor.casefold())
+        if pk is None:
+            raise ErrorFila(f'{columna} "{valor}" no existe')
+        return campo, pk
+
+    def _construir(self, fila):
+        """
+        Valida la fila y arma la instancia de Ticket (sin guardar) junto con
+        los campos de CAMPOS_UPSERT que trae la fila
+        """
+        if fila.get('__error__'):
+            raise ErrorFila(fila['__error__'])
+        datos = {k.strip(): (str(v).strip() if v is not None else '') for k, v in fila.items() if k}
+
+        codigo = datos.get('codigo', '')
+        titulo = datos.get('titulo', '')
+        if not codigo:
+            raise ErrorFila('codigo es obligatorio')
+        if not titulo:
+            raise ErrorFila('titulo es obligatorio')
+        if len(codigo) > 50 or len(titulo) > 255:
+            raise ErrorFila('codigo o titulo excede el largo permitido')
+        if not datos.get('estado'):
+            raise ErrorFila('estado es obligatorio')
+
+        prioridad = PRIORIDADES.get(datos.get('prioridad', '').casefold() or 'media')
+        if prioridad is None:
+            raise ErrorFila(f'prioridad "{datos["prioridad"]}" no es válida')
+
+        valores = {
+            'codigo': codigo,
+            'titulo': titulo,
+            'descripcion': datos.get('descripcion') or None,
+            'prioridad': prioridad,
+        }
+        for columna in REFERENCIAS:
+            if datos.get(columna):
+                campo, pk = self._resolver(columna, datos[columna])
+                valores[campo] = pk
+        for campo in CAMPOS_FECHA:
+            if datos.get(campo):
+                valores[campo] = self._fecha(campo, datos[campo])
+        return Ticket(**valores), tuple(campo for campo in CAMPOS_UPSERT if campo in datos)
+
+    def _fecha(self, campo, texto):
+        for formato in FORMATOS_FECHA:
+            try:
+                return datetime.strptime(texto[:10], formato).date()
+            except ValueError:
+                continue
+        raise ErrorFila(f'{campo} "{texto}" no es una fecha válida')
+
+    def _guardar(self, pendientes):
+        """
+        bulk_create con upsert por código e indexación del lote (búsqueda y
+        bandas de duplicados). Las filas se agrupan por columnas presentes (en
+        un CSV, una sola vez: el encabezado)
+        """
+        grupos = {}
+        for ticket, campos in pendientes:
+            grupos.setdefault(campos, []).append(ticket)
+        tickets = [ticket for grupo in grupos.values() for ticket in grupo]
+        if self.dry_run:
+            return len(tickets)
+        with transaction.atomic():
+            for campos, grupo in grupos.items():
+                opciones = {'update_conflicts': True, 'update_fields': list(campos)}
+                if connection.features.supports_update_conflicts_with_target:
+                    opciones['unique_fields'] = ['codigo']
+                Ticket.objects.bulk_create(grupo, batch_size=self.lote, **opciones)
+            # Ids y valores guardados (un upsert conserva las columnas ausentes)
+            guardados = list(
+                Ticket.objects.filter(codigo__in=[t.codigo for t in tickets])
+                .only('id', 'codigo', 'titulo', 'descripcion', 'estado')
+            )
+            indexar_tickets(guardados)
+            indexar_similitudes(guardados, self.lote)
+        return len(tickets)
+
+    def _progreso(self, procesadas, importadas, errores, inicio):
+        segundos = max(time.monotonic() - inicio, 0.001)
+        self.stdout.write(
+            f'Procesadas {procesadas} filas ({procesadas / segundos:.0f}/s): '
+            f'{importadas} importadas, {errores} con error'
+        )
@@ -0,0 +1,30 @@
+"""
+Actualiza los rollups diarios de tiempo en estado y MTTR
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.rollups import procesar_historial, reiniciar_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa el historial de estados nuevo desde la última marca y suma '
+        'tiempos en estado y resoluciones en las tablas rollup diarias'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Filas de historial por transacción')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Vacía los rollups y reprocesa todo el historial')
+
+    def handle(self, *args, **options):
+        if options['reiniciar']:
+            reiniciar_rollups()
+            self.stdout.write('Rollups reiniciados')
+        inicio = time.monotonic()
+        procesadas = procesar_historial(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Historial procesado: {procesadas} filas en {time.monotonic() - inicio:.1f}s'
+        ))
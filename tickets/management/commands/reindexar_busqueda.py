@@ -0,0 +1,67 @@
+"""
+Reconstruye el índice de búsqueda de tickets y observaciones y las bandas
+de similitud para sugerir duplicados
+"""
+from django.core.management.base import BaseCommand
+
+from tickets.models import BandaSimilitud, IndiceBusqueda, Observacion, Ticket
+from tickets.search import pesos_observacion, pesos_ticket
+from tickets.similitud import indexar_similitudes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda (indice_busqueda) y de duplicados (banda_similitud) desde cero'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por lote de lectura e inserción')
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        self.pendientes = []
+        IndiceBusqueda.objects.all().delete()
+
+        tickets = Ticket.objects.only('id', 'codigo', 'titulo', 'descripcion').order_by()
+        total = 0
+        for ticket in tickets.iterator(chunk_size=self.lote):
+            self._agregar(
+                IndiceBusqueda(termino=termino, ticket_id=ticket.pk, peso=peso)
+                for termino, peso in pesos_ticket(ticket).items()
+            )
+            total += 1
+        self.stdout.write(f'Tickets indexados: {total}')
+
+        observaciones = Observacion.objects.values_list('id', 'ticket_id', 'comentario').order_by()
+        total = 0
+        for obs_id, ticket_id, comentario in observaciones.iterator(chunk_size=self.lote):
+            self._agregar(
+                IndiceBusqueda(termino=termino, ticket_id=ticket_id, observacion_id=obs_id, peso=peso)
+                for termino, peso in pesos_observacion(comentario).items()
+            )
+            total += 1
+        self._volcar()
+        self.stdout.write(f'Observaciones indexadas: {total}')
+
+        BandaSimilitud.objects.all().delete()
+        total = 0
+        lote = []
+        for ticket in Ticket.objects.only('id', 'titulo', 'descripcion', 'estado').order_by().iterator(
+            chunk_size=self.lote
+        ):
+            lote.append(ticket)
+            if len(lote) >= self.lote:
+                indexar_similitudes(lote, self.lote)
+                total += len(lote)
+                lote = []
+        indexar_similitudes(lote, self.lote)
+        self.stdout.write(f'Tickets revisados para duplicados: {total + len(lote)}')
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido'))
+
+    def _agregar(self, registros):
+        self.pendientes.extend(registros)
+        if len(self.pendientes) >= self.lote:
+            self._volcar()
+
+    def _volcar(self):
+        if self.pendientes:
+            IndiceBusqueda.objects.bulk_create(self.pendientes, batch_size=self.lote)
+            self.pendientes = []
@@ -0,0 +1,45 @@
+"""
+Aplica la retención mensual de la tabla auditoria
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets import retencion
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los meses fuera de la ventana caliente (AUDIT_HOT_MONTHS) a tablas '
+        'auditoria_AAAAMM y exporta a JSONL comprimido los que superan '
+        'AUDIT_RETENTION_MONTHS. En MySQL/MariaDB usa particiones mensuales si '
+        'la tabla está particionada (--particionar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por transacción al copiar')
+        parser.add_argument('--directorio', help='Directorio de los JSONL (por defecto AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--particionar', action='store_true',
+                            help='Convierte la tabla auditoria a particiones mensuales (MySQL/MariaDB, '
+                                 'bloquea la tabla y elimina su clave foránea a usuarios)')
+
+    def handle(self, *args, **options):
+        if options['particionar']:
+            try:
+                convertida = retencion.particionar()
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write('Tabla auditoria particionada por mes' if convertida
+                              else 'La tabla auditoria ya estaba particionada')
+
+        inicio = time.monotonic()
+        resultado = retencion.aplicar_retencion(directorio=options['directorio'], lote=options['lote'])
+        for mes in resultado['particiones']:
+            self.stdout.write(f'Partición creada: {mes:%Y-%m}')
+        for mes, filas in resultado['archivados'].items():
+            self.stdout.write(f'Archivado {mes:%Y-%m}: {filas} eventos en {retencion.tabla_mes(mes)}')
+        for mes, ruta in resultado['exportados'].items():
+            self.stdout.write(f'Exportado {mes:%Y-%m}: {ruta}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Retención de auditoría aplicada en {time.monotonic() - inicio:.1f}s'
+        ))
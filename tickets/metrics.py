@@ -0,0 +1,332 @@
+"""
+Métricas del proceso en formato de texto de Prometheus.
+
+Registro mínimo de contadores e histogramas con etiquetas, sin dependencias
+externas. Con METRICS_DIR cada worker vuelca sus valores a un archivo propio
+en ese directorio y /metrics suma los de todos los workers del pod, así el
+scraping (que llega a un worker cualquiera) ve el total. Los archivos de
+workers terminados se conservan para que los contadores no retrocedan; los
+medidores se exponen por worker (etiqueta ``worker``) y solo de los vivos.
+
+/metrics exige el token METRICS_TOKEN o una IP de METRICS_ALLOWED_NETWORKS
+sin pasar por el proxy (sin X-Forwarded-For); si no hay ninguno, responde 403.
+"""
+import atexit
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_registro = []
+_LE_INF = 'le="+Inf"'
+
+
+def _etiquetas(nombres, valores, extra=''):
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monótono con etiquetas"""
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores):
+        return self._valores.get(valores, 0)
+
+    def estado(self):
+        with self._lock:
+            return [[list(valores), total] for valores, total in self._valores.items()]
+
+    def muestras(self, estados=None):
+        totales = {}
+        for estado in (estados or {None: self.estado()}).values():
+            for valores, total in estado:
+                totales[tuple(valores)] = totales.get(tuple(valores), 0) + total
+        for valores, total in totales.items():
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(total)}'
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos y etiquetas"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def observe(self, *valores, valor):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(self.buckets), 0, 0]
+            conteos = serie[0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    conteos[i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def estado(self):
+        with self._lock:
+            return [[list(valores), [list(v[0]), v[1], v[2]]] for valores, v in self._series.items()]
+
+    def muestras(self, estados=None):
+        series = {}
+        for estado in (estados or {None: self.estado()}).values():
+            for valores, (conteos, suma, total) in estado:
+                serie = series.setdefault(tuple(valores), [[0] * len(self.buckets), 0, 0])
+                serie[0] = [a + b for a, b in zip(serie[0], conteos)]
+                serie[1] += suma
+                serie[2] += total
+        for valores, (conteos, suma, total) in series.items():
+            for limite, conteo in zip(self.buckets, conteos):
+                le = 'le="%s"' % _numero(limite)
+                yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {conteo}'
+            yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, _LE_INF)} {total}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(suma)}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {total}'
+
+
+class Medidor:
+    """
+    Valor instantáneo leído de una función al exponer. Con etiquetas, la
+    función retorna {(valores de las etiquetas): valor}
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, funcion, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.etiquetas = tuple(etiquetas)
+        _registro.append(self)
+
+    def estado(self):
+        if not self.etiquetas:
+            return [[[], self.funcion()]]
+        return [[list(valores), valor] for valores, valor in self.funcion().items()]
+
+    def muestras(self, estados=None):
+        if estados is None:
+            for valores, valor in self.estado():
+                yield f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(valor)}'
+            return
+        etiquetas = (*self.etiquetas, 'worker')
+        for worker, estado in estados.items():
+            for valores, valor in estado:
+                yield f'{self.nombre}{_etiquetas(etiquetas, (*valores, worker))} {_numero(valor)}'
+
+
+def _directorio():
+    directorio = getattr(settings, 'METRICS_DIR', '')
+    return Path(directorio) if directorio else None
+
+
+_proceso = {}
+
+
+def _archivo_propio(directorio):
+    """Archivo del proceso actual (pid y arranque: un pid reutilizado no pisa al anterior)"""
+    pid = os.getpid()
+    if _proceso.get('pid') != pid:
+        _proceso.update(pid=pid, archivo=f'{pid}-{time.time_ns()}.json')
+    return directorio / _proceso['archivo']
+
+
+def volcar():
+    """Escribe los valores del proceso en su archivo de METRICS_DIR"""
+    directorio = _directorio()
+    if directorio is None:
+        return
+    archivo = _archivo_propio(directorio)
+    temporal = archivo.with_suffix('.tmp')
+    temporal.write_text(json.dumps({m.nombre: m.estado() for m in _registro}))
+    os.replace(temporal, archivo)
+
+
+def _volcar_periodicamente(intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            volcar()
+        except OSError:
+            pass
+
+
+def iniciar_volcado():
+    """
+    Inicia el volcado periódico del proceso (una vez por worker; lo llama
+    InstrumentacionMiddleware al cargarse). Sin METRICS_DIR no hace nada.
+    """
+    if _directorio() is None or _proceso.get('volcado') == os.getpid():
+        return
+    _archivo_propio(_directorio())
+    _proceso['volcado'] = os.getpid()
+    intervalo = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+    threading.Thread(target=_volcar_periodicamente, args=(intervalo,), daemon=True,
+                     name='metricas-volcado').start()
+    atexit.register(volcar)
+
+
+def _estados_workers(directorio):
+    """
+    {worker: (vivo, valores)} de los demás workers del pod. Vivo: volcó hace
+    menos de tres intervalos (los medidores de los terminados no se exponen)
+    """
+    propio = _archivo_propio(directorio).name
+    limite = time.time() - 3 * getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+    estados = {}
+    for archivo in directorio.glob('*.json'):
+        if archivo.name == propio:
+            continue
+        try:
+            vivo = archivo.stat().st_mtime >= limite
+            estados[archivo.stem.split('-')[0]] = (vivo, json.loads(archivo.read_text()))
+        except (OSError, ValueError):
+            continue
+    return estados
+
+
+def exponer():
+    """Texto de exposición de todas las métricas registradas (de todos los workers con METRICS_DIR)"""
+    directorio = _directorio()
+    otros = _estados_workers(directorio) if directorio else None
+    lineas = []
+    for metrica in _registro:
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        estados = None
+        if otros is not None:
+            estados = {str(os.getpid()): metrica.estado()}
+            for worker, (vivo, valores) in otros.items():
+                if vivo or metrica.tipo != 'gauge':
+                    estados.setdefault(worker, []).extend(valores.get(metrica.nombre, []))
+        lineas.extend(metrica.muestras(estados))
+    return '\n'.join(lineas) + '\n'
+
+
+def _red_permitida(request):
+    # Detrás del ingress REMOTE_ADDR es el proxy: esas solicitudes no califican
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        ip = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(ip in ipaddress.ip_network(red, strict=False)
+               for red in getattr(settings, 'METRICS_ALLOWED_NETWORKS', []))
+
+
+def metricas(request):
+    """Endpoint /metrics para el scraping de Prometheus"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    enviado = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (token and hmac.compare_digest(enviado, token)) and not _red_permitida(request):
+        return HttpResponseForbidden()
+    return HttpResponse(exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Métricas HTTP y SQL por vista (ver InstrumentacionMiddleware)
+latencia_request = Histograma(
+    'sigmaops_request_duration_seconds', 'Latencia de requests por vista',
+    etiquetas=('view', 'method'),
+)
+consultas_request = Histograma(
+    'sigmaops_request_queries', 'Consultas SQL por request',
+    etiquetas=('view',), buckets=BUCKETS_CONSULTAS,
+)
+tiempo_sql_request = Histograma(
+    'sigmaops_request_sql_duration_seconds', 'Tiempo en SQL por request',
+    etiquetas=('view',),
+)
+requests_total = Contador(
+    'sigmaops_requests_total', 'Requests atendidos',
+    etiquetas=('view', 'method', 'status'),
+)
+n_mas_uno_total = Contador(
+    'sigmaops_n_plus_one_total', 'Requests con una misma consulta repetida (posible N+1)',
+    etiquetas=('view',),
+)
+
+# Pool de conexiones a la base (ver pool.PoolConexiones)
+pool_prestamos = Contador(
+    'sigmaops_db_pool_checkouts_total', 'Conexiones tomadas del pool', etiquetas=('alias',),
+)
+pool_espera = Histograma(
+    'sigmaops_db_pool_wait_seconds', 'Espera por una conexión libre del pool',
+    etiquetas=('alias',), buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+pool_reconexiones = Contador(
+    'sigmaops_db_pool_reconnects_total', 'Conexiones del pool descartadas y reemplazadas',
+    etiquetas=('alias', 'reason'),
+)
+pool_agotado = Contador(
+    'sigmaops_db_pool_timeouts_total', 'Esperas por conexión que superaron el timeout del pool',
+    etiquetas=('alias',),
+)
+
+# Réplicas de lectura (ver routers.ReplicaRouter)
+lecturas_primaria = Contador(
+    'sigmaops_db_replica_fallback_total',
+    'Lecturas de vistas de réplica enviadas a la primaria, por motivo',
+    etiquetas=('reason',),
+)
+mediciones_replica_fallidas = Contador(
+    'sigmaops_db_replica_check_errors_total',
+    'Mediciones del retraso de réplicas fallidas (reason=privilege: falta REPLICATION CLIENT)',
+    etiquetas=('alias', 'reason'),
+)
+
+# Auditoría asíncrona (ver auditoria.ColaAuditoria)
+auditoria_encolados = Contador('sigmaops_audit_enqueued_total', 'Eventos de auditoría encolados')
+auditoria_escritos = Contador('sigmaops_audit_written_total', 'Eventos de auditoría escritos')
+auditoria_descartados = Contador(
+    'sigmaops_audit_dropped_total', 'Eventos de auditoría descartados por cola llena',
+)
+auditoria_presion = Contador(
+    'sigmaops_audit_backpressure_total', 'Eventos que encontraron la cola de auditoría llena',
+)
+auditoria_errores = Contador(
+    'sigmaops_audit_errors_total', 'Eventos de auditoría perdidos por error al escribir',
+)
+auditoria_lotes = Histograma(
+    'sigmaops_audit_batch_size', 'Eventos por escritura de auditoría',
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000),
+)
@@ -1,53 +1,355 @@
 """
 Middleware para obtener el rol del usuario desde la tabla usuarios de MariaDB
+y para instrumentar latencia y consultas SQL por vista.
+
+Todos soportan los modos síncrono y async: bajo ASGI un middleware solo
+síncrono obliga a Django a reservar un hilo por request.
 """
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics
+from .auditoria import usuario_actual
 from .models import Usuario
+from .routers import COOKIE_PRIMARIA, EstadoLecturas, estado_lecturas, marcar_escritura
 
 
-class RolMiddleware:
+logger = logging.getLogger(__name__)
+
+
+class CacheRoles:
     """
-    Middleware que agrega el rol del usuario al request.
-    Busca el usuario en la tabla 'usuarios' por el email y asigna su rol.
+    LRU acotado en memoria del proceso con TTL por entrada.
+    Guarda (usuario_id, rol_nombre) por identidad de login; se vacía
+    desde las señales de Usuario y Rol.
     """
-    
+
+    def __init__(self, capacidad=1024, ttl=60):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache_roles = CacheRoles(
+    capacidad=getattr(settings, 'ROL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'ROL_CACHE_TTL', 60),
+)
+
+# Marca para cachear también "sin usuario en la tabla usuarios"
+SIN_USUARIO = (None, None)
+
+
+def clave_rol(user):
+    return (user.pk, user.email, user.username)
+
+
+def resolver_rol(user):
+    """Retorna (usuario_id, rol_nombre) del usuario autenticado, con cache"""
+    clave = clave_rol(user)
+    resultado = cache_roles.get(clave)
+    if resultado is not None:
+        return resultado
+
+    # Buscar usuario en la tabla usuarios por email, o por username si no tiene email
+    correos = [c for c in (user.email, user.username) if c]
+    fila = None
+    for correo in correos:
+        fila = Usuario.objects.filter(correo=correo).values_list('id', 'rol__nombre').first()
+        if fila:
+            break
+
+    resultado = tuple(fila) if fila else SIN_USUARIO
+    cache_roles.set(clave, resultado)
+    return resultado
+
+
+class MiddlewareDual:
+    """Base de los middleware que atienden requests síncronos y async"""
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return self.procesar(request)
+
+
+class EstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise con camino async: la búsqueda del archivo es un dict en
+    memoria y solo la respuesta se arma en un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
     def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class LecturasMiddleware(MiddlewareDual):
+    """
+    Crea el estado de ruteo a réplicas del request (ver routers.py) y, si
+    el request escribió, fija la cookie que manda la sesión a la primaria.
+    """
+
+    def procesar(self, request):
+        estado = EstadoLecturas(primaria=COOKIE_PRIMARIA in request.COOKIES)
+        token = estado_lecturas.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            estado_lecturas.reset(token)
+        return marcar_escritura(response, estado)
+
+    async def __acall__(self, request):
+        estado = EstadoLecturas(primaria=COOKIE_PRIMARIA in request.COOKIES)
+        token = estado_lecturas.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            estado_lecturas.reset(token)
+        return marcar_escritura(response, estado)
+
+
+class RolMiddleware(MiddlewareDual):
+    """
+    Middleware que agrega el rol del usuario al request.
+    Busca el usuario en la tabla 'usuarios' por el email y asigna su rol.
+    El resultado se cachea por proceso, así que en el camino habitual no
+    consulta la base de datos; request.usuario_db se carga solo si se usa.
+    """
+
+    def procesar(self, request):
+        usuario_id = self.asignar_rol(request, request.user)
+
+        # Usuario de los eventos de auditoría generados en este request
+        token = usuario_actual.set(usuario_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            usuario_actual.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        # Las vistas y plantillas síncronas leen request.user sin repetir la consulta
+        request.user = user
+        # La cache se lee una sola vez y el valor se pasa a asignar_rol: si la
+        # entrada vence entre medio no se consulta la base en el event loop
+        rol = cache_roles.get(clave_rol(user)) if user.is_authenticated else None
+        if user.is_authenticated and rol is None:
+            usuario_id = await sync_to_async(self.asignar_rol)(request, user)
+        else:
+            usuario_id = self.asignar_rol(request, user, rol)
+
+        token = usuario_actual.set(usuario_id)
+        try:
+            response = await self.get_response(request)
+        finally:
+            usuario_actual.reset(token)
+        return response
+
+    def asignar_rol(self, request, user, rol=None):
+        """
+        Fija los atributos de rol del request; retorna el id en la tabla
+        usuarios. ``rol`` es el (usuario_id, rol_nombre) ya resuelto, si lo hay.
+        """
         # Inicializar atributos
         request.usuario_db = None
+        request.usuario_id = None
         request.rol_nombre = None
         request.es_super_admin = False
         request.es_administrador = False
         request.es_operador = False
         request.es_visor = False
-        
-        if request.user.is_authenticated:
-            # Buscar usuario en la tabla usuarios por email
+        usuario_id = None
+
+        if user.is_authenticated:
             try:
-                usuario = Usuario.objects.select_related('rol').filter(
-                    correo=request.user.email
-                ).first()
-                
-                if not usuario:
-                    # Intentar buscar por username si no tiene email
-                    usuario = Usuario.objects.select_related('rol').filter(
-                        correo=request.user.username
-                    ).first()
-                
-                if usuario:
-                    request.usuario_db = usuario
-                    request.rol_nombre = usuario.rol.nombre
-                    
-                    # Flags de permisos
-                    request.es_super_admin = usuario.rol.nombre == 'Super Admin'
-                    request.es_administrador = usuario.rol.nombre == 'Administrador' or request.es_super_admin
-                    request.es_operador = usuario.rol.nombre == 'Operador' or request.es_administrador
-                    request.es_visor = usuario.rol.nombre == 'Visor' or request.es_operador
-                    
-            except Exception as e:
-                # Si hay error, el usuario no tiene rol asignado
-                print(f"Error buscando rol: {e}")
-        
-        response = self.get_response(request)
+                usuario_id, rol_nombre = rol or resolver_rol(user)
+            except Exception:
+                # Si hay error, el usuario queda sin rol asignado
+                logger.exception('Error buscando rol de %s', user.username)
+                usuario_id, rol_nombre = SIN_USUARIO
+
+            request.usuario_id = usuario_id
+            if usuario_id is not None:
+                request.usuario_db = SimpleLazyObject(
+                    lambda: Usuario.objects.select_related('rol').get(pk=usuario_id)
+                )
+                request.rol_nombre = rol_nombre
+
+                # Flags de permisos
+                request.es_super_admin = rol_nombre == 'Super Admin'
+                request.es_administrador = rol_nombre == 'Administrador' or request.es_super_admin
+                request.es_operador = rol_nombre == 'Operador' or request.es_administrador
+                request.es_visor = rol_nombre == 'Visor' or request.es_operador
+        return usuario_id
+
+
+class RegistroConsultas:
+    """
+    Cuenta y cronometra las consultas de un request (de cualquier hilo).
+    Con ``padre`` (un registro ya activo, p. ej. el del benchmark) también
+    le suma cada consulta.
+    """
+
+    def __init__(self, padre=None):
+        self.total = 0
+        self.segundos = 0.0
+        self.repeticiones = Counter()
+        self.padre = padre
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.contar(sql, time.perf_counter() - inicio)
+
+    def contar(self, sql, duracion):
+        with self._lock:
+            self.segundos += duracion
+            self.total += 1
+            self.repeticiones[sql] += 1
+        if self.padre is not None:
+            self.padre.contar(sql, duracion)
+
+
+# Registro del request en curso; sync_to_async lo copia a los hilos que
+# ejecutan sus consultas (ORM async, vistas síncronas bajo ASGI, en_paralelo)
+registro_actual = ContextVar('registro_consultas', default=None)
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """execute_wrapper fijo de cada conexión: delega en el registro del request"""
+    registro = registro_actual.get()
+    if registro is None:
+        return execute(sql, params, many, context)
+    return registro(execute, sql, params, many, context)
+
+
+def instrumentar_conexion(sender=None, connection=None, **kwargs):
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+connection_created.connect(instrumentar_conexion)
+
+METODOS_HTTP = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+class InstrumentacionMiddleware(MiddlewareDual):
+    """
+    Registra por nombre de URL la latencia, la cantidad de consultas SQL y
+    el tiempo en SQL de cada request, y marca como posible N+1 los requests
+    que repiten la misma consulta (mismo SQL, distintos parámetros).
+    Las métricas se exponen en /metrics.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.umbral_n_mas_uno = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 5)
+        metrics.iniciar_volcado()
+        # Conexiones abiertas antes de cargar el middleware
+        for conexion in connections.all(initialized_only=True):
+            instrumentar_conexion(connection=conexion)
+
+    def procesar(self, request):
+        registro = RegistroConsultas(padre=registro_actual.get())
+        inicio = time.perf_counter()
+        token = registro_actual.set(registro)
+        try:
+            response = self.get_response(request)
+        finally:
+            registro_actual.reset(token)
+        self.observar(request, response, registro, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        registro = RegistroConsultas(padre=registro_actual.get())
+        inicio = time.perf_counter()
+        token = registro_actual.set(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            registro_actual.reset(token)
+        self.observar(request, response, registro, time.perf_counter() - inicio)
         return response
+
+    def observar(self, request, response, registro, duracion):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        # Métodos arbitrarios del cliente no crean series nuevas
+        metodo = request.method if request.method in METODOS_HTTP else 'other'
+        metrics.latencia_request.observe(vista, metodo, valor=duracion)
+        metrics.consultas_request.observe(vista, valor=registro.total)
+        metrics.tiempo_sql_request.observe(vista, valor=registro.segundos)
+        metrics.requests_total.inc(vista, metodo, str(response.status_code))
+
+        if registro.repeticiones:
+            sql, veces = registro.repeticiones.most_common(1)[0]
+            if veces >= self.umbral_n_mas_uno:
+                metrics.n_mas_uno_total.inc(vista)
+                logger.warning(
+                    'Posible N+1 en %s: consulta repetida %d veces: %s',
+                    vista, veces, sql[:300],
+                )
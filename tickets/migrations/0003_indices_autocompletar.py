@@ -0,0 +1,28 @@
+"""
+Índices de prefijo para el autocompletado de elementos y usuarios.
+
+Las tablas elementos y usuarios no son administradas por Django
+(managed = False), por eso los índices se crean con SQL y solo si la
+tabla existe en la base de datos.
+"""
+from django.db import migrations
+
+from ._indices import IndicesNoAdministrados
+
+
+INDICES = [
+    ('idx_elementos_nombre', 'elementos', ('nombre',)),
+    ('idx_elementos_tipo', 'elementos', ('tipo',)),
+    ('idx_usuarios_nombre', 'usuarios', ('nombre',)),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_indice_busqueda'),
+    ]
+
+    operations = [
+        IndicesNoAdministrados(INDICES),
+    ]
@@ -0,0 +1,26 @@
+"""
+Índice compuesto para el timeline de observaciones paginado por cursor.
+
+Cubre WHERE ticket_id = ? ORDER BY fecha DESC, id DESC y el COUNT por
+ticket. La tabla observaciones no es administrada por Django, por eso el
+índice se crea con SQL y solo si la tabla existe.
+"""
+from django.db import migrations
+
+from ._indices import IndicesNoAdministrados
+
+
+INDICES = [
+    ('idx_observaciones_ticket_fecha', 'observaciones', ('ticket_id', 'fecha', 'id')),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_indices_autocompletar'),
+    ]
+
+    operations = [
+        IndicesNoAdministrados(INDICES),
+    ]
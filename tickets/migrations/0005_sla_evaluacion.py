@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_indice_observaciones_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaEvaluacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vence', models.DateTimeField()),
+                ('horas_transcurridas', models.FloatField()),
+                ('horas_restantes', models.FloatField()),
+                ('consumo', models.FloatField()),
+                ('probabilidad', models.FloatField()),
+                ('nivel', models.CharField(choices=[('vencido', 'Vencido'), ('critico', 'Crítico'), ('riesgo', 'En riesgo'), ('ok', 'En plazo')], max_length=10)),
+                ('evaluado', models.DateTimeField()),
+                ('sla', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.slacontrol')),
+                ('ticket', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.ticket')),
+            ],
+            options={
+                'verbose_name': 'Evaluación SLA',
+                'verbose_name_plural': 'Evaluaciones SLA',
+                'db_table': 'sla_evaluacion',
+                'indexes': [models.Index(fields=['nivel', 'vence'], name='idx_sla_eval_nivel'), models.Index(fields=['ticket'], name='idx_sla_eval_ticket')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_sla_evaluacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupMarca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Rollup',
+                'verbose_name_plural': 'Marcas de Rollup',
+                'db_table': 'rollup_marca',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResolucionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('categoria_id', models.IntegerField(default=0)),
+                ('dc_id', models.IntegerField(default=0)),
+                ('proveedor_id', models.IntegerField(default=0)),
+                ('prioridad', models.CharField(default='', max_length=10)),
+                ('resueltos', models.IntegerField(default=0)),
+                ('segundos', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resolución Diaria',
+                'verbose_name_plural': 'Resoluciones Diarias',
+                'db_table': 'rollup_resolucion',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'categoria_id', 'dc_id', 'proveedor_id', 'prioridad'), name='uniq_rollup_resolucion')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TiempoEstadoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('estado_id', models.IntegerField()),
+                ('categoria_id', models.IntegerField(default=0)),
+                ('dc_id', models.IntegerField(default=0)),
+                ('proveedor_id', models.IntegerField(default=0)),
+                ('prioridad', models.CharField(default='', max_length=10)),
+                ('salidas', models.IntegerField(default=0)),
+                ('segundos', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Tiempo en Estado Diario',
+                'verbose_name_plural': 'Tiempos en Estado Diarios',
+                'db_table': 'rollup_tiempo_estado',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'estado_id', 'categoria_id', 'dc_id', 'proveedor_id', 'prioridad'), name='uniq_rollup_tiempo_estado')],
+            },
+        ),
+    ]
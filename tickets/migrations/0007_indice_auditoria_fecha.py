@@ -0,0 +1,27 @@
+"""
+Índice por fecha de la auditoría.
+
+Cubre el listado del admin (ORDER BY fecha DESC) y las consultas por rango
+de fecha, que se limitan a los meses calientes (ver tickets.retencion). La
+tabla auditoria no es administrada por Django, por eso el índice se crea
+con SQL y solo si la tabla existe.
+"""
+from django.db import migrations
+
+from ._indices import IndicesNoAdministrados
+
+
+INDICES = [
+    ('idx_auditoria_fecha', 'auditoria', ('fecha', 'id')),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_rollups'),
+    ]
+
+    operations = [
+        IndicesNoAdministrados(INDICES),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_indice_auditoria_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BandaSimilitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('banda', models.SmallIntegerField()),
+                ('hash', models.BigIntegerField()),
+                ('ticket', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.ticket')),
+            ],
+            options={
+                'verbose_name': 'Banda de Similitud',
+                'verbose_name_plural': 'Bandas de Similitud',
+                'db_table': 'banda_similitud',
+                'indexes': [models.Index(fields=['hash', 'banda'], name='idx_similitud_hash'), models.Index(fields=['ticket'], name='idx_similitud_ticket')],
+            },
+        ),
+    ]
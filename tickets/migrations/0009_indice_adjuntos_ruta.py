@@ -0,0 +1,27 @@
+"""
+Índice por ruta de almacenamiento de los adjuntos.
+
+Al borrar un adjunto se verifica si otro apunta al mismo contenido antes
+de eliminar el archivo (ver tickets.adjuntos). La tabla archivos_adjuntos
+no es administrada por Django, por eso el índice se crea con SQL y solo si
+la tabla existe.
+"""
+from django.db import migrations
+
+from ._indices import IndicesNoAdministrados
+
+
+INDICES = [
+    ('idx_adjuntos_ruta', 'archivos_adjuntos', ('ruta_almacenamiento',)),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_bandas_similitud'),
+    ]
+
+    operations = [
+        IndicesNoAdministrados(INDICES),
+    ]
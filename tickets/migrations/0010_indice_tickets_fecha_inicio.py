@@ -0,0 +1,28 @@
+"""
+Índice (fecha_inicio, id) de los tickets.
+
+Cubre el listado paginado por cursor (ORDER BY fecha_inicio DESC, id DESC
+y el rango del cursor) y la exportación, que lo recorre completo. Los
+tickets sin fecha se leen en un tramo aparte, WHERE fecha_inicio IS NULL
+ORDER BY id, que usa el mismo índice. La tabla tickets no es administrada
+por Django, por eso el índice se crea con SQL y solo si la tabla existe.
+"""
+from django.db import migrations
+
+from ._indices import IndicesNoAdministrados
+
+
+INDICES = [
+    ('idx_tickets_fecha_inicio', 'tickets', ('fecha_inicio', 'id')),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_indice_adjuntos_ruta'),
+    ]
+
+    operations = [
+        IndicesNoAdministrados(INDICES),
+    ]
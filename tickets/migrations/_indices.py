@@ -0,0 +1,64 @@
+"""
+Índices sobre tablas no administradas por Django (managed = False).
+
+Las migraciones no crean esas tablas, por eso cada índice se crea con SQL
+y solo si la tabla existe y el índice todavía no.
+"""
+from django.db import router
+from django.db.migrations.operations.base import Operation
+
+
+def _indices_existentes(connection, tabla):
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, tabla))
+
+
+def crear_indices(indices, schema_editor):
+    connection = schema_editor.connection
+    tablas = set(connection.introspection.table_names())
+    for nombre, tabla, columnas in indices:
+        if tabla in tablas and nombre not in _indices_existentes(connection, tabla):
+            schema_editor.execute('CREATE INDEX %s ON %s (%s)' % (
+                schema_editor.quote_name(nombre),
+                schema_editor.quote_name(tabla),
+                ', '.join(schema_editor.quote_name(c) for c in columnas),
+            ))
+
+
+def eliminar_indices(indices, schema_editor):
+    connection = schema_editor.connection
+    tablas = set(connection.introspection.table_names())
+    for nombre, tabla, columnas in indices:
+        if tabla in tablas and nombre in _indices_existentes(connection, tabla):
+            schema_editor.execute(schema_editor.sql_delete_index % {
+                'name': schema_editor.quote_name(nombre),
+                'table': schema_editor.quote_name(tabla),
+            })
+
+
+class IndicesNoAdministrados(Operation):
+    """
+    Crea (y al revertir elimina) ``indices``, una lista de
+    (nombre, tabla, columnas), en tablas no administradas que existan
+    """
+    reversible = True
+
+    def __init__(self, indices):
+        self.indices = [(nombre, tabla, tuple(columnas)) for nombre, tabla, columnas in indices]
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.indices], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if router.allow_migrate(schema_editor.connection.alias, app_label):
+            crear_indices(self.indices, schema_editor)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if router.allow_migrate(schema_editor.connection.alias, app_label):
+            eliminar_indices(self.indices, schema_editor)
+
+    def describe(self):
+        return 'Índices en tablas no administradas: ' + ', '.join(nombre for nombre, _, _ in self.indices)
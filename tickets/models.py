@@ -2,7 +2,9 @@
 Modelos Django para el sistema de tickets claro_sigmaops
 Generados mediante ingeniería inversa del dump SQL
 """
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 
 class Rol(models.Model):
@@ -141,6 +143,12 @@ class Ticket(models.Model):
         ('Alta', 'Alta'),
         ('Crítica', 'Crítica'),
     ]
+    PRIORIDAD_BADGES = {
+        'Baja': 'badge-low',
+        'Media': 'badge-medium',
+        'Alta': 'badge-high',
+        'Crítica': 'badge-critical',
+    }
     
     codigo = models.CharField(max_length=50, unique=True)
     titulo = models.CharField(max_length=255)
@@ -182,13 +190,7 @@ class Ticket(models.Model):
     @property
     def prioridad_badge(self):
         """Retorna clase CSS para badge de prioridad"""
-        badges = {
-            'Baja': 'badge-low',
-            'Media': 'badge-medium',
-            'Alta': 'badge-high',
-            'Crítica': 'badge-critical',
-        }
-        return badges.get(self.prioridad, 'badge-medium')
+        return self.PRIORIDAD_BADGES.get(self.prioridad, 'badge-medium')
 
 
 class Observacion(models.Model):
@@ -321,6 +323,14 @@ class RelacionTicket(models.Model):
         verbose_name = 'Relación de Ticket'
         verbose_name_plural = 'Relaciones de Tickets'
 
+    def clean(self):
+        # Una dependencia no puede cerrar un ciclo (ver tickets.grafo)
+        from .grafo import crea_ciclo
+        if self.ticket_padre_id and self.ticket_hijo_id and crea_ciclo(
+            self.ticket_padre_id, self.ticket_hijo_id, self.tipo_relacion, excluir=self.pk
+        ):
+            raise ValidationError('La relación crearía un ciclo de dependencias entre tickets.')
+
 
 class Auditoria(models.Model):
     """Registro de auditoría del sistema"""
@@ -337,7 +347,8 @@ class Auditoria(models.Model):
     entidad_id = models.BigIntegerField(blank=True, null=True)
     usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
     descripcion = models.TextField(blank=True, null=True)
-    fecha = models.DateTimeField(auto_now_add=True)
+    # Momento del evento (no de la escritura, que es asíncrona por lotes)
+    fecha = models.DateTimeField(default=timezone.now)
 
     class Meta:
         managed = False
@@ -345,3 +356,136 @@ class Auditoria(models.Model):
         verbose_name = 'Auditoría'
         verbose_name_plural = 'Auditorías'
         ordering = ['-fecha']
+
+
+class IndiceBusqueda(models.Model):
+    """Índice invertido de términos para la búsqueda de tickets"""
+    termino = models.CharField(max_length=64)
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.CASCADE, related_name='+', db_constraint=False
+    )
+    observacion = models.ForeignKey(
+        Observacion, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='+', db_constraint=False
+    )
+    peso = models.FloatField(default=1)
+
+    class Meta:
+        db_table = 'indice_busqueda'
+        verbose_name = 'Índice de Búsqueda'
+        verbose_name_plural = 'Índice de Búsqueda'
+        indexes = [
+            models.Index(fields=['termino', 'ticket'], name='idx_busqueda_termino'),
+            models.Index(fields=['ticket', 'observacion'], name='idx_busqueda_ticket'),
+        ]
+
+
+class BandaSimilitud(models.Model):
+    """Bandas LSH de la firma MinHash de cada ticket abierto (ver similitud.py)"""
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.CASCADE, related_name='+', db_constraint=False
+    )
+    banda = models.SmallIntegerField()
+    hash = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'banda_similitud'
+        verbose_name = 'Banda de Similitud'
+        verbose_name_plural = 'Bandas de Similitud'
+        indexes = [
+            models.Index(fields=['hash', 'banda'], name='idx_similitud_hash'),
+            models.Index(fields=['ticket'], name='idx_similitud_ticket'),
+        ]
+
+
+class SlaEvaluacion(models.Model):
+    """Evaluación precalculada de SLA abiertos (ver sla.evaluar_sla)"""
+    NIVEL_CHOICES = [
+        ('vencido', 'Vencido'),
+        ('critico', 'Crítico'),
+        ('riesgo', 'En riesgo'),
+        ('ok', 'En plazo'),
+    ]
+
+    sla = models.ForeignKey(
+        SlaControl, on_delete=models.CASCADE, related_name='+', db_constraint=False
+    )
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.CASCADE, related_name='+', db_constraint=False
+    )
+    vence = models.DateTimeField()
+    horas_transcurridas = models.FloatField()
+    horas_restantes = models.FloatField()
+    consumo = models.FloatField()
+    probabilidad = models.FloatField()
+    nivel = models.CharField(max_length=10, choices=NIVEL_CHOICES)
+    evaluado = models.DateTimeField()
+
+    class Meta:
+        db_table = 'sla_evaluacion'
+        verbose_name = 'Evaluación SLA'
+        verbose_name_plural = 'Evaluaciones SLA'
+        indexes = [
+            models.Index(fields=['nivel', 'vence'], name='idx_sla_eval_nivel'),
+            models.Index(fields=['ticket'], name='idx_sla_eval_ticket'),
+        ]
+
+
+class RollupMarca(models.Model):
+    """Marca de avance (último id procesado) de un rollup incremental"""
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_marca'
+        verbose_name = 'Marca de Rollup'
+        verbose_name_plural = 'Marcas de Rollup'
+
+
+class TiempoEstadoDiario(models.Model):
+    """
+    Tiempo en cada estado por día de salida del estado y dimensiones del
+    ticket (0 / '' = sin valor). Ver rollups.procesar_historial.
+    """
+    dia = models.DateField()
+    estado_id = models.IntegerField()
+    categoria_id = models.IntegerField(default=0)
+    dc_id = models.IntegerField(default=0)
+    proveedor_id = models.IntegerField(default=0)
+    prioridad = models.CharField(max_length=10, default='')
+    salidas = models.IntegerField(default=0)
+    segundos = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'rollup_tiempo_estado'
+        verbose_name = 'Tiempo en Estado Diario'
+        verbose_name_plural = 'Tiempos en Estado Diarios'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'estado_id', 'categoria_id', 'dc_id', 'proveedor_id', 'prioridad'],
+                name='uniq_rollup_tiempo_estado',
+            ),
+        ]
+
+
+class ResolucionDiaria(models.Model):
+    """Tickets resueltos y tiempo total de resolución por día de cierre"""
+    dia = models.DateField()
+    categoria_id = models.IntegerField(default=0)
+    dc_id = models.IntegerField(default=0)
+    proveedor_id = models.IntegerField(default=0)
+    prioridad = models.CharField(max_length=10, default='')
+    resueltos = models.IntegerField(default=0)
+    segundos = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'rollup_resolucion'
+        verbose_name = 'Resolución Diaria'
+        verbose_name_plural = 'Resoluciones Diarias'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'categoria_id', 'dc_id', 'proveedor_id', 'prioridad'],
+                name='uniq_rollup_resolucion',
+            ),
+        ]
@@ -0,0 +1,224 @@
+"""
+Paginación por cursor (keyset) sobre una clave de orden estable (campo, id)
+"""
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar"""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder, pero sin truncar microsegundos de las fechas"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def codificar_cursor(valor, pk):
+    """Serializa (valor, id) como token opaco apto para URLs"""
+    data = json.dumps([valor, pk], cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna la tupla (valor, id) codificada en el cursor"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return valor, int(pk)
+    except (ValueError, TypeError) as exc:
+        raise CursorInvalido(cursor) from exc
+
+
+def admite_nulos(modelo, campo):
+    """Indica si ``campo`` (con notación ``relacion__campo``) puede ser NULL"""
+    opts = modelo._meta
+    partes = campo.split('__')
+    for parte in partes[:-1]:
+        field = opts.get_field(parte)
+        if field.null:
+            return True
+        opts = field.related_model._meta
+    return opts.get_field(partes[-1]).null
+
+
+def _despues_de(campo, valor, pk, descendente):
+    """Condición "fila posterior al cursor" para ORDER BY campo, id (valor no NULL)"""
+    op = 'lt' if descendente else 'gt'
+    return Q(**{f'{campo}__{op}': valor}) | Q(**{campo: valor, f'pk__{op}': pk})
+
+
+def _antes_de(campo, valor, pk, descendente):
+    """Condición "fila anterior al cursor", inversa de _despues_de"""
+    op = 'gt' if descendente else 'lt'
+    return Q(**{f'{campo}__{op}': valor}) | Q(**{campo: valor, f'pk__{op}': pk})
+
+
+def ordenar_keyset(queryset, campo, descendente=False, invertido=False):
+    """
+    Aplica el orden estable (campo, id) usado por la paginación keyset.
+    Con ``invertido`` recorre el mismo orden de atrás hacia adelante.
+    """
+    if descendente != invertido:
+        return queryset.order_by(F(campo).desc(), '-pk')
+    return queryset.order_by(F(campo).asc(), 'pk')
+
+
+def _ordenar_por_id(queryset, descendente=False, invertido=False):
+    return queryset.order_by('-pk' if descendente != invertido else 'pk')
+
+
+def _segmentos(queryset, campo, descendente, despues=None, antes=None, nulos=True):
+    """
+    Querysets ordenados que, leídos en secuencia, dan las filas posteriores
+    a ``despues`` (o anteriores a ``antes``, en orden invertido).
+
+    Con un campo que admite NULL el recorrido tiene dos tramos: las filas
+    con valor por (campo, id) y después las NULL por id. Ningún ORDER BY
+    lleva la expresión ``IS NULL`` y cada tramo es un rango del índice
+    (campo, id).
+    """
+    if not nulos:
+        con_valor, sin_valor = queryset, None
+    else:
+        con_valor = queryset.filter(**{f'{campo}__isnull': False})
+        sin_valor = queryset.filter(**{f'{campo}__isnull': True})
+
+    if antes is not None:
+        valor, pk = antes
+        op = 'gt' if descendente else 'lt'
+        tramo = ordenar_keyset(con_valor, campo, descendente, invertido=True)
+        if valor is not None:
+            return [tramo.filter(_antes_de(campo, valor, pk, descendente))]
+        if sin_valor is None:
+            return [tramo]
+        nulas = _ordenar_por_id(sin_valor, descendente, invertido=True).filter(**{f'pk__{op}': pk})
+        return [nulas, tramo]
+
+    if despues is not None and despues[0] is None:
+        if sin_valor is None:
+            return []
+        op = 'lt' if descendente else 'gt'
+        return [_ordenar_por_id(sin_valor, descendente).filter(**{f'pk__{op}': despues[1]})]
+    tramo = ordenar_keyset(con_valor, campo, descendente)
+    if despues is not None:
+        tramo = tramo.filter(_despues_de(campo, *despues, descendente))
+    if sin_valor is None:
+        return [tramo]
+    return [tramo, _ordenar_por_id(sin_valor, descendente)]
+
+
+def _primeras(segmentos, cantidad):
+    """Primeras ``cantidad`` filas de los tramos; solo consulta los necesarios"""
+    filas = []
+    for segmento in segmentos:
+        if len(filas) >= cantidad:
+            break
+        filas.extend(segmento[:cantidad - len(filas)])
+    return filas
+
+
+class PaginaKeyset:
+    """Página obtenida por cursor; expone cursores hacia ambos lados"""
+
+    def __init__(self, object_list, campo, hay_siguiente, hay_anterior):
+        self.object_list = object_list
+        self.campo = campo
+        self.hay_siguiente = hay_siguiente
+        self.hay_anterior = hay_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.hay_siguiente
+
+    def has_previous(self):
+        return self.hay_anterior
+
+    def has_other_pages(self):
+        return self.hay_siguiente or self.hay_anterior
+
+    def _cursor(self, fila):
+        if isinstance(fila, dict):
+            return codificar_cursor(fila[self.campo], fila['id'])
+        return codificar_cursor(_valor_campo(fila, self.campo), fila.pk)
+
+    @property
+    def cursor_siguiente(self):
+        """Cursor para pedir la página siguiente (parámetro ``cursor``)"""
+        return self._cursor(self.object_list[-1]) if self.hay_siguiente and self.object_list else None
+
+    @property
+    def cursor_anterior(self):
+        """Cursor para pedir la página anterior (parámetro ``antes``)"""
+        return self._cursor(self.object_list[0]) if self.hay_anterior and self.object_list else None
+
+
+def pagina_keyset(queryset, campo, descendente=False, despues=None, antes=None, por_pagina=10):
+    """
+    Retorna la PaginaKeyset que sigue a ``despues`` o precede a ``antes``.
+
+    ``queryset`` puede ser de instancias o de ``values()``; en el segundo caso
+    debe incluir ``campo`` y ``id``. Cada página es un rango indexado, sin
+    OFFSET, por lo que el costo no crece con la profundidad.
+    """
+    nulos = admite_nulos(queryset.model, campo)
+    if antes:
+        filas = _primeras(
+            _segmentos(queryset, campo, descendente, antes=decodificar_cursor(antes), nulos=nulos),
+            por_pagina + 1,
+        )
+        hay_anterior = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        filas.reverse()
+        return PaginaKeyset(filas, campo, hay_siguiente=True, hay_anterior=hay_anterior)
+
+    despues_de = decodificar_cursor(despues) if despues else None
+    filas = _primeras(_segmentos(queryset, campo, descendente, despues=despues_de, nulos=nulos), por_pagina + 1)
+    hay_siguiente = len(filas) > por_pagina
+    return PaginaKeyset(
+        filas[:por_pagina], campo,
+        hay_siguiente=hay_siguiente, hay_anterior=bool(despues),
+    )
+
+
+def paginar_keyset(queryset, campo, descendente=False, cursor=None, por_pagina=10):
+    """Atajo que retorna (filas, siguiente_cursor) para la página tras ``cursor``"""
+    pagina = pagina_keyset(queryset, campo, descendente, despues=cursor, por_pagina=por_pagina)
+    return pagina.object_list, pagina.cursor_siguiente
+
+
+def iterar_keyset(queryset, campo, descendente=False, lote=2000):
+    """
+    Recorre todo el queryset en páginas keyset de ``lote`` filas.
+    A diferencia de ``iterator()``, no depende de cursores del lado del
+    servidor (PyMySQL trae el resultado completo al cliente).
+    """
+    cursor = None
+    while True:
+        pagina = pagina_keyset(queryset, campo, descendente, despues=cursor, por_pagina=lote)
+        yield from pagina.object_list
+        if not pagina.has_next():
+            return
+        cursor = pagina.cursor_siguiente
+
+
+def _valor_campo(obj, campo):
+    """Resuelve un campo con notación ``relacion__campo`` sobre una instancia"""
+    for parte in campo.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, parte)
+    return obj
@@ -0,0 +1,170 @@
+"""
+Pool de conexiones a la base por proceso (backend tickets.backends.mysql).
+
+Django abre la conexión al primer query del request y la cierra al
+terminarlo (CONN_MAX_AGE=0). Con el backend del pool, abrir toma una
+conexión libre y cerrar la devuelve, así el handshake TCP y la
+autenticación de PyMySQL solo se pagan al crecer el pool o al reciclar.
+Todos los hilos del worker (requests WSGI/ASGI, hilos de en_paralelo)
+comparten el pool, acotado a SIZE conexiones; si no hay libres se espera
+hasta TIMEOUT segundos.
+
+Al prestar una conexión se descarta y reemplaza si superó RECYCLE
+segundos de vida o si no responde al ping (PRE_PING).
+"""
+import os
+import threading
+import time
+import weakref
+
+from . import metrics
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones. ``crear`` abre una conexión nueva,
+    ``verificar`` retorna False si ya no sirve y ``cerrar`` la cierra.
+    """
+
+    def __init__(self, crear, verificar, cerrar, alias='default', tamano=10, espera=30.0,
+                 reciclar=3600, pre_ping=True):
+        self.crear = crear
+        self.verificar = verificar
+        self.cerrar = cerrar
+        self.alias = alias
+        self.tamano = tamano
+        self.espera = espera
+        self.reciclar = reciclar
+        self.pre_ping = pre_ping
+        self.pid = os.getpid()
+        # Reentrante: el callback de una conexión perdida puede correr
+        # durante el GC con el lock tomado por el mismo hilo
+        self._cond = threading.Condition(threading.RLock())
+        self._libres = []
+        # id(conexión) -> (weakref, creada); un préstamo que nunca vuelve
+        # (hilo terminado sin cerrar) libera su cupo al recolectarse
+        self._prestadas = {}
+        self.abiertas = 0
+
+    @property
+    def en_uso(self):
+        return len(self._prestadas)
+
+    def obtener(self):
+        """Conexión lista para usar; lanza PoolAgotado si se agota la espera"""
+        inicio = time.monotonic()
+        with self._cond:
+            while not self._libres and self.abiertas >= self.tamano:
+                restante = inicio + self.espera - time.monotonic()
+                if restante <= 0:
+                    metrics.pool_agotado.inc(self.alias)
+                    raise PoolAgotado(
+                        f'Sin conexiones libres en el pool {self.alias} '
+                        f'({self.tamano}) tras {self.espera:g}s'
+                    )
+                self._cond.wait(restante)
+            if self._libres:
+                conexion, creada = self._libres.pop()
+            else:
+                conexion = creada = None
+                self.abiertas += 1
+        metrics.pool_espera.observe(self.alias, valor=time.monotonic() - inicio)
+        metrics.pool_prestamos.inc(self.alias)
+
+        try:
+            if conexion is not None:
+                motivo = self._motivo_descarte(conexion, creada)
+                if motivo is None:
+                    return self._prestar(conexion, creada)
+                self._cerrar(conexion)
+                metrics.pool_reconexiones.inc(self.alias, motivo)
+            return self._prestar(self.crear(), time.monotonic())
+        except BaseException:
+            self._liberar_cupo()
+            raise
+
+    def devolver(self, conexion):
+        """Vuelve a dejar libre una conexión prestada"""
+        with self._cond:
+            prestamo = self._prestadas.pop(id(conexion), None)
+            if prestamo is None or os.getpid() != self.pid:
+                return
+            self._libres.append((conexion, prestamo[1]))
+            self._cond.notify()
+
+    def descartar(self, conexion, motivo='error'):
+        """Cierra una conexión prestada que no debe reutilizarse"""
+        with self._cond:
+            if self._prestadas.pop(id(conexion), None) is None:
+                return
+        self._cerrar(conexion)
+        metrics.pool_reconexiones.inc(self.alias, motivo)
+        self._liberar_cupo()
+
+    def vaciar(self):
+        """Cierra las conexiones libres (las prestadas se cierran al volver)"""
+        with self._cond:
+            libres, self._libres = self._libres, []
+            self.abiertas -= len(libres)
+            self._cond.notify_all()
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    def _motivo_descarte(self, conexion, creada):
+        if self.reciclar and time.monotonic() - creada > self.reciclar:
+            return 'reciclo'
+        if self.pre_ping and not self.verificar(conexion):
+            return 'ping'
+        return None
+
+    def _prestar(self, conexion, creada):
+        clave = id(conexion)
+
+        def perdida(_ref):
+            with self._cond:
+                if self._prestadas.get(clave, (None,))[0] is _ref:
+                    del self._prestadas[clave]
+                    self.abiertas -= 1
+                    self._cond.notify()
+
+        with self._cond:
+            self._prestadas[clave] = (weakref.ref(conexion, perdida), creada)
+        return conexion
+
+    def _liberar_cupo(self):
+        with self._cond:
+            self.abiertas -= 1
+            self._cond.notify()
+
+    def _cerrar(self, conexion):
+        try:
+            self.cerrar(conexion)
+        except Exception:
+            pass
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def obtener_pool(alias, crear, verificar, cerrar, **opciones):
+    """Pool del alias en este proceso (uno nuevo tras un fork)"""
+    with _lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = PoolConexiones(crear, verificar, cerrar, alias=alias, **opciones)
+        return pool
+
+
+metrics.Medidor(
+    'sigmaops_db_pool_connections', 'Conexiones abiertas en los pools del proceso',
+    lambda: sum(pool.abiertas for pool in list(_pools.values())),
+)
+metrics.Medidor(
+    'sigmaops_db_pool_in_use', 'Conexiones prestadas de los pools del proceso',
+    lambda: sum(pool.en_uso for pool in list(_pools.values())),
+)
@@ -0,0 +1,336 @@
+"""
+Retención de la auditoría por meses: particiones calientes, tablas de
+archivo y exportación a JSONL comprimido.
+
+La tabla auditoria solo guarda los AUDIT_HOT_MONTHS meses más recientes
+(el mes actual incluido). Cada mes que sale de esa ventana se mueve a una
+tabla propia auditoria_AAAAMM, y cuando además supera AUDIT_RETENTION_MONTHS
+se exporta a AUDIT_ARCHIVE_DIR/auditoria-AAAA-MM.jsonl.gz y su tabla se
+elimina.
+
+En MySQL/MariaDB, si la tabla está particionada por RANGE COLUMNS(fecha)
+(ver particionar()), cada mes es una partición: se crean las de los meses
+siguientes y un mes saliente se mueve con EXCHANGE PARTITION, sin copiar
+filas. En otros motores el mes se copia por lotes con INSERT ... SELECT.
+
+Los meses se cortan en UTC, igual que se guarda fecha.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.apps.registry import Apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Auditoria
+from .pagination import iterar_keyset
+
+
+MESES_CALIENTES = getattr(settings, 'AUDIT_HOT_MONTHS', 3)
+MESES_RETENCION = getattr(settings, 'AUDIT_RETENTION_MONTHS', 12)
+DIRECTORIO_ARCHIVO = getattr(settings, 'AUDIT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archivo')
+
+TABLA = Auditoria._meta.db_table
+PARTICION_FUTURA = 'pfuturo'
+COLUMNAS = ['id', 'entidad', 'accion', 'entidad_id', 'usuario_id', 'descripcion', 'fecha']
+
+# Registro aparte para los modelos de las tablas de archivo: no aparecen en
+# apps.get_models() ni en las migraciones
+_registro = Apps()
+_modelos = {}
+
+
+def _sumar_meses(mes, n):
+    indice = mes.year * 12 + mes.month - 1 + n
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def mes_de(fecha):
+    fecha = timezone.localtime(fecha, dt_timezone.utc) if timezone.is_aware(fecha) else fecha
+    return date(fecha.year, fecha.month, 1)
+
+
+def inicio_mes(mes):
+    momento = datetime(mes.year, mes.month, 1)
+    return timezone.make_aware(momento, dt_timezone.utc) if settings.USE_TZ else momento
+
+
+def inicio_caliente(ahora=None, meses=None):
+    """Primer instante de la ventana caliente (mes actual y anteriores)"""
+    meses = MESES_CALIENTES if meses is None else meses
+    return inicio_mes(_sumar_meses(mes_de(ahora or timezone.now()), 1 - meses))
+
+
+def auditoria_caliente(desde=None, hasta=None, ahora=None):
+    """
+    Eventos de auditoría entre ``desde`` y ``hasta`` acotados a la ventana
+    caliente; los meses anteriores se leen con leer_mes()
+    """
+    limite = inicio_caliente(ahora)
+    eventos = Auditoria.objects.filter(fecha__gte=max(desde, limite) if desde else limite)
+    if hasta:
+        eventos = eventos.filter(fecha__lt=hasta)
+    return eventos
+
+
+def tabla_mes(mes):
+    return f'{TABLA}_{mes:%Y%m}'
+
+
+def ruta_mes(mes, directorio=None):
+    return Path(directorio or DIRECTORIO_ARCHIVO) / f'{TABLA}-{mes:%Y-%m}.jsonl.gz'
+
+
+def modelo_archivo(mes):
+    """Modelo (fuera del registro de la app) de la tabla de archivo del mes"""
+    tabla = tabla_mes(mes)
+    if tabla not in _modelos:
+        meta = type('Meta', (), {'app_label': 'tickets', 'db_table': tabla, 'managed': False, 'apps': _registro})
+        _modelos[tabla] = type(f'AuditoriaArchivo{mes:%Y%m}', (models.Model,), {
+            '__module__': __name__,
+            'Meta': meta,
+            'id': models.BigIntegerField(primary_key=True),
+            'entidad': models.CharField(max_length=50),
+            'accion': models.CharField(max_length=10),
+            'entidad_id': models.BigIntegerField(null=True),
+            'usuario_id': models.BigIntegerField(null=True),
+            'descripcion': models.TextField(null=True),
+            'fecha': models.DateTimeField(db_index=True),
+        })
+    return _modelos[tabla]
+
+
+def meses_archivados():
+    """Meses con tabla de archivo en la base de datos"""
+    patron = re.compile(rf'{TABLA}_(\d{{4}})(\d{{2}})')
+    meses = []
+    for tabla in connection.introspection.table_names():
+        coincide = patron.fullmatch(tabla)
+        if coincide:
+            meses.append(date(int(coincide[1]), int(coincide[2]), 1))
+    return sorted(meses)
+
+
+# Particiones nativas (MySQL / MariaDB)
+
+def particiones_nativas():
+    """Particiones {nombre: mes} de la tabla auditoria, o None si no está particionada"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL',
+            [TABLA],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    if not nombres:
+        return None
+    return {
+        nombre: date(int(nombre[1:5]), int(nombre[5:7]), 1)
+        for nombre in nombres if re.fullmatch(r'p\d{6}', nombre)
+    }
+
+
+def _definicion_particion(mes):
+    return "PARTITION p{:%Y%m} VALUES LESS THAN ('{:%Y-%m-%d} 00:00:00')".format(mes, _sumar_meses(mes, 1))
+
+
+def particionar(ahora=None):
+    """
+    Convierte la tabla auditoria de MySQL/MariaDB en particiones mensuales.
+
+    Operación única y bloqueante: MySQL exige que la clave primaria incluya
+    fecha y no admite claves foráneas en tablas particionadas, por eso se
+    elimina la FK a usuarios y la clave pasa a ser (id, fecha).
+    """
+    if connection.vendor != 'mysql':
+        raise ValueError('Las particiones nativas solo se usan en MySQL/MariaDB')
+    if particiones_nativas() is not None:
+        return False
+    actual = mes_de(ahora or timezone.now())
+    primera = Auditoria.objects.aggregate(minimo=Min('fecha'))['minimo']
+    mes = mes_de(primera) if primera else actual
+    definiciones = []
+    while mes <= _sumar_meses(actual, 1):
+        definiciones.append(_definicion_particion(mes))
+        mes = _sumar_meses(mes, 1)
+    definiciones.append(f'PARTITION {PARTICION_FUTURA} VALUES LESS THAN (MAXVALUE)')
+
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        restricciones = connection.introspection.get_constraints(cursor, TABLA)
+        for nombre, restriccion in restricciones.items():
+            if restriccion['foreign_key']:
+                cursor.execute(f'ALTER TABLE {q(TABLA)} DROP FOREIGN KEY {q(nombre)}')
+        cursor.execute(
+            f'ALTER TABLE {q(TABLA)} DROP PRIMARY KEY, ADD PRIMARY KEY ({q("id")}, {q("fecha")}) '
+            f'PARTITION BY RANGE COLUMNS({q("fecha")}) ({", ".join(definiciones)})'
+        )
+    return True
+
+
+def preparar_particiones(ahora=None, adelantados=1):
+    """Crea las particiones del mes actual y los ``adelantados`` siguientes"""
+    particiones = particiones_nativas()
+    if particiones is None:
+        return []
+    actual = mes_de(ahora or timezone.now())
+    ultimo = max(particiones.values(), default=_sumar_meses(actual, -1))
+    nuevas = []
+    mes = _sumar_meses(ultimo, 1)
+    while mes <= _sumar_meses(actual, adelantados):
+        nuevas.append(mes)
+        mes = _sumar_meses(mes, 1)
+    if nuevas:
+        q = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {q(TABLA)} REORGANIZE PARTITION {PARTICION_FUTURA} INTO ('
+                + ', '.join(_definicion_particion(mes) for mes in nuevas)
+                + f', PARTITION {PARTICION_FUTURA} VALUES LESS THAN (MAXVALUE))'
+            )
+    return nuevas
+
+
+# Movimiento de meses fuera de la ventana caliente
+
+def _filas_mes(mes):
+    return Auditoria.objects.filter(fecha__gte=inicio_mes(mes), fecha__lt=inicio_mes(_sumar_meses(mes, 1)))
+
+
+def _mover_particion(mes):
+    """
+    Intercambia la partición del mes con una tabla nueva y la elimina.
+    Retomable: una tabla de archivo que quedó de una corrida interrumpida
+    se descarta si está vacía y el mes sigue en la partición, o se conserva
+    si el intercambio ya se hizo (solo falta eliminar la partición vacía).
+    """
+    q = connection.ops.quote_name
+    modelo = modelo_archivo(mes)
+    tabla = q(modelo._meta.db_table)
+    existe = modelo._meta.db_table in connection.introspection.table_names()
+    with connection.cursor() as cursor:
+        if existe and _filas_mes(mes).exists():
+            if modelo.objects.exists():
+                raise RuntimeError(
+                    f'{modelo._meta.db_table} tiene filas y el mes {mes:%Y-%m} sigue en {TABLA}'
+                )
+            cursor.execute(f'DROP TABLE {tabla}')
+            existe = False
+        if not existe:
+            cursor.execute(f'CREATE TABLE {tabla} LIKE {q(TABLA)}')
+            cursor.execute(f'ALTER TABLE {tabla} REMOVE PARTITIONING')
+            cursor.execute(f'ALTER TABLE {q(TABLA)} EXCHANGE PARTITION p{mes:%Y%m} WITH TABLE {tabla}')
+        cursor.execute(f'ALTER TABLE {q(TABLA)} DROP PARTITION p{mes:%Y%m}')
+    return modelo.objects.count()
+
+
+def _copiar_mes(mes, lote):
+    modelo = modelo_archivo(mes)
+    if modelo._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(modelo)
+    q = connection.ops.quote_name
+    columnas = ', '.join(q(c) for c in COLUMNAS)
+    rango = _filas_mes(mes)
+    movidas = 0
+    while True:
+        with transaction.atomic():
+            ids = list(rango.order_by('id').values_list('id', flat=True)[:lote])
+            if not ids:
+                return movidas
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {q(modelo._meta.db_table)} ({columnas}) '
+                    f'SELECT {columnas} FROM {q(TABLA)} WHERE {q("id")} IN ({", ".join(["%s"] * len(ids))})',
+                    ids,
+                )
+            Auditoria.objects.filter(id__in=ids).delete()
+        movidas += len(ids)
+
+
+def archivar_mes(mes, lote=5000):
+    """Saca el mes de la tabla auditoria a su tabla de archivo; retorna las filas movidas"""
+    particiones = particiones_nativas()
+    if particiones is not None and f'p{mes:%Y%m}' in particiones:
+        return _mover_particion(mes)
+    return _copiar_mes(mes, lote)
+
+
+def _meses_vencidos_calientes(limite):
+    """Meses anteriores a la ventana caliente que siguen en la tabla auditoria"""
+    particiones = particiones_nativas()
+    if particiones is not None:
+        return sorted(mes for mes in particiones.values() if inicio_mes(mes) < limite)
+    return [
+        mes_de(inicio) for inicio in
+        Auditoria.objects.filter(fecha__lt=limite).datetimes('fecha', 'month', tzinfo=dt_timezone.utc)
+    ]
+
+
+# Exportación
+
+def exportar_mes(mes, directorio=None, lote=5000):
+    """
+    Exporta la tabla de archivo del mes a JSONL comprimido y la elimina.
+    Retorna la ruta del archivo; la tabla se conserva si el conteo no cuadra.
+    """
+    modelo = modelo_archivo(mes)
+    ruta = ruta_mes(mes, directorio)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    escritas = 0
+    with gzip.open(temporal, 'wt', encoding='utf-8') as archivo:
+        # Por páginas keyset: iterator() con PyMySQL trae el mes completo a memoria
+        for fila in iterar_keyset(modelo.objects.values(*COLUMNAS), 'id', lote=lote):
+            archivo.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            escritas += 1
+    total = modelo.objects.count()
+    if escritas != total:
+        temporal.unlink()
+        raise RuntimeError(f'{modelo._meta.db_table}: se exportaron {escritas} de {total} filas')
+    os.replace(temporal, ruta)
+    with connection.schema_editor() as editor:
+        editor.delete_model(modelo)
+    return ruta
+
+
+def leer_mes(mes, directorio=None, lote=5000):
+    """Eventos de un mes fuera de la ventana caliente (tabla de archivo o JSONL)"""
+    if tabla_mes(mes) in connection.introspection.table_names():
+        yield from iterar_keyset(modelo_archivo(mes).objects.values(*COLUMNAS), 'id', lote=lote)
+        return
+    ruta = ruta_mes(mes, directorio)
+    if ruta.exists():
+        with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+            for linea in archivo:
+                yield json.loads(linea)
+
+
+def aplicar_retencion(ahora=None, meses_calientes=None, meses_retencion=None, directorio=None, lote=5000):
+    """
+    Prepara las particiones próximas, archiva los meses que salieron de la
+    ventana caliente y exporta los que superan la retención. Retorna
+    {'particiones': [...], 'archivados': {mes: filas}, 'exportados': {mes: ruta}}
+    """
+    ahora = ahora or timezone.now()
+    meses_calientes = MESES_CALIENTES if meses_calientes is None else meses_calientes
+    meses_retencion = max(MESES_RETENCION if meses_retencion is None else meses_retencion, meses_calientes)
+
+    resultado = {'particiones': preparar_particiones(ahora), 'archivados': {}, 'exportados': {}}
+    for mes in _meses_vencidos_calientes(inicio_caliente(ahora, meses_calientes)):
+        resultado['archivados'][mes] = archivar_mes(mes, lote)
+
+    limite = inicio_caliente(ahora, meses_retencion)
+    for mes in meses_archivados():
+        if inicio_mes(mes) < limite:
+            resultado['exportados'][mes] = exportar_mes(mes, directorio, lote)
+    return resultado
@@ -0,0 +1,229 @@
+"""
+Rollups incrementales de tiempo en estado y MTTR desde estados_historicos.
+
+procesar_historial() lee solo las filas de EstadoHistorico posteriores a
+la marca (último id procesado), reconstruye los intervalos entre cambios
+de estado de cada ticket y suma sus duraciones en tablas diarias por
+(estado, categoría, data center, proveedor, prioridad). Cada lote y el
+avance de la marca se guardan en la misma transacción.
+
+Un intervalo se asigna al día en que el ticket sale del estado, y una
+resolución al día en que entra al estado Cerrado; los reportes sobre un
+rango de fechas agregan esas filas diarias sin recorrer el historial.
+"""
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .catalogos import catalogo
+from .models import (
+    EstadoHistorico, Ticket, RollupMarca, TiempoEstadoDiario, ResolucionDiaria,
+)
+
+
+MARCA_HISTORIAL = 'estados_historicos'
+ESTADO_CERRADO = 'Cerrado'
+
+# Dimensión de reporte -> (columna del rollup, catálogo con los nombres)
+DIMENSIONES = {
+    'categoria': ('categoria_id', 'categorias'),
+    'dc': ('dc_id', 'data_centers'),
+    'proveedor': ('proveedor_id', 'proveedores'),
+    'prioridad': ('prioridad', None),
+}
+
+
+def _sumar(modelo, acumulado, claves, sumas):
+    """
+    INSERT ... ON CONFLICT que suma ``sumas`` sobre las filas existentes
+    con la misma clave única (ON DUPLICATE KEY UPDATE en MariaDB).
+    """
+    if not acumulado:
+        return
+    q = connection.ops.quote_name
+    tabla = q(modelo._meta.db_table)
+    columnas = claves + sumas
+    fila = '(' + ', '.join(['%s'] * len(columnas)) + ')'
+    if connection.vendor == 'mysql':
+        conflicto = 'ON DUPLICATE KEY UPDATE ' + ', '.join(
+            f'{q(c)} = {q(c)} + VALUES({q(c)})' for c in sumas
+        )
+    else:
+        conflicto = 'ON CONFLICT ({}) DO UPDATE SET {}'.format(
+            ', '.join(q(c) for c in claves),
+            ', '.join(f'{q(c)} = {tabla}.{q(c)} + excluded.{q(c)}' for c in sumas),
+        )
+    campos = [modelo._meta.get_field(c) for c in columnas]
+    items = list(acumulado.items())
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(items), 500):
+            lote = items[inicio:inicio + 500]
+            sql = 'INSERT INTO {} ({}) VALUES {} {}'.format(
+                tabla, ', '.join(q(c) for c in columnas),
+                ', '.join([fila] * len(lote)), conflicto,
+            )
+            cursor.execute(sql, [
+                campo.get_db_prep_value(valor, connection)
+                for clave, valores in lote
+                for campo, valor in zip(campos, (*clave, *valores))
+            ])
+
+
+def _ultimos_previos(tickets, hasta_id):
+    """Último cambio de estado ya procesado (id <= hasta_id) de cada ticket"""
+    if not hasta_id:
+        return {}
+    ultimos = (
+        EstadoHistorico.objects.filter(ticket_id__in=tickets, id__lte=hasta_id)
+        .order_by().values('ticket_id').annotate(ultimo=Max('id')).values('ultimo')
+    )
+    return {
+        ticket_id: (fecha, estado_id)
+        for ticket_id, fecha, estado_id in EstadoHistorico.objects.filter(id__in=ultimos)
+        .values_list('ticket_id', 'fecha_cambio', 'estado_id')
+    }
+
+
+def _acumular_lote(filas, hasta_id, cerrado_id):
+    """Suma los intervalos que cierran las filas nuevas del lote"""
+    secuencias = {}
+    for pk, ticket_id, estado_id, fecha in filas:
+        secuencias.setdefault(ticket_id, []).append((fecha, pk, estado_id))
+    tickets = list(secuencias)
+
+    dimensiones = {
+        pk: (categoria or 0, dc or 0, proveedor or 0, prioridad or '')
+        for pk, categoria, dc, proveedor, prioridad in Ticket.objects.filter(pk__in=tickets)
+        .values_list('id', 'categoria_id', 'dc_id', 'proveedor_id', 'prioridad')
+    }
+    previos = _ultimos_previos(tickets, hasta_id)
+    cierran = [t for t, cambios in secuencias.items() if any(e == cerrado_id for _, _, e in cambios)]
+    inicios = dict(
+        EstadoHistorico.objects.filter(ticket_id__in=cierran)
+        .order_by().values('ticket_id').annotate(inicio=Min('fecha_cambio'))
+        .values_list('ticket_id', 'inicio')
+    ) if cierran else {}
+
+    tiempos, resoluciones = {}, {}
+    for ticket_id, cambios in secuencias.items():
+        dims = dimensiones.get(ticket_id, (0, 0, 0, ''))
+        cambios.sort()
+        anterior = previos.get(ticket_id)
+        for fecha, _, estado_id in cambios:
+            dia = timezone.localdate(fecha)
+            if anterior is not None:
+                segundos = (fecha - anterior[0]).total_seconds()
+                # Filas fuera de orden (fecha anterior a la ya procesada) no suman
+                if segundos >= 0:
+                    valores = tiempos.setdefault((dia, anterior[1], *dims), [0, 0])
+                    valores[0] += 1
+                    valores[1] += int(segundos)
+            if estado_id == cerrado_id and ticket_id in inicios:
+                valores = resoluciones.setdefault((dia, *dims), [0, 0])
+                valores[0] += 1
+                valores[1] += int((fecha - inicios[ticket_id]).total_seconds())
+            anterior = (fecha, estado_id)
+
+    claves = ['categoria_id', 'dc_id', 'proveedor_id', 'prioridad']
+    _sumar(TiempoEstadoDiario, tiempos, ['dia', 'estado_id', *claves], ['salidas', 'segundos'])
+    _sumar(ResolucionDiaria, resoluciones, ['dia', *claves], ['resueltos', 'segundos'])
+
+
+def _estado_cerrado_id():
+    for estado in catalogo('estados'):
+        if estado.nombre == ESTADO_CERRADO:
+            return estado.pk
+    return None
+
+
+def procesar_historial(lote=5000, maximo=None):
+    """
+    Procesa el historial nuevo desde la marca, en lotes transaccionales.
+    Retorna la cantidad de filas procesadas.
+    """
+    cerrado_id = _estado_cerrado_id()
+    procesadas = 0
+    while maximo is None or procesadas < maximo:
+        with transaction.atomic():
+            # select_for_update serializa ejecuciones concurrentes del rollup
+            RollupMarca.objects.get_or_create(nombre=MARCA_HISTORIAL)
+            marca = RollupMarca.objects.select_for_update().get(nombre=MARCA_HISTORIAL)
+            filas = list(
+                EstadoHistorico.objects.filter(id__gt=marca.ultimo_id)
+                .order_by('id').values_list('id', 'ticket_id', 'estado_id', 'fecha_cambio')[:lote]
+            )
+            if not filas:
+                break
+            _acumular_lote(filas, marca.ultimo_id, cerrado_id)
+            marca.ultimo_id = filas[-1][0]
+            marca.save(update_fields=['ultimo_id', 'actualizado'])
+        procesadas += len(filas)
+    return procesadas
+
+
+def reiniciar_rollups():
+    """Vacía los rollups y la marca para reprocesar todo el historial"""
+    with transaction.atomic():
+        TiempoEstadoDiario.objects.all().delete()
+        ResolucionDiaria.objects.all().delete()
+        RollupMarca.objects.filter(nombre=MARCA_HISTORIAL).delete()
+
+
+def _nombres(dimension):
+    columna, nombre_catalogo = DIMENSIONES[dimension]
+    if nombre_catalogo is None:
+        return columna, None
+    return columna, {obj.pk: obj.nombre for obj in catalogo(nombre_catalogo)}
+
+
+def _grupo(fila, columna, nombres):
+    valor = fila[columna]
+    if nombres is None:
+        return valor or 'Sin valor'
+    return nombres.get(valor, 'Sin valor')
+
+
+def tiempos_por_estado(desde, hasta, por=None):
+    """
+    Tiempo promedio en cada estado (horas) de los intervalos que terminaron
+    entre ``desde`` y ``hasta`` (fechas, inclusive), opcionalmente por dimensión
+    """
+    columnas = ['estado_id']
+    columna = nombres = None
+    if por:
+        columna, nombres = _nombres(por)
+        columnas.append(columna)
+    filas = (
+        TiempoEstadoDiario.objects.filter(dia__range=(desde, hasta))
+        .values(*columnas).annotate(total_salidas=Sum('salidas'), total_segundos=Sum('segundos'))
+        .order_by(*columnas)
+    )
+    estados = {estado.pk: estado.nombre for estado in catalogo('estados')}
+    return [{
+        'estado': estados.get(fila['estado_id'], fila['estado_id']),
+        'grupo': _grupo(fila, columna, nombres) if por else None,
+        'salidas': fila['total_salidas'],
+        'horas_promedio': round(fila['total_segundos'] / fila['total_salidas'] / 3600, 2),
+    } for fila in filas if fila['total_salidas']]
+
+
+def mttr(desde, hasta, por=None):
+    """Tiempo medio de resolución (horas) de los cierres entre ``desde`` y ``hasta``"""
+    columnas = []
+    columna = nombres = None
+    if por:
+        columna, nombres = _nombres(por)
+        columnas.append(columna)
+    filas = (
+        ResolucionDiaria.objects.filter(dia__range=(desde, hasta))
+        .values(*columnas).annotate(total_resueltos=Sum('resueltos'), total_segundos=Sum('segundos'))
+        .order_by(*columnas)
+    ) if columnas else [
+        ResolucionDiaria.objects.filter(dia__range=(desde, hasta))
+        .aggregate(total_resueltos=Sum('resueltos'), total_segundos=Sum('segundos'))
+    ]
+    return [{
+        'grupo': _grupo(fila, columna, nombres) if por else None,
+        'resueltos': fila['total_resueltos'],
+        'mttr_horas': round(fila['total_segundos'] / fila['total_resueltos'] / 3600, 2),
+    } for fila in filas if fila['total_resueltos']]
@@ -0,0 +1,268 @@
+"""
+Router de réplicas de lectura (DATABASES replica_1, replica_2, ...).
+
+Las escrituras y casi todas las lecturas van a la primaria. Solo las
+vistas de lectura marcadas con leer_de_replica (dashboard, listado,
+detalle, changelists del admin) leen de una réplica, elegida una vez por
+request, y aun ahí se vuelve a la primaria si:
+
+- el request ya escribió (lectura tras escritura),
+- la sesión escribió hace menos de DB_REPLICA_STICKY_SECONDS (cookie),
+- la lectura ocurre dentro de una transacción,
+- ninguna réplica está al día: su retraso medido supera DB_REPLICA_MAX_LAG
+  o no responde. El retraso se mide cada DB_REPLICA_CHECK_INTERVAL s.
+
+Medir el retraso requiere que el usuario de la réplica pueda ver el estado
+de replicación (REPLICATION CLIENT, o REPLICA MONITOR en MariaDB 10.5.9+).
+Sin ese privilegio la réplica nunca se usa: se avisa una vez en el log y
+se cuenta en sigmaops_db_replica_check_errors_total.
+
+El estado de cada request lo crea LecturasMiddleware.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+PRIMARIA = 'default'
+REPLICAS = [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+COOKIE_PRIMARIA = 'sigmaops_primaria'
+RETRASO_MAXIMO = getattr(settings, 'DB_REPLICA_MAX_LAG', 5.0)
+STICKY_SEGUNDOS = getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 10)
+INTERVALO_MEDICION = getattr(settings, 'DB_REPLICA_CHECK_INTERVAL', 5.0)
+
+# Códigos de error de MariaDB/MySQL
+ER_SINTAXIS = 1064
+ER_SIN_PRIVILEGIO = 1227
+
+
+class EstadoLecturas:
+    """Decisiones de ruteo del request en curso (compartido entre sus hilos)"""
+
+    def __init__(self, primaria=False):
+        # La sesión escribió hace poco: todo a la primaria
+        self.primaria = primaria
+        self.replica = False
+        self.escribio = False
+        self.alias = None
+        # Se usó un resultado cacheado que salió de una réplica
+        self.cache_replica = False
+
+
+estado_lecturas = ContextVar('estado_lecturas', default=None)
+
+
+def _codigo_error(error):
+    return error.args[0] if error.args and isinstance(error.args[0], int) else None
+
+
+def retraso_replica(conexion):
+    """Segundos de retraso de la réplica; None si la replicación está detenida"""
+    if conexion.vendor != 'mysql':
+        return 0.0
+    with conexion.cursor() as cursor:
+        # SHOW REPLICA STATUS desde MariaDB 10.5 / MySQL 8.0.22
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except DatabaseError as error:
+            if _codigo_error(error) != ER_SINTAXIS:
+                raise
+            cursor.execute('SHOW SLAVE STATUS')
+        fila = cursor.fetchone()
+        if fila is None:
+            # Sin replicación configurada (p. ej. un proxy a un clúster síncrono)
+            return 0.0
+        columnas = [columna[0] for columna in cursor.description]
+    estado = dict(zip(columnas, fila))
+    # MySQL 8.0.22+ renombró la columna; MariaDB mantiene la anterior
+    retraso = estado.get('Seconds_Behind_Master', estado.get('Seconds_Behind_Source'))
+    return None if retraso is None else float(retraso)
+
+
+class MonitorReplicas:
+    """Último retraso medido por réplica; un solo hilo mide cada vez"""
+
+    def __init__(self, aliases, retraso_maximo=RETRASO_MAXIMO, intervalo=INTERVALO_MEDICION):
+        self.retraso_maximo = retraso_maximo
+        self.intervalo = intervalo
+        # alias -> (retraso o None si no responde, momento de la medición)
+        self.mediciones = {alias: (None, None) for alias in aliases}
+        self._midiendo = set()
+        # Réplicas sin privilegio para leer su estado (ya avisadas en el log)
+        self._sin_privilegio = set()
+        self._lock = threading.Lock()
+
+    def disponibles(self):
+        """Réplicas al día según su última medición (la renueva si venció)"""
+        ahora = time.monotonic()
+        resultado = []
+        for alias, (retraso, medido) in list(self.mediciones.items()):
+            if (medido is None or ahora - medido >= self.intervalo) and self._reservar(alias):
+                retraso = self.medir(alias)
+            if retraso is not None and retraso <= self.retraso_maximo:
+                resultado.append(alias)
+        return resultado
+
+    def medir(self, alias):
+        sin_privilegio = False
+        try:
+            retraso = retraso_replica(connections[alias])
+        except DatabaseError as error:
+            sin_privilegio = _codigo_error(error) == ER_SIN_PRIVILEGIO
+            metrics.mediciones_replica_fallidas.inc(alias, 'privilege' if sin_privilegio else 'error')
+            if not sin_privilegio:
+                logger.warning('Réplica %s no disponible', alias, exc_info=True)
+            retraso = None
+        with self._lock:
+            self.mediciones[alias] = (retraso, time.monotonic())
+            self._midiendo.discard(alias)
+            avisar = sin_privilegio and alias not in self._sin_privilegio
+            if sin_privilegio:
+                self._sin_privilegio.add(alias)
+            else:
+                self._sin_privilegio.discard(alias)
+        if avisar:
+            logger.warning(
+                'Réplica %s: el usuario no puede leer el estado de replicación (requiere '
+                'REPLICATION CLIENT, o REPLICA MONITOR en MariaDB 10.5.9+); sus lecturas '
+                'van a la primaria', alias,
+            )
+        elif not sin_privilegio and (retraso is None or retraso > self.retraso_maximo):
+            logger.warning('Réplica %s fuera de servicio (retraso %s s)', alias, retraso)
+        return retraso
+
+    def _reservar(self, alias):
+        with self._lock:
+            if alias in self._midiendo:
+                return False
+            self._midiendo.add(alias)
+            return True
+
+
+monitor = MonitorReplicas(REPLICAS)
+
+metrics.Medidor(
+    'sigmaops_db_replica_lag_seconds', 'Último retraso medido por réplica (-1 si no responde)',
+    lambda: {
+        (alias,): -1 if retraso is None else retraso
+        for alias, (retraso, medido) in monitor.mediciones.items() if medido is not None
+    },
+    etiquetas=('alias',),
+)
+
+
+def _respaldo(motivo):
+    metrics.lecturas_primaria.inc(motivo)
+    return PRIMARIA
+
+
+class ReplicaRouter:
+    """DATABASE_ROUTERS: lecturas de vistas marcadas a réplicas, el resto a la primaria"""
+
+    def db_for_read(self, model, **hints):
+        estado = estado_lecturas.get()
+        # CACHE_BACKEND=db: las versiones de la cache se leen de la primaria
+        if estado is None or not estado.replica or model._meta.app_label == 'django_cache':
+            return PRIMARIA
+        if connections[PRIMARIA].in_atomic_block:
+            return _respaldo('transaccion')
+        if estado.alias is not None:
+            return estado.alias
+        if estado.escribio:
+            return _respaldo('escritura')
+        disponibles = monitor.disponibles()
+        if not disponibles:
+            return _respaldo('retraso')
+        # Una sola réplica por request: lecturas consistentes entre sí
+        estado.alias = random.choice(disponibles)
+        return estado.alias
+
+    def db_for_write(self, model, **hints):
+        estado = estado_lecturas.get()
+        # Escribir la cache no es un cambio de datos que deba leerse de la primaria
+        if estado is not None and model._meta.app_label != 'django_cache':
+            estado.escribio = True
+            estado.alias = None
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas y primaria tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARIA
+
+
+def permitir_replica(request):
+    """Habilita las réplicas para el resto del request (solo GET/HEAD)"""
+    estado = estado_lecturas.get()
+    if estado is None or not REPLICAS or request.method not in ('GET', 'HEAD'):
+        return
+    if estado.primaria:
+        metrics.lecturas_primaria.inc('sesion')
+        return
+    estado.replica = True
+
+
+def lee_de_replica():
+    """True si las lecturas del request en curso pueden ir a una réplica"""
+    estado = estado_lecturas.get()
+    return estado is not None and estado.replica and not estado.primaria and not estado.escribio
+
+
+def leyo_de_replica():
+    """
+    True si el request en curso ya leyó de una réplica (y no escribió),
+    directamente o a través de un resultado cacheado
+    """
+    estado = estado_lecturas.get()
+    return estado is not None and (estado.alias is not None or estado.cache_replica)
+
+
+def marcar_cache_replica():
+    """Registra que el request usó un resultado cacheado calculado en una réplica"""
+    estado = estado_lecturas.get()
+    if estado is not None:
+        estado.cache_replica = True
+
+
+def ttl_lectura(ttl):
+    """
+    TTL para cachear un resultado calculado en este request: si salió de
+    una réplica puede no tener el último cambio, así que dura como mucho el
+    retraso tolerado
+    """
+    return min(ttl, RETRASO_MAXIMO) if leyo_de_replica() else ttl
+
+
+def leer_de_replica(vista):
+    """Decorador de vistas (síncronas o async) que pueden leer de una réplica"""
+    if iscoroutinefunction(vista):
+        @functools.wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            permitir_replica(request)
+            return await vista(request, *args, **kwargs)
+    else:
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            permitir_replica(request)
+            return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def marcar_escritura(response, estado):
+    """Tras una escritura, la sesión lee de la primaria por STICKY_SEGUNDOS"""
+    if estado.escribio and REPLICAS:
+        response.set_cookie(COOKIE_PRIMARIA, '1', max_age=STICKY_SEGUNDOS, httponly=True, samesite='Lax')
+    return response
@@ -0,0 +1,164 @@
+"""
+Búsqueda de tickets sobre un índice invertido mantenido incrementalmente.
+
+El índice (tabla indice_busqueda) guarda un registro por término y origen:
+los campos del ticket (observacion = NULL) o cada observación. Al ser tablas
+normales con índice B-tree funciona igual en MariaDB y en SQLite.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, Subquery, Sum, When
+
+from .models import IndiceBusqueda
+
+
+# Peso de cada aparición de un término según el campo de origen
+PESO_CODIGO = 10.0
+PESO_TITULO = 5.0
+PESO_DESCRIPCION = 1.0
+PESO_OBSERVACION = 0.5
+
+LARGO_MINIMO = 2
+LARGO_MAXIMO = 64
+
+STOPWORDS = frozenset("""
+    a al con de del el en es la las lo los no o para por que se su un una y
+""".split())
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Lista de términos indexables del texto"""
+    if not texto:
+        return []
+    return [
+        t[:LARGO_MAXIMO] for t in _TOKEN_RE.findall(normalizar(texto))
+        if (len(t) >= LARGO_MINIMO or t.isdigit()) and t not in STOPWORDS
+    ]
+
+
+def pesos_ticket(ticket):
+    """Peso acumulado de cada término en los campos del ticket"""
+    pesos = Counter()
+    for campo, peso in (
+        (ticket.codigo, PESO_CODIGO),
+        (ticket.titulo, PESO_TITULO),
+        (ticket.descripcion, PESO_DESCRIPCION),
+    ):
+        for termino in tokenizar(campo):
+            pesos[termino] += peso
+    return pesos
+
+
+def pesos_observacion(comentario):
+    """Peso acumulado de cada término en el comentario de una observación"""
+    pesos = Counter()
+    for termino in tokenizar(comentario):
+        pesos[termino] += PESO_OBSERVACION
+    return pesos
+
+
+def indexar_ticket(ticket):
+    """Reemplaza los términos de los campos del ticket en el índice"""
+    pesos = pesos_ticket(ticket)
+    with transaction.atomic():
+        IndiceBusqueda.objects.filter(ticket_id=ticket.pk, observacion__isnull=True).delete()
+        IndiceBusqueda.objects.bulk_create([
+            IndiceBusqueda(termino=termino, ticket_id=ticket.pk, peso=peso)
+            for termino, peso in pesos.items()
+        ])
+
+
+def indexar_tickets(tickets):
+    """Versión por lotes de indexar_ticket para cargas masivas"""
+    tickets = list(tickets)
+    with transaction.atomic():
+        IndiceBusqueda.objects.filter(
+            ticket_id__in=[t.pk for t in tickets], observacion__isnull=True
+        ).delete()
+        IndiceBusqueda.objects.bulk_create([
+            IndiceBusqueda(termino=termino, ticket_id=ticket.pk, peso=peso)
+            for ticket in tickets
+            for termino, peso in pesos_ticket(ticket).items()
+        ], batch_size=1000)
+
+
+def indexar_observacion(observacion):
+    """Reemplaza los términos de una observación en el índice"""
+    pesos = pesos_observacion(observacion.comentario)
+    with transaction.atomic():
+        IndiceBusqueda.objects.filter(observacion_id=observacion.pk).delete()
+        IndiceBusqueda.objects.bulk_create([
+            IndiceBusqueda(
+                termino=termino, ticket_id=observacion.ticket_id,
+                observacion_id=observacion.pk, peso=peso,
+            )
+            for termino, peso in pesos.items()
+        ])
+
+
+def ranking(texto, incluir_observaciones=False):
+    """
+    Queryset ``values('ticket_id', 'relevancia')`` con los tickets que
+    contienen todos los términos de ``texto`` (como prefijo), ordenado por
+    relevancia. Retorna None si el texto no tiene términos indexables.
+    """
+    terminos = list(dict.fromkeys(tokenizar(texto)))
+    if not terminos:
+        return None
+
+    postings = IndiceBusqueda.objects.all()
+    if not incluir_observaciones:
+        postings = postings.filter(observacion__isnull=True)
+
+    # Los términos ya están en minúsculas: istartswith compila a LIKE 'x%'
+    # (usa idx_busqueda_termino); startswith sería LIKE BINARY en MariaDB,
+    # que con la collation por defecto recorre toda la tabla
+    condicion = Q()
+    coincidencias = {}
+    for i, termino in enumerate(terminos):
+        condicion |= Q(termino__istartswith=termino)
+        coincidencias[f'_t{i}'] = Max(Case(
+            When(termino__istartswith=termino, then=1),
+            default=0, output_field=IntegerField(),
+        ))
+
+    return (
+        postings.filter(condicion)
+        .values('ticket_id')
+        .annotate(relevancia=Sum('peso'), **coincidencias)
+        .filter(**{alias: 1 for alias in coincidencias})
+        .values('ticket_id', 'relevancia')
+        .order_by('-relevancia')
+    )
+
+
+def buscar(queryset, texto, incluir_observaciones=False):
+    """
+    Filtra un queryset de Ticket por ``texto`` y lo anota con ``relevancia``.
+    Si el texto no tiene términos indexables (una letra, solo signos) busca
+    el texto literal en código y título, sin ``relevancia``.
+    """
+    resultados = ranking(texto, incluir_observaciones)
+    if resultados is None:
+        texto = (texto or '').strip()
+        if not texto:
+            return queryset.none()
+        return queryset.filter(Q(codigo__icontains=texto) | Q(titulo__icontains=texto))
+    return queryset.filter(
+        pk__in=resultados.order_by().values('ticket_id')
+    ).annotate(
+        relevancia=Subquery(
+            resultados.filter(ticket_id=OuterRef('pk')).values('relevancia')[:1]
+        )
+    )
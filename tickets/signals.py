@@ -0,0 +1,164 @@
+"""
+Señales del módulo tickets para mantener caches e índices derivados
+"""
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .adjuntos import liberar_contenido
+from .auditoria import registrar
+from .catalogos import MODELOS_CATALOGO, invalidar_catalogo
+from .fragmentos import invalidar_conjunto, invalidar_ticket
+from .grafo import relacion_eliminada, relacion_guardada
+from .middleware import cache_roles, resolver_rol
+from .models import (
+    Ticket, Observacion, Usuario, Rol, EstadoHistorico, SlaControl,
+    ArchivoAdjunto, Asignacion, RelacionTicket,
+)
+from .search import indexar_ticket, indexar_observacion
+from .similitud import indexar_similitud
+from .stats import invalidar_estadisticas
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def ticket_modificado(sender, instance, **kwargs):
+    """Invalida las estadísticas del dashboard al cambiar un ticket"""
+    invalidar_estadisticas()
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def ticket_invalidar_fragmentos(sender, instance, **kwargs):
+    """
+    Invalida el detalle y la fila cacheados del ticket, el detalle de los
+    tickets relacionados (muestran su código y estado) y las tarjetas del
+    dashboard
+    """
+    invalidar_conjunto()
+    relacionados = RelacionTicket.objects.filter(
+        Q(ticket_padre_id=instance.pk) | Q(ticket_hijo_id=instance.pk)
+    ).values_list('ticket_padre_id', 'ticket_hijo_id')
+    invalidar_ticket(instance.pk, *{pk for fila in relacionados for pk in fila} - {instance.pk})
+
+
+@receiver(post_save, sender=Observacion)
+@receiver(post_delete, sender=Observacion)
+@receiver(post_save, sender=EstadoHistorico)
+@receiver(post_delete, sender=EstadoHistorico)
+@receiver(post_save, sender=SlaControl)
+@receiver(post_delete, sender=SlaControl)
+@receiver(post_save, sender=ArchivoAdjunto)
+@receiver(post_delete, sender=ArchivoAdjunto)
+@receiver(post_save, sender=Asignacion)
+@receiver(post_delete, sender=Asignacion)
+def relacion_ticket_modificada(sender, instance, **kwargs):
+    """Invalida el detalle cacheado del ticket dueño de la fila"""
+    invalidar_ticket(instance.ticket_id)
+
+
+@receiver(post_save, sender=RelacionTicket)
+@receiver(post_delete, sender=RelacionTicket)
+def relacion_entre_tickets_modificada(sender, instance, **kwargs):
+    """Invalida el detalle cacheado de ambos extremos de la relación"""
+    invalidar_ticket(instance.ticket_padre_id, instance.ticket_hijo_id)
+
+
+@receiver(post_delete, sender=ArchivoAdjunto)
+def adjunto_eliminado(sender, instance, **kwargs):
+    """Borra el contenido en disco si ya no lo referencia otro adjunto"""
+    if instance.ruta_almacenamiento:
+        liberar_contenido(instance.ruta_almacenamiento)
+
+
+@receiver(post_save, sender=RelacionTicket)
+def relacion_grafo_guardada(sender, instance, **kwargs):
+    """Publica la arista nueva o modificada al índice de dependencias"""
+    relacion_guardada(instance)
+
+
+@receiver(post_delete, sender=RelacionTicket)
+def relacion_grafo_eliminada(sender, instance, **kwargs):
+    """Publica la baja de la arista al índice de dependencias"""
+    relacion_eliminada(instance.pk)
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_indexar(sender, instance, **kwargs):
+    """Actualiza los términos del ticket en el índice de búsqueda"""
+    indexar_ticket(instance)
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_indexar_similitud(sender, instance, **kwargs):
+    """Actualiza las bandas MinHash del ticket para sugerir duplicados"""
+    indexar_similitud(instance)
+
+
+@receiver(post_save, sender=Observacion)
+def observacion_indexar(sender, instance, **kwargs):
+    """Actualiza los términos de la observación en el índice de búsqueda"""
+    indexar_observacion(instance)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+def rol_modificado(sender, instance, **kwargs):
+    """Vacía la cache de roles del middleware"""
+    cache_roles.clear()
+
+
+def catalogo_modificado(sender, instance, **kwargs):
+    """Incrementa la versión del catálogo para que los procesos lo recarguen"""
+    invalidar_catalogo(sender)
+
+
+for _modelo in MODELOS_CATALOGO.values():
+    post_save.connect(catalogo_modificado, sender=_modelo, dispatch_uid=f'catalogo_{_modelo.__name__}_save')
+    post_delete.connect(catalogo_modificado, sender=_modelo, dispatch_uid=f'catalogo_{_modelo.__name__}_delete')
+
+
+# Auditoría: descripción breve de cada entidad auditada, sin consultas extra
+DESCRIPCIONES_AUDITORIA = {
+    Ticket: lambda t: f'{t.codigo} estado={t.estado_id} prioridad={t.prioridad}',
+    Observacion: lambda o: f'ticket={o.ticket_id} tipo={o.tipo}',
+    Asignacion: lambda a: f'ticket={a.ticket_id} usuario={a.usuario_id} rol={a.rol_asignacion} activo={a.activo}',
+}
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=Observacion)
+@receiver(post_save, sender=Asignacion)
+def auditar_guardado(sender, instance, created, raw=False, **kwargs):
+    """Encola INSERT/UPDATE en la auditoría"""
+    if raw:
+        return
+    registrar(
+        sender._meta.db_table, 'INSERT' if created else 'UPDATE', instance.pk,
+        DESCRIPCIONES_AUDITORIA[sender](instance),
+    )
+
+
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=Observacion)
+@receiver(post_delete, sender=Asignacion)
+def auditar_borrado(sender, instance, **kwargs):
+    """Encola DELETE en la auditoría"""
+    registrar(sender._meta.db_table, 'DELETE', instance.pk, DESCRIPCIONES_AUDITORIA[sender](instance))
+
+
+@receiver(user_logged_in)
+@receiver(user_logged_out)
+def auditar_sesion(sender, request, user, **kwargs):
+    """Encola LOGIN/LOGOUT con el usuario de la tabla usuarios, si existe"""
+    if user is None:
+        return
+    accion = 'LOGIN' if kwargs['signal'] is user_logged_in else 'LOGOUT'
+    try:
+        usuario_id, _ = resolver_rol(user)
+    except Exception:
+        usuario_id = None
+    registrar('usuarios', accion, usuario_id, f'{accion.lower()} de {user.get_username()}', usuario_id=usuario_id)
@@ -0,0 +1,165 @@
+"""
+Sugerencia de tickets duplicados con MinHash y LSH.
+
+El título (y el título junto a la descripción, si la hay) se normaliza con
+los mismos términos que la búsqueda y se corta en shingles de caracteres.
+Su firma MinHash se divide en bandas; cada banda se guarda como un hash en
+la tabla banda_similitud, solo para tickets abiertos. Un borrador se
+compara buscando sus bandas por hash (índice B-tree): los tickets con
+alguna banda igual son candidatos y solo sobre ellos se calcula la
+similitud de Jaccard exacta.
+
+Con BANDAS x FILAS = 20 x 3, un par con Jaccard 0.4 comparte al menos una
+banda con probabilidad ~0.75 y uno con 0.6, ~0.99. Cambiar estas
+constantes o las semillas exige ejecutar reindexar_busqueda.
+"""
+import hashlib
+import random
+import struct
+import zlib
+from collections import Counter
+
+from django.db import transaction
+
+from .catalogos import catalogo
+from .models import BandaSimilitud, Ticket
+from .search import tokenizar
+
+
+LARGO_SHINGLE = 4
+LARGO_TEXTO = 1000
+PERMUTACIONES = 60
+BANDAS = 20
+FILAS = PERMUTACIONES // BANDAS
+# Bandas 0..19 del título y 20..39 del título con la descripción
+BANDA_TEXTO = BANDAS
+UMBRAL_SIMILITUD = 0.4
+MAX_CANDIDATOS = 50
+ESTADO_CERRADO = 'Cerrado'
+
+_PRIMO = (1 << 61) - 1
+_azar = random.Random(61)
+_COEFICIENTES = [(_azar.randrange(1, _PRIMO), _azar.randrange(_PRIMO)) for _ in range(PERMUTACIONES)]
+
+
+def shingles(texto):
+    """Conjunto de shingles de caracteres del texto normalizado"""
+    normal = ' '.join(tokenizar(texto))[:LARGO_TEXTO]
+    if len(normal) <= LARGO_SHINGLE:
+        return {normal} if normal else set()
+    return {normal[i:i + LARGO_SHINGLE] for i in range(len(normal) - LARGO_SHINGLE + 1)}
+
+
+def firma(conjunto):
+    """Firma MinHash: el mínimo de cada permutación (a*x + b) mod p"""
+    valores = [zlib.crc32(s.encode()) for s in conjunto]
+    return [min((a * x + b) % _PRIMO for x in valores) for a, b in _COEFICIENTES]
+
+
+def _bandas(conjunto, inicio):
+    valores = firma(conjunto)
+    for i in range(BANDAS):
+        resumen = hashlib.blake2b(struct.pack(f'>{FILAS}Q', *valores[i * FILAS:(i + 1) * FILAS]), digest_size=8)
+        yield inicio + i, int.from_bytes(resumen.digest(), 'big', signed=True)
+
+
+def _conjuntos(titulo, descripcion):
+    titulo_sh = shingles(titulo)
+    texto_sh = shingles(f'{titulo or ""} {descripcion}') if descripcion and titulo_sh else None
+    return titulo_sh, texto_sh
+
+
+def bandas_ticket(titulo, descripcion=None):
+    """Lista de (banda, hash) del título y, si hay descripción, del texto completo"""
+    return _bandas_conjuntos(*_conjuntos(titulo, descripcion))
+
+
+def _bandas_conjuntos(titulo_sh, texto_sh):
+    if not titulo_sh:
+        return []
+    bandas = list(_bandas(titulo_sh, 0))
+    if texto_sh:
+        bandas.extend(_bandas(texto_sh, BANDA_TEXTO))
+    return bandas
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _estado_cerrado_id():
+    for estado in catalogo('estados'):
+        if estado.nombre == ESTADO_CERRADO:
+            return estado.pk
+    return None
+
+
+def _filas(ticket, cerrado_id):
+    if ticket.estado_id == cerrado_id:
+        return []
+    return [
+        BandaSimilitud(ticket_id=ticket.pk, banda=banda, hash=valor)
+        for banda, valor in bandas_ticket(ticket.titulo, ticket.descripcion)
+    ]
+
+
+def indexar_similitud(ticket):
+    """Reemplaza las bandas del ticket (se quitan al cerrarlo)"""
+    filas = _filas(ticket, _estado_cerrado_id())
+    with transaction.atomic():
+        BandaSimilitud.objects.filter(ticket_id=ticket.pk).delete()
+        BandaSimilitud.objects.bulk_create(filas)
+
+
+def indexar_similitudes(tickets, lote=1000):
+    """Versión por lotes de indexar_similitud para cargas masivas"""
+    tickets = list(tickets)
+    cerrado_id = _estado_cerrado_id()
+    with transaction.atomic():
+        BandaSimilitud.objects.filter(ticket_id__in=[t.pk for t in tickets]).delete()
+        BandaSimilitud.objects.bulk_create(
+            [fila for ticket in tickets for fila in _filas(ticket, cerrado_id)], batch_size=lote,
+        )
+
+
+def sugerir_duplicados(titulo, descripcion=None, excluir=None, limite=5):
+    """
+    Tickets abiertos parecidos al borrador, de mayor a menor similitud:
+    lista de dicts con id, codigo, titulo, estado y similitud (0..1)
+    """
+    titulo_sh, texto_sh = _conjuntos(titulo, descripcion)
+    bandas = set(_bandas_conjuntos(titulo_sh, texto_sh))
+    if not bandas:
+        return []
+
+    votos = Counter(
+        ticket_id for ticket_id, banda, valor in
+        BandaSimilitud.objects.filter(hash__in=[valor for _, valor in bandas])
+        .values_list('ticket_id', 'banda', 'hash')
+        if (banda, valor) in bandas and ticket_id != excluir
+    )
+    if not votos:
+        return []
+    candidatos = [ticket_id for ticket_id, _ in votos.most_common(MAX_CANDIDATOS)]
+
+    filas = Ticket.objects.filter(pk__in=candidatos)
+    cerrado_id = _estado_cerrado_id()
+    if cerrado_id is not None:
+        filas = filas.exclude(estado_id=cerrado_id)
+    sugerencias = []
+    for fila in filas.order_by().values('id', 'codigo', 'titulo', 'descripcion', 'estado__nombre'):
+        similitud = jaccard(titulo_sh, shingles(fila['titulo']))
+        if texto_sh and fila['descripcion']:
+            similitud = max(similitud, jaccard(texto_sh, shingles(f"{fila['titulo']} {fila['descripcion']}")))
+        if similitud >= UMBRAL_SIMILITUD:
+            sugerencias.append({
+                'id': fila['id'],
+                'codigo': fila['codigo'],
+                'titulo': fila['titulo'],
+                'estado': fila['estado__nombre'],
+                'similitud': round(similitud, 2),
+            })
+    sugerencias.sort(key=lambda s: -s['similitud'])
+    return sugerencias[:limite]
@@ -0,0 +1,190 @@
+"""
+Motor de evaluación de SLA por lotes con pronóstico de incumplimiento.
+
+Carga todos los SLA abiertos en una sola consulta y calcula por columnas
+el tiempo transcurrido, el presupuesto restante y la probabilidad de
+incumplir. La probabilidad se estima con la distribución empírica de
+tiempos de resolución de SLA cerrados del mismo grupo (categoría,
+prioridad): P(T > objetivo | T > transcurrido) = S(objetivo) / S(transcurrido).
+
+El resultado se guarda en la tabla sla_evaluacion y un resumen en la
+cache compartida, de donde lo lee el dashboard sin recalcular nada.
+"""
+import bisect
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import SlaControl, SlaEvaluacion
+
+
+CACHE_KEY = 'sla:resumen'
+RESUMEN_TTL = 60
+HISTORIAL_DIAS = getattr(settings, 'SLA_HISTORY_DAYS', 90)
+UMBRAL_RIESGO = getattr(settings, 'SLA_RISK_THRESHOLD', 0.4)
+UMBRAL_CRITICO = getattr(settings, 'SLA_CRITICAL_THRESHOLD', 0.7)
+# Mínimo de SLA cerrados para usar la distribución de un grupo
+MIN_MUESTRAS = 20
+TOP_PROXIMOS = 10
+NIVELES_RIESGO = ('critico', 'riesgo')
+
+
+def _horas(delta):
+    return delta.total_seconds() / 3600
+
+
+def distribuciones(ahora):
+    """
+    Tiempos de resolución (horas, ordenados) de los SLA cerrados en los
+    últimos HISTORIAL_DIAS, por (categoría, prioridad), por prioridad y global
+    """
+    filas = SlaControl.objects.filter(
+        fecha_cierre__isnull=False,
+        fecha_cierre__gte=ahora - timedelta(days=HISTORIAL_DIAS),
+    ).values_list('ticket__categoria_id', 'ticket__prioridad', 'fecha_creacion', 'fecha_cierre')
+
+    grupos = {}
+    for categoria, prioridad, creado, cerrado in filas:
+        horas = _horas(cerrado - creado)
+        for clave in ((categoria, prioridad), prioridad, None):
+            grupos.setdefault(clave, []).append(horas)
+    for muestras in grupos.values():
+        muestras.sort()
+    return grupos
+
+
+def _muestras(grupos, categoria, prioridad):
+    """Distribución más específica con suficientes muestras"""
+    for clave in ((categoria, prioridad), prioridad, None):
+        muestras = grupos.get(clave)
+        if muestras and len(muestras) >= MIN_MUESTRAS:
+            return muestras
+    return grupos.get(None, [])
+
+
+def probabilidad_incumplimiento(muestras, transcurridas, objetivo):
+    """P(T > objetivo | T > transcurridas) según la distribución empírica"""
+    if transcurridas >= objetivo:
+        return 1.0
+    if not muestras:
+        # Sin historial: consumo lineal del presupuesto
+        return transcurridas / objetivo if objetivo else 1.0
+    total = len(muestras)
+    sobreviven = total - bisect.bisect_right(muestras, transcurridas)
+    if not sobreviven:
+        # Ya superó todo lo observado: se asume que seguirá abierto
+        return 1.0
+    incumplen = total - bisect.bisect_right(muestras, objetivo)
+    return incumplen / sobreviven
+
+
+def clasificar(restantes, consumo, probabilidad):
+    if restantes <= 0:
+        return 'vencido'
+    if probabilidad >= UMBRAL_CRITICO or consumo >= 0.9:
+        return 'critico'
+    if probabilidad >= UMBRAL_RIESGO or consumo >= 0.75:
+        return 'riesgo'
+    return 'ok'
+
+
+def evaluar_sla(ahora=None, lote=2000):
+    """
+    Evalúa todos los SLA abiertos, reemplaza la tabla sla_evaluacion y
+    publica el resumen en la cache. Retorna el resumen.
+    """
+    ahora = ahora or timezone.now()
+    grupos = distribuciones(ahora)
+
+    filas = list(
+        SlaControl.objects.filter(fecha_cierre__isnull=True)
+        .exclude(ticket__estado__nombre='Cerrado')
+        .order_by('id')
+        .values_list(
+            'id', 'ticket_id', 'fecha_creacion', 'tiempo_objetivo_horas',
+            'ticket__categoria_id', 'ticket__prioridad',
+        )
+    )
+    if filas:
+        ids, tickets, creados, objetivos, categorias, prioridades = zip(*filas)
+    else:
+        ids = tickets = creados = objetivos = categorias = prioridades = ()
+
+    # Cálculo por columnas sobre todo el conjunto
+    transcurridas = [_horas(ahora - creado) for creado in creados]
+    restantes = [objetivo - horas for objetivo, horas in zip(objetivos, transcurridas)]
+    consumos = [
+        horas / objetivo if objetivo else 1.0
+        for horas, objetivo in zip(transcurridas, objetivos)
+    ]
+    probabilidades = [
+        probabilidad_incumplimiento(_muestras(grupos, categoria, prioridad), horas, objetivo)
+        for categoria, prioridad, horas, objetivo in zip(categorias, prioridades, transcurridas, objetivos)
+    ]
+    niveles = [clasificar(*valores) for valores in zip(restantes, consumos, probabilidades)]
+    vencimientos = [creado + timedelta(hours=objetivo) for creado, objetivo in zip(creados, objetivos)]
+
+    evaluaciones = [
+        SlaEvaluacion(
+            sla_id=sla_id, ticket_id=ticket_id, vence=vence,
+            horas_transcurridas=round(horas, 2), horas_restantes=round(restante, 2),
+            consumo=round(consumo, 4), probabilidad=round(probabilidad, 4),
+            nivel=nivel, evaluado=ahora,
+        )
+        for sla_id, ticket_id, vence, horas, restante, consumo, probabilidad, nivel in zip(
+            ids, tickets, vencimientos, transcurridas, restantes, consumos, probabilidades, niveles
+        )
+    ]
+    # Los lectores ven la evaluación anterior hasta el COMMIT
+    with transaction.atomic():
+        SlaEvaluacion.objects.all().delete()
+        SlaEvaluacion.objects.bulk_create(evaluaciones, batch_size=lote)
+
+    resumen = construir_resumen(ahora)
+    cache.set(CACHE_KEY, resumen, None)
+    return resumen
+
+
+def construir_resumen(evaluado=None):
+    """Contadores por nivel y los próximos SLA en alerta, desde la tabla"""
+    resumen = {nivel: 0 for nivel, _ in SlaEvaluacion.NIVEL_CHOICES}
+    for fila in SlaEvaluacion.objects.order_by().values('nivel').annotate(total=Count('id')):
+        resumen[fila['nivel']] = fila['total']
+
+    proximos = list(
+        SlaEvaluacion.objects.filter(nivel__in=NIVELES_RIESGO)
+        .order_by('vence')
+        .values('ticket_id', 'ticket__codigo', 'ticket__titulo', 'horas_restantes', 'probabilidad', 'nivel')
+        [:TOP_PROXIMOS]
+    )
+    if evaluado is None:
+        evaluado = SlaEvaluacion.objects.order_by('-evaluado').values_list('evaluado', flat=True).first()
+    resumen['en_riesgo'] = resumen['critico'] + resumen['riesgo']
+    resumen['proximos'] = [{
+        'ticket_id': p['ticket_id'],
+        'codigo': p['ticket__codigo'],
+        'titulo': p['ticket__titulo'],
+        'horas_restantes': p['horas_restantes'],
+        'probabilidad': round(p['probabilidad'] * 100),
+        'nivel': p['nivel'],
+    } for p in proximos]
+    resumen['evaluado'] = evaluado
+    return resumen
+
+
+def obtener_resumen_sla():
+    """Resumen publicado por la última evaluación (o leído de la tabla)"""
+    resumen = cache.get(CACHE_KEY)
+    if resumen is None:
+        resumen = construir_resumen()
+        cache.set(CACHE_KEY, resumen, RESUMEN_TTL)
+    return resumen
+
+
+def tickets_por_nivel(niveles):
+    """Subconsulta de ids de ticket con evaluación en los niveles dados"""
+    return SlaEvaluacion.objects.filter(nivel__in=niveles).values('ticket_id')
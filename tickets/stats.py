@@ -0,0 +1,96 @@
+"""
+Estadísticas del dashboard calculadas en una sola consulta y cacheadas
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Ticket
+from .fragmentos import obtener_cacheado, sello_conjunto
+
+
+CACHE_KEY = 'tickets:dashboard_stats'
+CACHE_TTL = getattr(settings, 'DASHBOARD_STATS_TTL', 300)
+CONTEO_TTL = getattr(settings, 'TICKET_LIST_COUNT_TTL', 60)
+
+
+def calcular_estadisticas():
+    """
+    Calcula todos los contadores del dashboard con un único GROUP BY
+    sobre (estado, prioridad, categoría, data center) y los agrega en Python.
+    """
+    grupos = Ticket.objects.order_by().values(
+        'estado__nombre', 'prioridad',
+        'categoria_id', 'categoria__nombre',
+        'dc_id', 'dc__nombre',
+    ).annotate(total=Count('id'))
+
+    stats = {
+        'total_tickets': 0,
+        'tickets_pendientes': 0,
+        'tickets_en_proceso': 0,
+        'tickets_cerrados': 0,
+        'tickets_criticos': 0,
+        'tickets_alta': 0,
+    }
+    por_categoria = {}
+    por_dc = {}
+
+    for grupo in grupos:
+        total = grupo['total']
+        stats['total_tickets'] += total
+
+        estado = grupo['estado__nombre']
+        if estado == 'Pendiente':
+            stats['tickets_pendientes'] += total
+        elif estado == 'En Proceso':
+            stats['tickets_en_proceso'] += total
+        elif estado == 'Cerrado':
+            stats['tickets_cerrados'] += total
+
+        if grupo['prioridad'] == 'Crítica':
+            stats['tickets_criticos'] += total
+        elif grupo['prioridad'] == 'Alta':
+            stats['tickets_alta'] += total
+
+        if grupo['categoria_id'] is not None:
+            item = por_categoria.setdefault(
+                grupo['categoria_id'], {'nombre': grupo['categoria__nombre'], 'total': 0}
+            )
+            item['total'] += total
+        if grupo['dc_id'] is not None:
+            item = por_dc.setdefault(
+                grupo['dc_id'], {'nombre': grupo['dc__nombre'], 'total': 0}
+            )
+            item['total'] += total
+
+    stats['tickets_por_categoria'] = [por_categoria[k] for k in sorted(por_categoria)]
+    stats['tickets_por_dc'] = [por_dc[k] for k in sorted(por_dc)]
+    return stats
+
+
+def obtener_estadisticas():
+    """Retorna el snapshot cacheado, recalculándolo si no existe"""
+    return obtener_cacheado(CACHE_KEY, calcular_estadisticas, CACHE_TTL)
+
+
+def invalidar_estadisticas():
+    """Descarta el snapshot; el próximo request lo recalcula"""
+    cache.delete_many([CACHE_KEY, f'{CACHE_KEY}:replica'])
+
+
+def contar_tickets(filtros, queryset):
+    """
+    Total de tickets para los filtros del listado. Sin filtros se lee del
+    snapshot del dashboard; con filtros el COUNT se cachea por combinación
+    y versión del conjunto de tickets.
+    """
+    activos = sorted((k, str(v)) for k, v in filtros.items() if v)
+    if not activos:
+        return obtener_estadisticas()['total_tickets']
+
+    firma = hashlib.md5(repr(activos).encode()).hexdigest()
+    clave = f'tickets:conteo:{firma}:{sello_conjunto()}'
+    return obtener_cacheado(clave, queryset.order_by().count, CONTEO_TTL)
@@ -1,3 +1,1719 @@
-from django.test import TestCase
+"""
+Pruebas del módulo tickets.
 
-# Create your tests here.
+Los modelos del esquema original son managed = False, así que sus tablas
+se crean aquí sobre la base de pruebas (p. ej. DB_ENGINE=sqlite).
+"""
+import asyncio
+import csv
+import datetime
+import gc
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+import zipfile
+from pathlib import Path
+from unittest import mock
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.core.management.color import no_style
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, ProgrammingError, connection
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+from django.http import FileResponse, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import adjuntos, asincrono, catalogos, condicional, export, grafo, metrics, pagination, retencion, routers, views
+from .asincrono import en_paralelo
+from .forms import TicketForm
+from .auditoria import ColaAuditoria, cola as cola_auditoria
+from .pool import PoolAgotado, PoolConexiones
+from .fragmentos import invalidar_ticket
+from .middleware import RolMiddleware, cache_roles, clave_rol, resolver_rol
+from .rollups import mttr, procesar_historial, reiniciar_rollups, tiempos_por_estado
+from .pagination import CursorInvalido, decodificar_cursor, iterar_keyset, pagina_keyset
+from .search import buscar, ranking
+from .similitud import sugerir_duplicados
+from .stats import calcular_estadisticas, obtener_estadisticas
+from .sla import evaluar_sla, probabilidad_incumplimiento
+from .models import (
+    Rol, Usuario, Estado, Categoria, DataCenter, Elemento, Ticket, Observacion,
+    EstadoHistorico, SlaControl, Asignacion, ArchivoAdjunto, RelacionTicket, SlaEvaluacion,
+    Auditoria, BandaSimilitud,
+)
+
+
+def crear_tablas_no_administradas():
+    existentes = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for modelo in apps.get_app_config('tickets').get_models():
+            if not modelo._meta.managed and modelo._meta.db_table not in existentes:
+                editor.create_model(modelo)
+
+
+def vaciar_tablas_no_administradas():
+    """Para TransactionTestCase: flush solo vacía las tablas administradas"""
+    tablas = [
+        modelo._meta.db_table for modelo in apps.get_app_config('tickets').get_models()
+        if not modelo._meta.managed
+    ]
+    connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tablas, allow_cascade=True))
+
+
+def sql_mariadb(queryset):
+    """SQL del queryset compilado para MySQL/MariaDB (sin conectarse)"""
+    conexion = MySQLDatabaseWrapper(dict(connection.settings_dict, ENGINE='django.db.backends.mysql'), 'mariadb')
+    # Lo que Django consultaría al servidor (versión, modo SQL)
+    conexion.mysql_server_data = {
+        'version': '10.11.8-MariaDB', 'sql_mode': 'STRICT_TRANS_TABLES', 'default_storage_engine': 'InnoDB',
+        'sql_auto_is_null': False, 'lower_case_table_names': False, 'has_zoneinfo_database': True,
+    }
+    sql, parametros = queryset.query.get_compiler(connection=conexion).as_sql()
+    return sql % tuple(repr(p) for p in parametros)
+
+
+class TablasNoAdministradasMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        crear_tablas_no_administradas()
+        super().setUpClass()
+
+
+class EstadisticasTests(TablasNoAdministradasMixin, TestCase):
+    """Snapshot del dashboard en una sola consulta agrupada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        pendiente, proceso, cerrado = (
+            Estado.objects.create(nombre=n) for n in ('Pendiente', 'En Proceso', 'Cerrado')
+        )
+        red, energia = Categoria.objects.create(nombre='Red'), Categoria.objects.create(nombre='Energía')
+        dc = DataCenter.objects.create(nombre='DCL', ubicacion='Santiago')
+        for codigo, estado, prioridad, categoria, centro in (
+            ('INC-1', pendiente, 'Crítica', red, dc),
+            ('INC-2', pendiente, 'Alta', red, None),
+            ('INC-3', proceso, 'Alta', energia, dc),
+            ('INC-4', cerrado, 'Baja', None, dc),
+        ):
+            Ticket.objects.create(codigo=codigo, titulo=codigo, estado=estado, prioridad=prioridad,
+                                  categoria=categoria, dc=centro)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_contadores_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            stats = calcular_estadisticas()
+        self.assertEqual(
+            [stats[k] for k in ('total_tickets', 'tickets_pendientes', 'tickets_en_proceso',
+                                'tickets_cerrados', 'tickets_criticos', 'tickets_alta')],
+            [4, 2, 1, 1, 1, 2],
+        )
+        self.assertEqual(
+            {c['nombre']: c['total'] for c in stats['tickets_por_categoria']}, {'Red': 2, 'Energía': 1},
+        )
+        self.assertEqual(stats['tickets_por_dc'], [{'nombre': 'DCL', 'total': 3}])
+
+    def test_snapshot_cacheado_hasta_que_cambia_un_ticket(self):
+        obtener_estadisticas()
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_estadisticas()['total_tickets'], 4)
+        Ticket.objects.create(codigo='INC-5', titulo='nuevo', estado=Estado.objects.get(nombre='Cerrado'))
+        stats = obtener_estadisticas()
+        self.assertEqual((stats['total_tickets'], stats['tickets_cerrados']), (5, 2))
+
+
+class DashboardTicketsTests(TablasNoAdministradasMixin, TestCase):
+    """Tabla del dashboard paginada, filtrada y ordenada en el servidor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Rol.objects.create(nombre='Visor')
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        pendiente, cerrado = Estado.objects.create(nombre='Pendiente'), Estado.objects.create(nombre='Cerrado')
+        Ticket.objects.bulk_create([
+            Ticket(codigo=f'INC-{i:02d}', titulo=f'Enlace {i}', prioridad='Alta',
+                   estado=cerrado if i % 3 == 0 else pendiente,
+                   fecha_inicio=datetime.date(2026, 1, 1) + timedelta(days=i % 4))
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def paginas(self, **params):
+        filas, cursor = [], None
+        while True:
+            pagina = dict(params, cursor=cursor) if cursor else params
+            data = self.client.get(reverse('dashboard_tickets'), pagina).json()
+            filas += data['results']
+            cursor = data['next']
+            if cursor is None:
+                return filas, data['total']
+
+    @mock.patch.object(views, 'TAMANO_PAGINA_DASHBOARD', 7)
+    def test_recorre_todas_las_paginas_en_orden(self):
+        filas, total = self.paginas(sort='fecha', dir='desc')
+        self.assertEqual((len(filas), total), (25, 25))
+        self.assertEqual(len({f['id'] for f in filas}), 25)
+        claves = [(f['fecha'], f['id']) for f in filas]
+        self.assertEqual(claves, sorted(claves, reverse=True))
+
+    @mock.patch.object(views, 'TAMANO_PAGINA_DASHBOARD', 4)
+    def test_filtro_busqueda_y_orden(self):
+        filas, total = self.paginas(filtro='cerrado', sort='codigo', dir='asc')
+        self.assertEqual([f['codigo'] for f in filas], [f'INC-{i:02d}' for i in range(0, 25, 3)])
+        self.assertEqual(total, 9)
+
+        filas, total = self.paginas(filtro='pendiente', q='enlace 1')
+        self.assertEqual(
+            sorted(f['codigo'] for f in filas),
+            ['INC-01', 'INC-10', 'INC-11', 'INC-13', 'INC-14', 'INC-16', 'INC-17', 'INC-19'],
+        )
+        self.assertEqual(total, 8)
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse('dashboard_tickets'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BusquedaTests(TablasNoAdministradasMixin, TestCase):
+    """Índice invertido: coincidencia de todos los términos y orden por relevancia"""
+
+    @classmethod
+    def setUpTestData(cls):
+        estado = Estado.objects.create(nombre='Pendiente')
+        cls.en_titulo = Ticket.objects.create(codigo='INC-1', titulo='Falla de energía en DCL', estado=estado)
+        cls.en_descripcion = Ticket.objects.create(
+            codigo='INC-2', titulo='Alarma UPS', descripcion='corte de energia parcial', estado=estado,
+        )
+        cls.en_observacion = Ticket.objects.create(codigo='INC-3', titulo='Switch caído', estado=estado)
+        Observacion.objects.create(ticket=cls.en_observacion, comentario='posible energía inestable')
+
+    def codigos(self, texto, **kwargs):
+        resultado = buscar(Ticket.objects.all(), texto, **kwargs).order_by('-relevancia')
+        return list(resultado.values_list('codigo', flat=True))
+
+    def test_relevancia_por_campo_y_sin_tildes(self):
+        self.assertEqual(self.codigos('ENERGIA'), ['INC-1', 'INC-2'])
+        self.assertEqual(self.codigos('energ', incluir_observaciones=True), ['INC-1', 'INC-2', 'INC-3'])
+
+    def test_todos_los_terminos(self):
+        self.assertEqual(self.codigos('energía dcl'), ['INC-1'])
+        self.assertEqual(self.codigos('energía switch'), [])
+
+    def test_texto_sin_terminos_no_trae_todos_los_tickets(self):
+        # Una letra o solo signos: coincidencia literal en código o título
+        self.assertEqual(list(buscar(Ticket.objects.all(), '?!').values_list('codigo', flat=True)), [])
+        self.assertEqual(
+            sorted(buscar(Ticket.objects.all(), 'S').values_list('codigo', flat=True)), ['INC-2', 'INC-3'],
+        )
+        self.assertFalse(buscar(Ticket.objects.all(), '  ').exists())
+
+    def test_prefijo_usa_el_indice_en_mariadb(self):
+        # LIKE BINARY no puede usar idx_busqueda_termino con la collation por defecto
+        sql = sql_mariadb(ranking('energía dcl'))
+        self.assertNotIn('LIKE BINARY', sql)
+        self.assertIn("`indice_busqueda`.`termino` LIKE 'energia%'", sql)
+        self.assertIn("`indice_busqueda`.`termino` LIKE 'dcl%'", sql)
+
+
+class PaginacionKeysetTests(TablasNoAdministradasMixin, TestCase):
+    """Cursores (campo, id): ida y vuelta sin saltos ni repetidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        estado = Estado.objects.create(nombre='Pendiente')
+        fechas = [datetime.date(2026, 1, 1), None, datetime.date(2026, 1, 2), None, datetime.date(2026, 1, 1)]
+        cls.tickets = [
+            Ticket.objects.create(codigo=f'INC-{i}', titulo='t', estado=estado, fecha_inicio=fechas[i % 5])
+            for i in range(11)
+        ]
+        # Observaciones en el mismo segundo, distintas solo en microsegundos
+        base = timezone.now().replace(microsecond=0)
+        for i in range(7):
+            observacion = Observacion.objects.create(ticket=cls.tickets[0], comentario=str(i))
+            Observacion.objects.filter(pk=observacion.pk).update(fecha=base + timedelta(microseconds=i % 3 * 250))
+
+    def recorrer(self, queryset, campo, descendente, por_pagina=3):
+        """Páginas hacia adelante y luego de vuelta con los cursores ``antes``"""
+        paginas = [pagina_keyset(queryset, campo, descendente, por_pagina=por_pagina)]
+        while paginas[-1].has_next():
+            paginas.append(pagina_keyset(queryset, campo, descendente,
+                                         despues=paginas[-1].cursor_siguiente, por_pagina=por_pagina))
+        atras = [paginas[-1]]
+        while atras[-1].has_previous():
+            atras.append(pagina_keyset(queryset, campo, descendente,
+                                       antes=atras[-1].cursor_anterior, por_pagina=por_pagina))
+        ida = [[fila.pk for fila in pagina] for pagina in paginas]
+        vuelta = [[fila.pk for fila in pagina] for pagina in reversed(atras)]
+        self.assertEqual(ida, vuelta)
+        return [pk for pagina in ida for pk in pagina]
+
+    def test_nulos_al_final_en_ambos_sentidos(self):
+        for descendente in (True, False):
+            with self.subTest(descendente=descendente):
+                pks = self.recorrer(Ticket.objects.all(), 'fecha_inicio', descendente)
+                filas = Ticket.objects.in_bulk(pks)
+                claves = [(filas[pk].fecha_inicio, pk) for pk in pks]
+                no_nulas = [c for c in claves if c[0] is not None]
+                self.assertEqual(no_nulas, sorted(no_nulas, reverse=descendente))
+                # Los NULL van al final (por id) sin importar el sentido
+                nulas = sorted((c for c in claves if c[0] is None), key=lambda c: c[1], reverse=descendente)
+                self.assertEqual(claves[len(no_nulas):], nulas)
+                self.assertEqual(sorted(pks), sorted(t.pk for t in self.tickets))
+
+    def test_microsegundos_se_conservan_en_el_cursor(self):
+        queryset = Observacion.objects.filter(ticket=self.tickets[0])
+        pks = self.recorrer(queryset, 'fecha', True, por_pagina=2)
+        esperado = list(queryset.order_by('-fecha', '-pk').values_list('pk', flat=True))
+        self.assertEqual(pks, esperado)
+        cursor = pagina_keyset(queryset, 'fecha', True, por_pagina=2).cursor_siguiente
+        self.assertEqual(datetime.datetime.fromisoformat(decodificar_cursor(cursor)[0]).microsecond, 500)
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(CursorInvalido):
+            pagina_keyset(Ticket.objects.all(), 'fecha_inicio', despues='%%%')
+
+    def test_order_by_sin_is_null(self):
+        # Cada tramo es un rango de idx_tickets_fecha_inicio: sin IS NULL en
+        # el ORDER BY ni "OR fecha_inicio IS NULL" en el filtro del cursor
+        cursores = [{}, {'despues': (datetime.date(2026, 1, 1), 5)}, {'despues': (None, 5)},
+                    {'antes': (datetime.date(2026, 1, 1), 5)}, {'antes': (None, 5)}]
+        for cursor in cursores:
+            for segmento in pagination._segmentos(Ticket.objects.all(), 'fecha_inicio', True, **cursor):
+                with self.subTest(**cursor):
+                    donde, orden = sql_mariadb(segmento).split(' ORDER BY ')
+                    self.assertNotIn('IS NULL', orden)
+                    primera = orden.split(', ')[0]
+                    self.assertIn('`fecha_inicio`' if 'IS NOT NULL' in donde else '`id`', primera)
+                    self.assertNotRegex(donde, r'OR .*IS NULL')
+
+
+class RolMiddlewareTests(TablasNoAdministradasMixin, TestCase):
+    """Rol del usuario resuelto una vez y cacheado por proceso"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rol = Rol.objects.create(nombre='Operador')
+        Usuario.objects.create(nombre='Ana', correo='ana@sigmaops.local', password_hash='!', rol=rol)
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+
+    def setUp(self):
+        cache_roles.clear()
+        self.addCleanup(cache_roles.clear)
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        return request
+
+    def test_rol_cacheado(self):
+        middleware = RolMiddleware(lambda request: HttpResponse())
+        request = self.request()
+        middleware(request)
+        self.assertTrue(request.es_operador)
+        self.assertFalse(request.es_administrador)
+
+        request = self.request()
+        with self.assertNumQueries(0):
+            middleware(request)
+        self.assertEqual(request.rol_nombre, 'Operador')
+
+    async def test_async_usa_el_rol_leido_de_la_cache(self):
+        async def vista(request):
+            return HttpResponse()
+
+        await sync_to_async(resolver_rol)(self.user)
+        valor = cache_roles.get(clave_rol(self.user))
+        request = self.request()
+        # La entrada vence justo después de comprobarla: no debe consultarse
+        # la base desde el event loop (SynchronousOnlyOperation)
+        with mock.patch.object(cache_roles, 'get', side_effect=[valor, None, None]):
+            await RolMiddleware(vista)(request)
+        self.assertEqual(request.rol_nombre, 'Operador')
+
+    async def test_async_sin_cache_consulta_en_un_hilo(self):
+        async def vista(request):
+            return HttpResponse()
+
+        request = self.request()
+        await RolMiddleware(vista)(request)
+        self.assertTrue(request.es_visor)
+
+
+class CatalogosTests(TablasNoAdministradasMixin, TestCase):
+
+    def setUp(self):
+        Estado.objects.create(nombre='Pendiente')
+        cache.clear()
+        catalogos._locales.clear()
+        self.addCleanup(catalogos._locales.clear)
+
+    def test_lectura_repetida_sin_consultas(self):
+        catalogos.catalogo('estados')
+        with self.assertNumQueries(0):
+            nombres = [e.nombre for e in catalogos.catalogo('estados')]
+        self.assertEqual(nombres, ['Pendiente'])
+
+    def test_guardar_invalida_el_catalogo(self):
+        version = catalogos.version_catalogo('estados')
+        catalogos.catalogo('estados')
+        Estado.objects.create(nombre='Cerrado')
+        self.assertNotEqual(catalogos.version_catalogo('estados'), version)
+        self.assertEqual([e.nombre for e in catalogos.catalogo('estados')], ['Pendiente', 'Cerrado'])
+
+    def test_version_desalojada_no_reutiliza_la_lista_vieja(self):
+        catalogos.catalogo('estados')
+        # Otro proceso conserva la lista cargada antes del cambio
+        otro_proceso = dict(catalogos._locales)
+        Estado.objects.create(nombre='Cerrado')
+        cache.delete(catalogos._clave_version('estados'))
+        catalogos._locales.update(otro_proceso)
+        self.assertEqual([e.nombre for e in catalogos.catalogo('estados')], ['Pendiente', 'Cerrado'])
+
+    @override_settings(GUNICORN_WORKERS=3, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_check_rechaza_cache_por_proceso_con_varios_workers(self):
+        from .checks import cache_compartida
+        self.assertEqual([e.id for e in cache_compartida(None)], ['tickets.E001'])
+        with self.settings(GUNICORN_WORKERS=1):
+            self.assertEqual([e.id for e in cache_compartida(None)], ['tickets.W001'])
+
+
+class AutocompletadoTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.host = Elemento.objects.create(nombre='HOST-DCL-01', tipo='HOST')
+        Elemento.objects.create(nombre='HOST-DCL-02', tipo='HOST')
+        Elemento.objects.create(nombre='SW-CORE-01', tipo='SWITCH')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def buscar(self, catalogo, q):
+        return self.client.get(reverse('autocompletar', args=[catalogo]), {'q': q})
+
+    def test_busca_por_prefijo(self):
+        resultados = self.buscar('elementos', 'host').json()['results']
+        self.assertEqual([r['text'] for r in resultados], ['HOST-DCL-01 (HOST)', 'HOST-DCL-02 (HOST)'])
+        self.assertEqual([r['text'] for r in self.buscar('elementos', 'SWITCH').json()['results']],
+                         ['SW-CORE-01 (SWITCH)'])
+
+    def test_texto_corto_y_catalogo_desconocido(self):
+        self.assertEqual(self.buscar('elementos', 'h').json(), {'results': []})
+        self.assertEqual(self.buscar('tickets', 'host').status_code, 404)
+
+    def test_select_solo_incluye_la_opcion_seleccionada(self):
+        html = str(TicketForm(initial={'elemento': self.host.pk})['elemento'])
+        self.assertIn('HOST-DCL-01 (HOST)', html)
+        self.assertNotIn('HOST-DCL-02', html)
+        self.assertNotIn('SW-CORE-01', html)
+
+    def test_valor_invalido_es_error_del_formulario(self):
+        form = TicketForm(data={'elemento': 'abc'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('elemento', form.errors)
+        self.assertNotIn('HOST-DCL', str(form['elemento']))
+
+
+class ImportarTicketsTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pendiente = Estado.objects.create(nombre='Pendiente')
+        Estado.objects.create(nombre='Cerrado')
+        cls.red = Categoria.objects.create(nombre='Red')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+
+    def importar(self, contenido, *args, encoding='utf-8'):
+        ruta = self.directorio / 'tickets.csv'
+        ruta.write_bytes(contenido.encode(encoding))
+        salida = io.StringIO()
+        call_command('importar_tickets', str(ruta), *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_importa_y_rechaza_filas_invalidas(self):
+        errores = self.directorio / 'rechazados.csv'
+        salida = self.importar(
+            'codigo,titulo,estado,prioridad,fecha_inicio\n'
+            'INC-1,Enlace caído,pendiente,alta,15/03/2026\n'
+            'INC-2,Sin estado,,media,2026-03-15\n'
+            'INC-3,Estado inexistente,Archivado,media,2026-03-15\n',
+            '--errores', str(errores),
+        )
+        self.assertIn('1 tickets, 2 filas con error', salida)
+        ticket = Ticket.objects.get(codigo='INC-1')
+        self.assertEqual((ticket.estado, ticket.prioridad, ticket.fecha_inicio),
+                         (self.pendiente, 'Alta', datetime.date(2026, 3, 15)))
+        self.assertEqual([linea.split(',')[1] for linea in errores.read_text().splitlines()[1:]], ['INC-2', 'INC-3'])
+
+    def test_upsert_conserva_las_columnas_ausentes(self):
+        Ticket.objects.create(codigo='INC-1', titulo='Original', descripcion='Detalle', prioridad='Alta',
+                              estado=self.pendiente, categoria=self.red)
+        self.importar('codigo,titulo,estado\nINC-1,Actualizado,Cerrado\n')
+        ticket = Ticket.objects.get(codigo='INC-1')
+        self.assertEqual((ticket.titulo, ticket.estado.nombre), ('Actualizado', 'Cerrado'))
+        self.assertEqual((ticket.descripcion, ticket.prioridad, ticket.categoria),
+                         ('Detalle', 'Alta', self.red))
+
+    def test_upsert_actualiza_las_columnas_presentes_aunque_esten_vacias(self):
+        Ticket.objects.create(codigo='INC-1', titulo='Original', estado=self.pendiente, categoria=self.red)
+        self.importar('codigo,titulo,estado,categoria\nINC-1,Original,Pendiente,\n')
+        self.assertIsNone(Ticket.objects.get(codigo='INC-1').categoria)
+
+    def test_los_importados_se_sugieren_como_duplicados(self):
+        self.importar(
+            'codigo,titulo,descripcion,estado\n'
+            'INC-1,Caída de enlace MPLS en DCL,Sin tráfico hacia Concepción,Pendiente\n'
+            'INC-2,Falla de disco en storage,,Cerrado\n'
+        )
+        sugerencias = sugerir_duplicados('Caida del enlace MPLS en DCL')
+        self.assertEqual([s['codigo'] for s in sugerencias], ['INC-1'])
+        self.assertEqual(sugerir_duplicados('Falla de disco en storage'), [])
+        self.assertEqual([t.codigo for t in buscar(Ticket.objects.all(), 'mpls')], ['INC-1'])
+
+    def test_encoding(self):
+        contenido = 'codigo,titulo,estado\nINC-1,Falla de energía,Pendiente\n'
+        with self.assertRaisesMessage(CommandError, '--encoding'):
+            self.importar(contenido, encoding='latin-1')
+        self.importar(contenido, '--encoding', 'latin-1', encoding='latin-1')
+        self.assertEqual(Ticket.objects.get(codigo='INC-1').titulo, 'Falla de energía')
+        with self.assertRaisesMessage(CommandError, 'Codificación desconocida'):
+            self.importar(contenido, '--encoding', 'klingon')
+
+
+class ExportarTicketsTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.pendiente = Estado.objects.create(nombre='Pendiente')
+        cerrado = Estado.objects.create(nombre='Cerrado')
+        Ticket.objects.bulk_create([
+            Ticket(codigo=f'INC-{i:02d}', titulo=f'Enlace, "{i}"', prioridad='Alta',
+                   estado=cerrado if i % 3 == 0 else cls.pendiente,
+                   fecha_inicio=None if i == 7 else datetime.date(2026, 1, 1) + timedelta(days=i % 4))
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def exportar(self, **params):
+        response = self.client.get(reverse('ticket_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_encabezados_y_filas(self):
+        contenido = self.exportar().decode('utf-8-sig')
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(filas[0], [
+            'Código', 'Título', 'Estado', 'Prioridad', 'Categoría', 'Data Center',
+            'Proveedor', 'Elemento', 'Asignado', 'Fecha Inicio', 'Fecha Cierre',
+        ])
+        self.assertEqual(len(filas), 26)
+        self.assertEqual(sorted(fila[0] for fila in filas[1:]), [f'INC-{i:02d}' for i in range(25)])
+        self.assertIn(['INC-01', 'Enlace, "1"', 'Pendiente', 'Alta', '', '', '', '', '', '2026-01-02', ''], filas)
+
+    def test_csv_respeta_los_filtros(self):
+        filas = list(csv.reader(io.StringIO(self.exportar(estado=self.pendiente.pk).decode('utf-8-sig'))))
+        self.assertEqual(len(filas) - 1, Ticket.objects.filter(estado=self.pendiente).count())
+        self.assertEqual({fila[2] for fila in filas[1:]}, {'Pendiente'})
+
+    def test_xlsx_encabezados_y_filas(self):
+        with zipfile.ZipFile(io.BytesIO(self.exportar(formato='xlsx'))) as libro:
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(hoja.count('<row>'), 26)
+        self.assertIn('>Código<', hoja)
+        self.assertIn('>Enlace, "1"<', hoja)
+
+    def test_formato_desconocido(self):
+        self.assertEqual(self.client.get(reverse('ticket_export'), {'formato': 'pdf'}).status_code, 404)
+
+    def test_iterar_keyset_recorre_todo_una_vez(self):
+        queryset = Ticket.objects.values('id', 'fecha_inicio')
+        ids = [fila['id'] for fila in iterar_keyset(queryset, 'fecha_inicio', descendente=True, lote=4)]
+        self.assertCountEqual(ids, Ticket.objects.values_list('id', flat=True))
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_sin_token_ni_red_permitida_responde_403(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_red_permitida_sin_proxy(self):
+        request = self.factory.get('/metrics', REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(metrics.metricas(request).status_code, 200)
+        request = self.factory.get('/metrics', REMOTE_ADDR='10.1.2.3', HTTP_X_FORWARDED_FOR='200.1.1.1')
+        self.assertEqual(metrics.metricas(request).status_code, 403)
+        self.assertEqual(metrics.metricas(self.factory.get('/metrics', REMOTE_ADDR='192.168.1.1')).status_code, 403)
+
+    def test_metodo_desconocido_se_agrupa_en_other(self):
+        antes = metrics.requests_total.valor('metrics', 'other', '403')
+        self.client.generic('BREW', '/metrics')
+        self.assertEqual(metrics.requests_total.valor('metrics', 'other', '403'), antes + 1)
+        self.assertEqual(metrics.requests_total.valor('metrics', 'BREW', '403'), 0)
+
+    def test_suma_los_workers_del_directorio(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        serie = ('prueba_metricas', 'GET', '200')
+        metrics.requests_total.inc(*serie)
+        propio = metrics.requests_total.valor(*serie)
+        # Otro worker vivo y uno terminado hace rato
+        vivo = Path(directorio.name) / '101-1.json'
+        vivo.write_text(json.dumps({
+            'sigmaops_requests_total': [[list(serie), 3]],
+            'sigmaops_audit_queue_depth': [[[], 7]],
+        }))
+        terminado = Path(directorio.name) / '102-1.json'
+        terminado.write_text(json.dumps({
+            'sigmaops_requests_total': [[list(serie), 5]],
+            'sigmaops_audit_queue_depth': [[[], 9]],
+        }))
+        os.utime(terminado, (0, 0))
+
+        with self.settings(METRICS_DIR=directorio.name):
+            texto = metrics.exponer()
+            metrics.volcar()
+            volcado = json.loads(metrics._archivo_propio(Path(directorio.name)).read_text())
+        self.assertIn(f'sigmaops_requests_total{{view="prueba_metricas",method="GET",status="200"}} {propio + 8}',
+                      texto.splitlines())
+        self.assertIn('sigmaops_audit_queue_depth{worker="101"} 7', texto)
+        self.assertNotIn('worker="102"', texto)
+        self.assertIn(f'sigmaops_audit_queue_depth{{worker="{os.getpid()}"}}', texto)
+        self.assertIn([list(serie), propio], volcado['sigmaops_requests_total'])
+
+
+class BenchmarkTests(TablasNoAdministradasMixin, TransactionTestCase):
+    # Transaccional: en_paralelo corre las consultas en hilos con su propia conexión
+
+    def setUp(self):
+        self.addCleanup(vaciar_tablas_no_administradas)
+        self.addCleanup(cache.clear)
+        # Los eventos de auditoría de las altas se escriben antes de vaciar las tablas
+        self.addCleanup(cola_auditoria.vaciar)
+        call_command('generar_datos', escala=0.0002, forzar=True, stdout=io.StringIO())
+
+    def benchmark(self, *escenarios, **opciones):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = Path(directorio.name) / 'resultados.json'
+        # El runner ya preparó el entorno de pruebas que el comando activa
+        with mock.patch.multiple('tickets.management.commands.benchmark',
+                                 setup_test_environment=mock.DEFAULT, teardown_test_environment=mock.DEFAULT):
+            call_command('benchmark', iteraciones=2, calentamiento=1, solo=list(escenarios), guardar=str(ruta),
+                         stdout=io.StringIO(), **opciones)
+        return json.loads(ruta.read_text())
+
+    def test_generar_datos(self):
+        self.assertEqual(Ticket.objects.count(), 40)
+        self.assertEqual(set(Estado.objects.values_list('nombre', flat=True)), {'Pendiente', 'En Proceso', 'Cerrado'})
+        self.assertFalse(Ticket.objects.filter(estado__isnull=True).exists())
+        self.assertTrue(Observacion.objects.exists())
+
+    def test_exige_debug_o_forzar(self):
+        with self.assertRaisesMessage(CommandError, 'DEBUG=True'):
+            call_command('benchmark', stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, 'DEBUG=True'):
+            call_command('generar_datos', stdout=io.StringIO())
+
+    def test_cuenta_las_consultas_de_los_hilos(self):
+        paralelo = self.benchmark('dashboard', 'listado', forzar=True)
+        with mock.patch('tickets.asincrono.PARALELO', False):
+            en_serie = self.benchmark('dashboard', 'listado', forzar=True)
+        for escenario in ('dashboard', 'listado'):
+            self.assertGreater(paralelo[escenario]['consultas_max'], 0)
+            self.assertEqual(paralelo[escenario]['consultas_max'], en_serie[escenario]['consultas_max'])
+
+    def test_borra_los_tickets_creados(self):
+        resultados = self.benchmark('alta', 'edicion', forzar=True)
+        self.assertEqual(set(resultados), {'alta', 'edicion'})
+        self.assertFalse(Ticket.objects.filter(codigo__startswith='BENCH-').exists())
+
+
+class TimelineObservacionesTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        estado = Estado.objects.create(nombre='Pendiente')
+        cls.ticket = Ticket.objects.create(codigo='INC-1', titulo='Enlace caído', estado=estado)
+        otro = Ticket.objects.create(codigo='INC-2', titulo='Otro', estado=estado)
+        Observacion.objects.create(ticket=otro, comentario='ajena')
+        base = datetime.datetime(2026, 3, 1, 10, tzinfo=datetime.timezone.utc)
+        for i in range(23):
+            obs = Observacion.objects.create(ticket=cls.ticket, comentario=f'obs-{i:02d}')
+            # Fechas repetidas y otras que difieren solo en microsegundos
+            fecha = base + timedelta(minutes=i // 3, microseconds=i % 2)
+            Observacion.objects.filter(pk=obs.pk).update(fecha=fecha)
+        cls.esperado = [
+            o.comentario for o in Observacion.objects.filter(ticket=cls.ticket).order_by('-fecha', '-id')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def comentarios(self, html):
+        return re.findall(r'obs-\d\d|ajena', html)
+
+    @mock.patch.object(views, 'TAMANO_PAGINA_OBSERVACIONES', 5)
+    def test_recorre_el_timeline_por_cursor(self):
+        url = reverse('ticket_observaciones', args=[self.ticket.pk])
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            datos = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            vistos += self.comentarios(datos['html'])
+            paginas += 1
+            cursor = datos['next']
+            if not cursor:
+                break
+        self.assertEqual(vistos, self.esperado)
+        self.assertEqual(paginas, 5)
+
+    @mock.patch.object(views, 'TAMANO_PAGINA_OBSERVACIONES', 5)
+    def test_detalle_muestra_el_total_y_la_primera_pagina(self):
+        html = self.client.get(reverse('ticket_detail', args=[self.ticket.pk])).content.decode()
+        self.assertIn('Observaciones (23)', html)
+        self.assertEqual(self.comentarios(html), self.esperado[:5])
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse('ticket_observaciones', args=[self.ticket.pk]), {'cursor': 'xx'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TicketDetailViewTests(TablasNoAdministradasMixin, TestCase):
+    # sesión, usuario, ticket, 6 prefetch (historial, sla, asignaciones,
+    # archivos, hijos, padres) y la primera página de observaciones
+    PRESUPUESTO_CONSULTAS = 10
+    # Con las secciones en cache solo quedan sesión y usuario
+    PRESUPUESTO_CACHEADO = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        rol = Rol.objects.create(nombre='Super Admin')
+        cls.rol = rol
+        cls.usuario = Usuario.objects.create(nombre='Ana', correo='ana@sigmaops.local', password_hash='!', rol=rol)
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.estados = [Estado.objects.create(nombre=n) for n in ('Pendiente', 'En Proceso', 'Cerrado')]
+        categoria = Categoria.objects.create(nombre='Incidente')
+        dc = DataCenter.objects.create(nombre='DCL', ubicacion='Santiago')
+        cls.tickets = [
+            Ticket.objects.create(
+                codigo=f'INC-{i:04d}', titulo=f'Caída de enlace {i}', prioridad='Alta',
+                estado=cls.estados[0], categoria=categoria, dc=dc,
+                fecha_inicio=datetime.date(2026, 1, 1), usuario_creador=cls.usuario,
+            )
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        cache_roles.clear()
+        self.client.force_login(self.user)
+        self.ticket = self.tickets[0]
+
+    def _poblar(self, cantidad):
+        """Agrega ``cantidad`` filas de cada relación del ticket"""
+        for i in range(cantidad):
+            usuario = Usuario.objects.create(nombre=f'Operador {i}', correo=f'op{i}@sigmaops.local',
+                                             password_hash='!', rol=self.rol)
+            Observacion.objects.create(ticket=self.ticket, usuario=usuario, comentario=f'seguimiento {i}')
+            EstadoHistorico.objects.create(ticket=self.ticket, estado=self.estados[i % 3], usuario=usuario)
+            SlaControl.objects.create(ticket=self.ticket)
+            Asignacion.objects.create(ticket=self.ticket, usuario=usuario)
+            ArchivoAdjunto.objects.create(ticket=self.ticket, usuario=usuario, nombre_archivo=f'log{i}.txt')
+            RelacionTicket.objects.create(ticket_padre=self.ticket, ticket_hijo=self.tickets[i % 5 + 1])
+            RelacionTicket.objects.create(ticket_padre=self.tickets[i % 5 + 1], ticket_hijo=self.ticket)
+
+    def _consultas_detalle(self, cantidad):
+        self._poblar(cantidad)
+        self.client.get(reverse('dashboard'))  # resuelve el rol del usuario
+        invalidar_ticket(self.ticket.pk)
+        url = reverse('ticket_detail', args=[self.ticket.pk])
+        with self.assertNumQueries(self.PRESUPUESTO_CONSULTAS):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_presupuesto_de_consultas_fijo(self):
+        self._consultas_detalle(1)
+
+    def test_presupuesto_no_crece_con_las_relaciones(self):
+        response = self._consultas_detalle(8)
+        self.assertContains(response, 'Observaciones (8)')
+        self.assertContains(response, 'log7.txt')
+        self.assertContains(response, self.tickets[3].codigo)
+
+    def test_repeticion_servida_desde_cache(self):
+        self._consultas_detalle(2)
+        with self.assertNumQueries(self.PRESUPUESTO_CACHEADO):
+            response = self.client.get(reverse('ticket_detail', args=[self.ticket.pk]))
+        self.assertContains(response, 'seguimiento 1')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_cambios_invalidan_la_cache(self):
+        url = reverse('ticket_detail', args=[self.ticket.pk])
+        self.client.get(url)
+        Observacion.objects.create(ticket=self.ticket, comentario='nueva observación')
+        self.assertContains(self.client.get(url), 'nueva observación')
+
+        # El detalle muestra el estado de los tickets relacionados
+        relacionado = self.tickets[1]
+        RelacionTicket.objects.create(ticket_padre=self.ticket, ticket_hijo=relacionado)
+        self.client.get(url)
+        relacionado.estado = self.estados[2]
+        relacionado.save()
+        self.assertContains(self.client.get(url), 'Cerrado')
+
+    def test_revalidacion_sin_cambios_responde_304(self):
+        url = reverse('ticket_detail', args=[self.ticket.pk])
+        self.client.get(url)  # fija la cookie CSRF, parte del ETag
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(self.PRESUPUESTO_CACHEADO):
+            response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Una observación nueva cambia el sello del ticket
+        Observacion.objects.create(ticket=self.ticket, comentario='respuesta del proveedor')
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertContains(response, 'respuesta del proveedor')
+        self.assertNotEqual(response['ETag'], etag)
+
+        # El ETag depende del usuario
+        self.client.force_login(User.objects.create_user('beto', 'beto@sigmaops.local', 'pw'))
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 200)
+
+    def test_version_desalojada_no_revalida_un_etag_viejo(self):
+        url = reverse('ticket_detail', args=[self.ticket.pk])
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        Observacion.objects.create(ticket=self.ticket, comentario='respuesta del proveedor')
+        # La cache pierde la versión del ticket (desalojo o reinicio)
+        cache.delete(f'tickets:version:{self.ticket.pk}')
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertContains(response, 'respuesta del proveedor')
+
+    def test_ticket_inexistente(self):
+        response = self.client.get(reverse('ticket_detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class EvaluacionSlaTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.abierto = Estado.objects.create(nombre='Pendiente')
+        cls.cerrado = Estado.objects.create(nombre='Cerrado')
+
+    def _sla(self, horas_abierto, objetivo=48, estado=None, cerrado_en=None):
+        ticket = Ticket.objects.create(
+            codigo=f'SLA-{Ticket.objects.count():04d}', titulo='Ticket SLA',
+            prioridad='Alta', estado=estado or self.abierto,
+        )
+        creado = timezone.now() - timedelta(hours=horas_abierto)
+        sla = SlaControl.objects.create(ticket=ticket, tiempo_objetivo_horas=objetivo)
+        # fecha_creacion es auto_now_add: se ajusta con update()
+        SlaControl.objects.filter(pk=sla.pk).update(
+            fecha_creacion=creado,
+            fecha_cierre=creado + timedelta(hours=cerrado_en) if cerrado_en is not None else None,
+        )
+        return sla
+
+    def test_probabilidad_condicionada_al_tiempo_transcurrido(self):
+        muestras = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+        # De los que siguen abiertos a las 45 h (6), 5 superan las 55 h
+        self.assertAlmostEqual(probabilidad_incumplimiento(muestras, 45, 55), 5 / 6)
+        self.assertEqual(probabilidad_incumplimiento(muestras, 120, 200), 1.0)
+        self.assertEqual(probabilidad_incumplimiento(muestras, 50, 48), 1.0)
+        self.assertEqual(probabilidad_incumplimiento([], 12, 48), 0.25)
+
+    def test_evaluacion_clasifica_sla_abiertos(self):
+        # Historial: la mayoría se resuelve en menos de 10 h
+        for _ in range(30):
+            self._sla(200, estado=self.cerrado, cerrado_en=5)
+        vencido = self._sla(60)
+        en_plazo = self._sla(1)
+        critico = self._sla(45)
+
+        resumen = evaluar_sla()
+
+        niveles = dict(SlaEvaluacion.objects.values_list('sla_id', 'nivel'))
+        self.assertEqual(len(niveles), 3)
+        self.assertEqual(niveles[vencido.pk], 'vencido')
+        self.assertEqual(niveles[en_plazo.pk], 'ok')
+        self.assertEqual(niveles[critico.pk], 'critico')
+        self.assertEqual(resumen['vencido'], 1)
+        self.assertEqual([p['ticket_id'] for p in resumen['proximos']], [critico.ticket_id])
+
+
+class RollupsTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pendiente = Estado.objects.create(nombre='Pendiente')
+        cls.proceso = Estado.objects.create(nombre='En Proceso')
+        cls.cerrado = Estado.objects.create(nombre='Cerrado')
+        cls.dc = DataCenter.objects.create(nombre='DCL', ubicacion='Santiago')
+        cls.inicio = timezone.make_aware(datetime.datetime(2026, 3, 2, 8, 0))
+
+    def setUp(self):
+        cache.clear()
+
+    def _cambio(self, ticket, estado, horas):
+        cambio = EstadoHistorico.objects.create(ticket=ticket, estado=estado)
+        # fecha_cambio es auto_now_add: se ajusta con update()
+        EstadoHistorico.objects.filter(pk=cambio.pk).update(
+            fecha_cambio=self.inicio + timedelta(hours=horas)
+        )
+
+    def _ticket(self, codigo, prioridad, horas_proceso, horas_cierre):
+        ticket = Ticket.objects.create(
+            codigo=codigo, titulo=codigo, prioridad=prioridad, estado=self.cerrado, dc=self.dc,
+        )
+        self._cambio(ticket, self.pendiente, 0)
+        self._cambio(ticket, self.proceso, horas_proceso)
+        self._cambio(ticket, self.cerrado, horas_cierre)
+
+    def test_incremental_igual_a_reprocesar(self):
+        dia = self.inicio.date()
+        self._ticket('A', 'Alta', 2, 10)
+        procesar_historial(lote=2)
+        self._ticket('B', 'Baja', 4, 30)
+        procesar_historial(lote=2)
+        incremental = (tiempos_por_estado(dia, dia + timedelta(days=5), 'prioridad'),
+                       mttr(dia, dia + timedelta(days=5)))
+
+        reiniciar_rollups()
+        self.assertEqual(procesar_historial(), 6)
+        completo = (tiempos_por_estado(dia, dia + timedelta(days=5), 'prioridad'),
+                    mttr(dia, dia + timedelta(days=5)))
+
+        self.assertEqual(incremental, completo)
+        self.assertEqual(completo[1], [{'grupo': None, 'resueltos': 2, 'mttr_horas': 20.0}])
+        pendiente_alta = [f for f in completo[0] if f['estado'] == 'Pendiente' and f['grupo'] == 'Alta']
+        self.assertEqual(pendiente_alta[0]['horas_promedio'], 2.0)
+        self.assertEqual(procesar_historial(), 0)
+
+    def test_reporte_por_rango(self):
+        self._ticket('A', 'Alta', 2, 10)
+        procesar_historial()
+        user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        self.client.force_login(user)
+        dia = self.inicio.date()
+        datos = self.client.get(reverse('reporte_tiempos'), {
+            'desde': dia.isoformat(), 'hasta': dia.isoformat(), 'por': 'dc',
+        }).json()
+        self.assertEqual(datos['mttr'], [{'grupo': 'DCL', 'resueltos': 1, 'mttr_horas': 10.0}])
+        vacio = self.client.get(reverse('reporte_tiempos'), {'desde': '2020-01-01', 'hasta': '2020-01-31'}).json()
+        self.assertEqual(vacio['tiempos'], [])
+        self.assertEqual(self.client.get(reverse('reporte_tiempos'), {'por': 'x'}).status_code, 400)
+
+
+class AuditoriaTests(TablasNoAdministradasMixin, TestCase):
+
+    def test_cola_acotada_descarta_eventos(self):
+        cola = ColaAuditoria(capacidad=3, lote=10, intervalo=60)
+        eventos = [Auditoria(entidad='tickets', accion='UPDATE', entidad_id=i) for i in range(5)]
+        aceptados = [cola.encolar(evento) for evento in eventos]
+        self.assertEqual(aceptados, [True, True, True, False, False])
+
+        self.assertEqual(cola.vaciar(), 3)
+        cola.detener()
+        self.assertEqual(list(Auditoria.objects.order_by('entidad_id').values_list('entidad_id', flat=True)), [0, 1, 2])
+
+    @override_settings(AUDIT_ASYNC=False)
+    def test_senales_registran_cambios_y_sesiones(self):
+        estado = Estado.objects.create(nombre='Pendiente')
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(codigo='AUD-1', titulo='Auditado', estado=estado)
+            ticket.prioridad = 'Alta'
+            ticket.save()
+            Observacion.objects.create(ticket=ticket, comentario='revisión')
+            self.client.force_login(User.objects.create_user('ana', 'ana@sigmaops.local', 'pw'))
+
+        acciones = list(Auditoria.objects.order_by('id').values_list('entidad', 'accion'))
+        self.assertEqual(acciones, [
+            ('tickets', 'INSERT'), ('tickets', 'UPDATE'), ('observaciones', 'INSERT'), ('usuarios', 'LOGIN'),
+        ])
+
+
+class RetencionAuditoriaTests(TablasNoAdministradasMixin, TransactionTestCase):
+    # El schema editor de SQLite no corre dentro de una transacción
+
+    AHORA = datetime.datetime(2026, 5, 15, 12, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        meses = [(2025, 11), (2025, 11), (2026, 1), (2026, 2), (2026, 3), (2026, 4), (2026, 5)]
+        Auditoria.objects.bulk_create([
+            Auditoria(entidad='tickets', accion='UPDATE', entidad_id=n,
+                      fecha=datetime.datetime(anio, mes, 10, tzinfo=datetime.timezone.utc))
+            for n, (anio, mes) in enumerate(meses)
+        ])
+
+    def tearDown(self):
+        Auditoria.objects.all().delete()
+        with connection.schema_editor() as editor:
+            for mes in retencion.meses_archivados():
+                editor.delete_model(retencion.modelo_archivo(mes))
+        self.directorio.cleanup()
+
+    def test_archiva_y_exporta_por_mes(self):
+        resultado = retencion.aplicar_retencion(
+            ahora=self.AHORA, meses_calientes=2, meses_retencion=4, directorio=self.directorio.name,
+        )
+        noviembre, enero, febrero, marzo = (
+            datetime.date(2025, 11, 1), datetime.date(2026, 1, 1),
+            datetime.date(2026, 2, 1), datetime.date(2026, 3, 1),
+        )
+        self.assertEqual(resultado['archivados'], {
+            noviembre: 2, enero: 1, febrero: 1, marzo: 1,
+        })
+        self.assertEqual(
+            sorted(f.month for f in Auditoria.objects.values_list('fecha', flat=True)), [4, 5],
+        )
+        self.assertEqual(retencion.meses_archivados(), [febrero, marzo])
+        self.assertEqual(set(resultado['exportados']), {noviembre, enero})
+        self.assertEqual([e['entidad_id'] for e in retencion.leer_mes(noviembre, self.directorio.name)], [0, 1])
+        self.assertEqual([e['entidad_id'] for e in retencion.leer_mes(febrero, self.directorio.name)], [3])
+
+        # Una segunda pasada no tiene nada que mover
+        resultado = retencion.aplicar_retencion(
+            ahora=self.AHORA, meses_calientes=2, meses_retencion=4, directorio=self.directorio.name,
+        )
+        self.assertEqual((resultado['archivados'], resultado['exportados']), ({}, {}))
+
+    def test_exporta_por_paginas(self):
+        noviembre = datetime.date(2025, 11, 1)
+        retencion.archivar_mes(noviembre)
+        tabla = retencion.tabla_mes(noviembre)
+        with CaptureQueriesContext(connection) as consultas:
+            ruta = retencion.exportar_mes(noviembre, self.directorio.name, lote=1)
+        lecturas = [c['sql'] for c in consultas if c['sql'].startswith('SELECT') and f'"{tabla}"' in c['sql']]
+        # Dos filas en lotes de una: una página por fila, más el conteo de control
+        self.assertEqual(len(lecturas), 3)
+        self.assertEqual([e['entidad_id'] for e in retencion.leer_mes(noviembre, self.directorio.name)], [0, 1])
+        self.assertTrue(ruta.exists())
+
+    def conexion_particionada(self):
+        """Conexión cuyo cursor solo registra el SQL de particiones (MariaDB)"""
+        self.sentencias = []
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.execute.side_effect = self.sentencias.append
+        return mock.Mock(ops=connection.ops, introspection=connection.introspection,
+                         cursor=mock.Mock(return_value=cursor))
+
+    def test_mover_particion_retoma_una_corrida_interrumpida(self):
+        noviembre = datetime.date(2025, 11, 1)
+        modelo = retencion.modelo_archivo(noviembre)
+        with connection.schema_editor() as editor:
+            editor.create_model(modelo)
+        tabla = connection.ops.quote_name(modelo._meta.db_table)
+        intercambio = [
+            f'CREATE TABLE {tabla} LIKE "auditoria"',
+            f'ALTER TABLE {tabla} REMOVE PARTITIONING',
+            f'ALTER TABLE "auditoria" EXCHANGE PARTITION p202511 WITH TABLE {tabla}',
+        ]
+        quitar = ['ALTER TABLE "auditoria" DROP PARTITION p202511']
+
+        # Falló tras crear la tabla: se descarta la tabla vacía y se reintenta
+        with mock.patch.object(retencion, 'connection', self.conexion_particionada()):
+            retencion._mover_particion(noviembre)
+        self.assertEqual(self.sentencias, [f'DROP TABLE {tabla}'] + intercambio + quitar)
+
+        # Falló tras el EXCHANGE: las filas ya están en la tabla de archivo
+        retencion._copiar_mes(noviembre, lote=10)
+        with mock.patch.object(retencion, 'connection', self.conexion_particionada()):
+            self.assertEqual(retencion._mover_particion(noviembre), 2)
+        self.assertEqual(self.sentencias, quitar)
+
+        # Filas en ambos lados: no se toca nada
+        Auditoria.objects.create(entidad='tickets', accion='UPDATE', entidad_id=9,
+                                 fecha=datetime.datetime(2025, 11, 20, tzinfo=datetime.timezone.utc))
+        with mock.patch.object(retencion, 'connection', self.conexion_particionada()):
+            with self.assertRaises(RuntimeError):
+                retencion._mover_particion(noviembre)
+        self.assertEqual(self.sentencias, [])
+
+
+class GrafoDependenciasTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        estado = Estado.objects.create(nombre='Pendiente')
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.a, cls.b, cls.c, cls.d, cls.e = [
+            Ticket.objects.create(codigo=codigo, titulo=codigo, prioridad='Alta', estado=estado)
+            for codigo in ('A', 'B', 'C', 'D', 'E')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # B y C quedan bloqueados por A; D sigue a C; E solo está relacionado
+        for padre, hijo, tipo in ((self.b, self.a, 'Depende de'), (self.c, self.b, 'Depende de'),
+                                  (self.d, self.c, 'Sigue a'), (self.e, self.a, 'Relacionado con')):
+            RelacionTicket.objects.create(ticket_padre=padre, ticket_hijo=hijo, tipo_relacion=tipo)
+        grafo.invalidar_grafo()
+
+    def test_version_desalojada_recarga_el_indice(self):
+        cache.clear()
+        grafo.impacto(self.a.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            RelacionTicket.objects.create(ticket_padre=self.e, ticket_hijo=self.d, tipo_relacion='Depende de')
+        # La cache pierde la versión (desalojo o reinicio)
+        cache.delete(grafo.CLAVE_VERSION)
+        self.assertIn(self.e.pk, grafo.impacto(self.a.pk)[0])
+
+    def test_impacto_transitivo_en_una_llamada(self):
+        grafo.impacto(self.a.pk)  # carga el índice del proceso
+        with self.assertNumQueries(4):  # sesión, usuario, ticket y datos de los bloqueados
+            response = self.client.get(reverse('ticket_impacto', args=[self.a.pk]))
+        datos = response.json()
+        self.assertEqual(datos['total'], 3)
+        self.assertEqual(
+            [(t['codigo'], t['profundidad'], t['bloqueado_por']) for t in datos['bloqueados']],
+            [('B', 1, self.a.pk), ('C', 2, self.b.pk), ('D', 3, self.c.pk)],
+        )
+        self.assertEqual(datos['ciclos'], [])
+
+        response = self.client.get(reverse('ticket_impacto', args=[self.a.pk]), {'profundidad': 1})
+        self.assertEqual(response.json()['total'], 1)
+
+    def test_actualizacion_incremental(self):
+        grafo.impacto(self.a.pk)
+        indice = grafo._local
+        with self.captureOnCommitCallbacks(execute=True):
+            relacion = RelacionTicket.objects.create(
+                ticket_padre=self.e, ticket_hijo=self.d, tipo_relacion='Depende de',
+            )
+        with self.assertNumQueries(0):
+            bloqueados, _ = grafo.impacto(self.a.pk)
+        self.assertIn(self.e.pk, bloqueados)
+        self.assertIs(grafo._local, indice)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            relacion.delete()
+        self.assertNotIn(self.e.pk, grafo.impacto(self.a.pk)[0])
+        self.assertIs(grafo._local, indice)
+
+    def test_ciclos(self):
+        ciclo = RelacionTicket(ticket_padre=self.a, ticket_hijo=self.c, tipo_relacion='Depende de')
+        with self.assertRaises(ValidationError):
+            ciclo.clean()
+        RelacionTicket(ticket_padre=self.a, ticket_hijo=self.c, tipo_relacion='Relacionado con').clean()
+
+        ciclo.save()
+        grafo.invalidar_grafo()
+        _, ciclos = grafo.impacto(self.a.pk)
+        self.assertEqual(ciclos, [sorted([self.a.pk, self.b.pk, self.c.pk])])
+
+
+class DuplicadosTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.pendiente = Estado.objects.create(nombre='Pendiente')
+        cls.cerrado = Estado.objects.create(nombre='Cerrado')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.abierto = Ticket.objects.create(
+            codigo='INC-1', titulo='Caída de enlace MPLS sucursal Rancagua', estado=self.pendiente,
+            descripcion='Alarma de pérdida de señal en el router de borde',
+        )
+        self.otro = Ticket.objects.create(
+            codigo='INC-2', titulo='Disco lleno en servidor de backup', estado=self.pendiente,
+        )
+
+    def test_sugiere_abiertos_parecidos(self):
+        sugerencias = sugerir_duplicados('Caida enlace MPLS sucursal Rancagua (alarma 2)')
+        self.assertEqual([s['codigo'] for s in sugerencias], ['INC-1'])
+        self.assertGreater(sugerencias[0]['similitud'], 0.6)
+        self.assertEqual(sugerir_duplicados('Cambio de contraseña de usuario'), [])
+
+        with self.assertNumQueries(2):  # bandas candidatas y datos de los candidatos
+            sugerir_duplicados('Caida enlace MPLS sucursal Rancagua')
+
+    def test_indice_incremental(self):
+        self.abierto.estado = self.cerrado
+        self.abierto.save()
+        self.assertFalse(BandaSimilitud.objects.filter(ticket=self.abierto).exists())
+        self.assertEqual(sugerir_duplicados('Caida enlace MPLS sucursal Rancagua'), [])
+
+        self.otro.titulo = 'Caída de enlace MPLS sucursal Rancagua'
+        self.otro.save()
+        self.assertEqual(
+            [s['codigo'] for s in sugerir_duplicados('Caida enlace MPLS sucursal Rancagua')], ['INC-2'],
+        )
+
+    def test_endpoint_del_formulario(self):
+        response = self.client.get(reverse('ticket_duplicados'), {
+            'titulo': 'Enlace MPLS caído sucursal Rancagua', 'descripcion': 'pérdida de señal router de borde',
+        })
+        resultados = response.json()['results']
+        self.assertEqual([r['url'] for r in resultados], [reverse('ticket_detail', args=[self.abierto.pk])])
+        response = self.client.get(reverse('ticket_duplicados'), {
+            'titulo': 'Caída de enlace MPLS sucursal Rancagua', 'excluir': self.abierto.pk,
+        })
+        self.assertEqual(response.json()['results'], [])
+
+
+class AdjuntosTests(TablasNoAdministradasMixin, TestCase):
+
+    DATOS = b'sosreport ' * 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        rol = Rol.objects.create(nombre='Operador')
+        Usuario.objects.create(nombre='Ana', correo='ana@sigmaops.local', password_hash='!', rol=rol)
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        estado = Estado.objects.create(nombre='Pendiente')
+        cls.ticket = Ticket.objects.create(codigo='INC-1', titulo='Caída de servidor', estado=estado)
+
+    def setUp(self):
+        cache_roles.clear()
+        self.addCleanup(cache_roles.clear)
+        self.client.force_login(self.user)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.raiz = Path(directorio.name)
+        parche = mock.patch.object(adjuntos, 'RAIZ', self.raiz)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _subir(self, nombre='sos.tar.xz', datos=DATOS):
+        return self.client.post(reverse('ticket_adjuntar', args=[self.ticket.pk]), {
+            'archivo': SimpleUploadedFile(nombre, datos, 'application/x-xz'),
+        })
+
+    def _archivos(self):
+        return sorted(p.name for p in self.raiz.rglob('*') if p.is_file())
+
+    def test_subida_por_contenido_con_deduplicacion(self):
+        self._subir('a.tar.xz')
+        self._subir('b.tar.xz')
+        sha256 = hashlib.sha256(self.DATOS).hexdigest()
+        self.assertEqual(
+            list(ArchivoAdjunto.objects.order_by('id').values_list('nombre_archivo', 'ruta_almacenamiento', 'tamano_bytes')),
+            [('a.tar.xz', adjuntos.ruta_relativa(sha256), len(self.DATOS)),
+             ('b.tar.xz', adjuntos.ruta_relativa(sha256), len(self.DATOS))],
+        )
+        self.assertEqual(self._archivos(), [sha256])
+
+        primero, segundo = ArchivoAdjunto.objects.order_by('id')
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertEqual(self._archivos(), [sha256])
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertEqual(self._archivos(), [])
+
+    def _subido(self, datos=DATOS):
+        (self.raiz / 'tmp').mkdir(exist_ok=True)
+        ruta = self.raiz / 'tmp' / f'{uuid.uuid4().hex}.subida'
+        ruta.write_bytes(datos)
+        return adjuntos.ArchivoSubido(str(ruta), 'sos.tar.xz', 'application/x-xz', len(datos), None,
+                                      hashlib.sha256(datos).hexdigest())
+
+    def test_borrado_concurrente_no_pierde_el_contenido(self):
+        self._subir('a.tar.xz')
+        sha256 = hashlib.sha256(self.DATOS).hexdigest()
+        destino = self.raiz / adjuntos.ruta_relativa(sha256)
+        with self.captureOnCommitCallbacks() as confirmar_subida:
+            adjuntos.guardar_adjunto(self.ticket, self._subido())
+        # Un borrado que verificó antes del COMMIT de la subida quita el archivo
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchivoAdjunto.objects.filter(nombre_archivo='a.tar.xz').delete()
+        os.unlink(destino)
+        for callback in confirmar_subida:
+            callback()
+        self.assertEqual(destino.read_bytes(), self.DATOS)
+        self.assertEqual(self._archivos(), [sha256])
+
+    def test_borrar_si_huerfano_restaura_lo_referenciado(self):
+        self._subir()
+        sha256 = hashlib.sha256(self.DATOS).hexdigest()
+        adjuntos.borrar_si_huerfano(adjuntos.ruta_relativa(sha256))
+        self.assertEqual(self._archivos(), [sha256])
+        ArchivoAdjunto.objects.all().delete()
+        adjuntos.borrar_si_huerfano(adjuntos.ruta_relativa(sha256))
+        self.assertEqual(self._archivos(), [])
+
+    def test_fallo_al_registrar_no_deja_contenido_huerfano(self):
+        with mock.patch.object(ArchivoAdjunto.objects, 'create', side_effect=RuntimeError('sin conexión')):
+            with self.assertRaises(RuntimeError):
+                adjuntos.guardar_adjunto(self.ticket, self._subido())
+        self.assertEqual(self._archivos(), [])
+
+    def test_subida_excedida_se_descarta(self):
+        with mock.patch.object(adjuntos, 'TAMANO_MAXIMO', 100):
+            self._subir()
+        self.assertFalse(ArchivoAdjunto.objects.exists())
+        self.assertEqual(self._archivos(), [])
+
+    def test_descarga_con_rangos(self):
+        self._subir()
+        url = reverse('adjunto_descargar', args=[ArchivoAdjunto.objects.get().pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.DATOS)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.DATOS)}')
+        self.assertEqual(b''.join(response.streaming_content), self.DATOS[10:20])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(b''.join(response.streaming_content), self.DATOS[-5:])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(self.DATOS)}-')
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class VistasAsyncTests(TablasNoAdministradasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rol = Rol.objects.create(nombre='Visor')
+        Usuario.objects.create(nombre='Ana', correo='ana@sigmaops.local', password_hash='!', rol=rol)
+        cls.user = User.objects.create_user('ana', 'ana@sigmaops.local', 'pw')
+        cls.pendiente = Estado.objects.create(nombre='Pendiente')
+        cerrado = Estado.objects.create(nombre='Cerrado')
+        Ticket.objects.bulk_create([
+            Ticket(codigo='INC-1', titulo='Caída de servidor', estado=cls.pendiente, prioridad='Crítica'),
+            Ticket(codigo='INC-2', titulo='Disco lleno', estado=cls.pendiente, prioridad='Alta'),
+            Ticket(codigo='INC-3', titulo='Cambio de clave', estado=cerrado, prioridad='Baja'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        cache_roles.clear()
+        self.addCleanup(cache_roles.clear)
+
+    async def test_dashboard_y_listado(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(
+            (response.context['total_tickets'], response.context['tickets_pendientes'],
+             response.context['tickets_criticos']),
+            (3, 2, 1),
+        )
+
+        response = await self.async_client.get(reverse('ticket_list'), {'estado': self.pendiente.pk})
+        self.assertEqual(response.context['total_resultados'], 2)
+        self.assertEqual([t.codigo for t in response.context['tickets']], ['INC-2', 'INC-1'])
+        self.assertEqual(len(response.context['estados']), 2)
+        self.assertTrue(response.context['request'].es_visor)
+
+    def test_filas_y_tarjetas_cacheadas_por_version(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(views, 'renderizar_fila', wraps=views.renderizar_fila) as fila, \
+                mock.patch.object(views, 'renderizar_tarjetas', wraps=views.renderizar_tarjetas) as tarjetas:
+            self.client.get(reverse('ticket_list'))
+            self.client.get(reverse('dashboard'))
+            self.assertEqual((fila.call_count, tarjetas.call_count), (3, 1))
+
+            self.client.get(reverse('ticket_list'))
+            self.client.get(reverse('dashboard'))
+            self.assertEqual((fila.call_count, tarjetas.call_count), (3, 1))
+
+            # Solo se vuelve a renderizar la fila del ticket modificado
+            ticket = Ticket.objects.get(codigo='INC-3')
+            ticket.titulo = 'Cambio de clave VPN'
+            ticket.estado = self.pendiente
+            ticket.save()
+            self.assertContains(self.client.get(reverse('ticket_list')), 'Cambio de clave VPN')
+            response = self.client.get(reverse('dashboard'))
+            self.assertEqual((fila.call_count, tarjetas.call_count), (4, 2))
+        # Total y pendientes
+        self.assertInHTML('<span class="kpi-value">3</span>', response.context['tarjetas']['kpis'], count=2)
+
+    def test_listado_condicional(self):
+        self.client.force_login(self.user)
+        url = reverse('ticket_list')
+        self.client.get(url)  # fija la cookie CSRF, parte del ETag
+        etag = self.client.get(url, {'estado': self.pendiente.pk})['ETag']
+        response = self.client.get(url, {'estado': self.pendiente.pk}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        Ticket.objects.filter(codigo='INC-3').get().save()
+        response = self.client.get(url, {'estado': self.pendiente.pk}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        # Las búsquedas no llevan validador
+        self.assertFalse(self.client.get(url, {'q': 'disco'}).has_header('ETag'))
+
+    async def test_requiere_login(self):
+        response = await self.async_client.get(reverse('ticket_list'))
+        self.assertEqual(response.status_code, 302)
+
+
+class TransmisionAsgiTests(TablasNoAdministradasMixin, TransactionTestCase):
+    # Transaccional: bajo ASGI la vista y el iterador corren en otro hilo
+
+    def setUp(self):
+        self.addCleanup(vaciar_tablas_no_administradas)
+        self.addCleanup(cola_auditoria.vaciar)
+        self.addCleanup(cache_roles.clear)
+        rol = Rol.objects.create(nombre='Operador')
+        Usuario.objects.create(nombre='Ana', correo='ana@sigmaops.local', password_hash='!', rol=rol)
+        estado = Estado.objects.create(nombre='Pendiente')
+        Ticket.objects.bulk_create([
+            Ticket(codigo=f'INC-{i:03d}', titulo=f'Enlace {i}', estado=estado,
+                   fecha_inicio=datetime.date(2026, 1, 1) + timedelta(days=i % 7))
+            for i in range(60)
+        ])
+        self.client.force_login(User.objects.create_user('ana', 'ana@sigmaops.local', 'pw'))
+
+    def asgi(self, ruta, al_enviar=None):
+        """Ejecuta un GET con ASGIHandler; retorna los mensajes enviados"""
+        enviados = []
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(), 'query_string': b'',
+            'root_path': '', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        }
+
+        async def ejecutar():
+            # La segunda llamada (espera de desconexión) queda bloqueada
+            cuerpo = asyncio.Queue()
+            await cuerpo.put({'type': 'http.request', 'body': b'', 'more_body': False})
+
+            async def enviar(mensaje):
+                if al_enviar:
+                    al_enviar(mensaje)
+                enviados.append(mensaje)
+            await ASGIHandler()(scope, cuerpo.get, enviar)
+
+        async_to_sync(ejecutar)()
+        return enviados
+
+    @mock.patch.object(asincrono, 'BLOQUE_TRANSMISION', 512)
+    def test_exportacion_envia_antes_de_agotar_el_iterador(self):
+        agotado = []
+        al_primer_bloque = []
+        filas_csv = export.filas_csv
+
+        def filas(datos):
+            yield from filas_csv(datos)
+            agotado.append(True)
+
+        def al_enviar(mensaje):
+            if mensaje['type'] == 'http.response.body' and mensaje.get('body') and not al_primer_bloque:
+                al_primer_bloque.append(bool(agotado))
+
+        with mock.patch.object(export, 'filas_csv', filas):
+            enviados = self.asgi(reverse('ticket_export'), al_enviar)
+        cuerpos = [m['body'] for m in enviados if m['type'] == 'http.response.body' and m.get('body')]
+        self.assertEqual(enviados[0]['status'], 200)
+        self.assertEqual(al_primer_bloque, [False])
+        self.assertTrue(agotado)
+        self.assertGreater(len(cuerpos), 1)
+        self.assertEqual(len(b''.join(cuerpos).decode('utf-8-sig').splitlines()), 61)
+
+    @mock.patch.object(asincrono, 'BLOQUE_TRANSMISION', 1000)
+    @mock.patch.object(ASGIHandler, 'chunk_size', 1000)
+    def test_descarga_envia_antes_de_leer_todo_el_archivo(self):
+        datos = b'sosreport ' * 1000
+        agotado = []
+        al_primer_bloque = []
+
+        class Registrada(FileResponse):
+            def _set_streaming_content(self, value):
+                super()._set_streaming_content(value)
+                if self.is_async:
+                    return
+                partes = self._iterator
+
+                def registrar():
+                    yield from partes
+                    agotado.append(True)
+                self._iterator = registrar()
+
+        def al_enviar(mensaje):
+            if mensaje['type'] == 'http.response.body' and mensaje.get('body') and not al_primer_bloque:
+                al_primer_bloque.append(bool(agotado))
+
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        with mock.patch.object(adjuntos, 'RAIZ', Path(directorio.name)):
+            self.client.post(reverse('ticket_adjuntar', args=[Ticket.objects.first().pk]), {
+                'archivo': SimpleUploadedFile('sos.tar.xz', datos, 'application/x-xz'),
+            })
+            with mock.patch.object(views, 'FileResponse', Registrada):
+                enviados = self.asgi(reverse('adjunto_descargar', args=[ArchivoAdjunto.objects.get().pk]), al_enviar)
+        cuerpos = [m['body'] for m in enviados if m['type'] == 'http.response.body' and m.get('body')]
+        self.assertEqual(enviados[0]['status'], 200)
+        self.assertEqual(al_primer_bloque, [False])
+        self.assertEqual(len(cuerpos), 10)
+        self.assertEqual(b''.join(cuerpos), datos)
+
+
+class EnParaleloTests(SimpleTestCase):
+
+    def test_funciones_concurrentes_en_orden(self):
+        # Con ejecución en serie la barrera nunca se completa
+        barrera = threading.Barrier(3, timeout=5)
+
+        def tarea(valor):
+            def ejecutar():
+                barrera.wait()
+                return valor
+            return ejecutar
+
+        self.assertEqual(async_to_sync(en_paralelo)(tarea('a'), tarea('b'), tarea('c')), ['a', 'b', 'c'])
+
+
+class EnParaleloConexionesTests(TablasNoAdministradasMixin, TransactionTestCase):
+    # Transaccional: los hilos del executor usan su propia conexión y solo
+    # ven lo confirmado
+
+    def setUp(self):
+        self.addCleanup(vaciar_tablas_no_administradas)
+        for nombre in ('Pendiente', 'En curso', 'Cerrado'):
+            Estado.objects.create(nombre=nombre)
+
+    def consultas(self):
+        return (
+            lambda: (threading.get_ident(), Estado.objects.count()),
+            lambda: (threading.get_ident(), sorted(Estado.objects.values_list('nombre', flat=True))),
+        )
+
+    def test_hilos_con_su_conexion(self):
+        (hilo_cuenta, cuenta), (hilo_nombres, nombres) = async_to_sync(en_paralelo)(*self.consultas())
+        self.assertEqual(cuenta, 3)
+        self.assertEqual(nombres, ['Cerrado', 'En curso', 'Pendiente'])
+        self.assertNotIn(threading.get_ident(), {hilo_cuenta, hilo_nombres})
+
+    def test_sin_conexiones_baratas_en_serie(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'), \
+                mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            self.assertFalse(asincrono.conexiones_baratas())
+            with mock.patch.dict(connection.settings_dict, {'POOL': {'SIZE': 10}}):
+                self.assertTrue(asincrono.conexiones_baratas())
+            resultados = async_to_sync(en_paralelo)(*self.consultas())
+        # En serie: ambas en el hilo síncrono del request
+        self.assertEqual(len({hilo for hilo, _ in resultados}), 1)
+        self.assertEqual(resultados[0][1], 3)
+
+
+class ConexionFalsa:
+
+    def __init__(self):
+        self.cerrada = False
+        self.responde = True
+
+
+class PoolConexionesTests(SimpleTestCase):
+
+    def crear_pool(self, **opciones):
+        self.creadas = []
+
+        def crear():
+            self.creadas.append(ConexionFalsa())
+            return self.creadas[-1]
+
+        return PoolConexiones(
+            crear, verificar=lambda c: c.responde, cerrar=lambda c: setattr(c, 'cerrada', True),
+            alias='prueba', **opciones,
+        )
+
+    def test_reutiliza_y_acota(self):
+        pool = self.crear_pool(tamano=1, espera=0.05)
+        conexion = pool.obtener()
+        with self.assertRaises(PoolAgotado):
+            pool.obtener()
+        pool.devolver(conexion)
+        self.assertIs(pool.obtener(), conexion)
+        self.assertEqual(len(self.creadas), 1)
+
+    def test_reemplaza_sin_ping_o_vencidas(self):
+        pool = self.crear_pool(tamano=1)
+        conexion = pool.obtener()
+        conexion.responde = False
+        pool.devolver(conexion)
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.cerrada)
+
+        pool.devolver(nueva)
+        pool.reciclar = 1e-9
+        self.assertIsNot(pool.obtener(), nueva)
+        self.assertEqual((len(self.creadas), pool.abiertas), (3, 1))
+
+    def test_prestamo_perdido_libera_cupo(self):
+        # Un hilo que termina sin cerrar su conexión no agota el pool
+        pool = self.crear_pool(tamano=1, espera=0.05)
+        pool.obtener()
+        self.creadas.clear()
+        gc.collect()
+        self.assertEqual((pool.abiertas, pool.en_uso), (0, 0))
+        pool.obtener()
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Ruteo de lecturas a réplicas con el estado de cada request"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.disponibles = ['replica_1']
+        for parche in (
+            mock.patch.object(routers, 'REPLICAS', ['replica_1']),
+            mock.patch.object(routers.monitor, 'disponibles', lambda: list(self.disponibles)),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def iniciar(self, metodo='get', primaria=False):
+        estado = routers.EstadoLecturas(primaria=primaria)
+        self.addCleanup(routers.estado_lecturas.reset, routers.estado_lecturas.set(estado))
+        routers.permitir_replica(getattr(RequestFactory(), metodo)('/'))
+        return estado
+
+    def test_solo_get_marcados_leen_de_replica(self):
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        self.iniciar('post')
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        self.iniciar('get')
+        self.assertEqual(self.router.db_for_read(Ticket), 'replica_1')
+
+    def test_escritura_vuelve_a_la_primaria_y_marca_la_sesion(self):
+        estado = self.iniciar()
+        self.assertEqual(self.router.db_for_read(Ticket), 'replica_1')
+        self.assertEqual(self.router.db_for_write(Ticket), 'default')
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        response = routers.marcar_escritura(HttpResponse(), estado)
+        self.assertEqual(response.cookies[routers.COOKIE_PRIMARIA]['max-age'], routers.STICKY_SEGUNDOS)
+
+    def test_sesion_reciente_o_replicas_atrasadas_leen_de_la_primaria(self):
+        self.iniciar(primaria=True)
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        self.disponibles = []
+        self.iniciar()
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+
+    def test_sin_etag_para_lo_leido_en_replica(self):
+        self.iniciar()
+        self.router.db_for_read(Ticket)
+        response = condicional.con_validador(RequestFactory().get('/'), HttpResponse(), '"sello"')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_cache_de_lo_leido_en_replica_dura_el_retraso_tolerado(self):
+        self.iniciar()
+        self.assertEqual(routers.ttl_lectura(600), 600)
+        self.router.db_for_read(Ticket)
+        self.assertEqual(routers.ttl_lectura(600), routers.RETRASO_MAXIMO)
+
+
+class CursorFalso:
+
+    def __init__(self, respuestas):
+        # sentencia -> excepción o (columnas, fila)
+        self.respuestas = respuestas
+        self.ejecutadas = []
+        self.description = None
+        self.fila = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.ejecutadas.append(sql)
+        respuesta = self.respuestas[sql]
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        columnas, self.fila = respuesta
+        self.description = [(columna,) for columna in columnas]
+
+    def fetchone(self):
+        return self.fila
+
+
+class MonitorReplicasTests(SimpleTestCase):
+    """Medición del retraso de las réplicas en MariaDB/MySQL"""
+
+    def conexion(self, **respuestas):
+        self.cursor = CursorFalso({sql.replace('_', ' '): respuesta for sql, respuesta in respuestas.items()})
+        return mock.Mock(vendor='mysql', cursor=lambda: self.cursor)
+
+    def test_show_replica_status_con_respaldo(self):
+        conexion = self.conexion(SHOW_REPLICA_STATUS=(('Seconds_Behind_Source',), (3,)))
+        self.assertEqual(routers.retraso_replica(conexion), 3.0)
+
+        conexion = self.conexion(
+            SHOW_REPLICA_STATUS=ProgrammingError(1064, 'You have an error in your SQL syntax'),
+            SHOW_SLAVE_STATUS=(('Slave_IO_Running', 'Seconds_Behind_Master'), ('Yes', 2)),
+        )
+        self.assertEqual(routers.retraso_replica(conexion), 2.0)
+        self.assertEqual(self.cursor.ejecutadas, ['SHOW REPLICA STATUS', 'SHOW SLAVE STATUS'])
+
+    def test_sin_privilegio_avisa_una_vez_y_cuenta(self):
+        denegado = OperationalError(1227, 'Access denied; you need the REPLICATION CLIENT privilege')
+        monitor = routers.MonitorReplicas(['replica_1'])
+        antes = metrics.mediciones_replica_fallidas.valor('replica_1', 'privilege')
+        with mock.patch.object(routers, 'connections', {'replica_1': self.conexion(SHOW_REPLICA_STATUS=denegado)}):
+            with self.assertLogs('tickets.routers', 'WARNING') as logs:
+                for _ in range(3):
+                    self.assertIsNone(monitor.medir('replica_1'))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('REPLICATION CLIENT', logs.output[0])
+        self.assertEqual(metrics.mediciones_replica_fallidas.valor('replica_1', 'privilege'), antes + 3)
+        self.assertEqual(monitor.disponibles(), [])
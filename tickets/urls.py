@@ -6,9 +6,18 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/tickets/', views.dashboard_tickets, name='dashboard_tickets'),
     path('tickets/', views.TicketListView.as_view(), name='ticket_list'),
+    path('tickets/exportar/', views.exportar_tickets, name='ticket_export'),
     path('tickets/<int:pk>/', views.TicketDetailView.as_view(), name='ticket_detail'),
     path('tickets/nuevo/', views.TicketCreateView.as_view(), name='ticket_create'),
+    path('tickets/duplicados/', views.duplicados_ticket, name='ticket_duplicados'),
     path('tickets/<int:pk>/editar/', views.TicketUpdateView.as_view(), name='ticket_update'),
     path('tickets/<int:pk>/observacion/', views.agregar_observacion, name='agregar_observacion'),
+    path('tickets/<int:pk>/observaciones/', views.observaciones_ticket, name='ticket_observaciones'),
+    path('tickets/<int:pk>/impacto/', views.impacto_ticket, name='ticket_impacto'),
+    path('tickets/<int:pk>/adjuntos/', views.subir_adjunto, name='ticket_adjuntar'),
+    path('adjuntos/<int:pk>/', views.descargar_adjunto, name='adjunto_descargar'),
+    path('reportes/tiempos/', views.reporte_tiempos, name='reporte_tiempos'),
+    path('autocompletar/<str:catalogo>/', views.autocompletar, name='autocompletar'),
 ]
@@ -1,126 +1,411 @@
 """
 Vistas del sistema de tickets
 """
-from django.shortcuts import render, get_object_or_404, redirect
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.urls import reverse
+from django.template.response import TemplateResponse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils.decorators import method_decorator
-from django.db.models import Count, Q
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
 from django.contrib import messages
-from .models import Ticket, Observacion, Estado, Categoria, Proveedor, DataCenter, Elemento, Usuario
+from .models import (
+    Ticket, Observacion, Proveedor, Elemento, Usuario,
+    EstadoHistorico, SlaControl, Asignacion, ArchivoAdjunto, RelacionTicket,
+)
 from .forms import TicketForm, ObservacionForm
-from .permissions import PuedeCrearMixin, PuedeEditarMixin
+from .permissions import PuedeCrearMixin, PuedeEditarMixin, puede_editar_tickets
+from .stats import CACHE_TTL, obtener_estadisticas, contar_tickets
+from .pagination import paginar_keyset, pagina_keyset, iterar_keyset, CursorInvalido
+from .search import buscar
+from .similitud import sugerir_duplicados
+from .sla import NIVELES_RIESGO, obtener_resumen_sla, tickets_por_nivel
+from .catalogos import catalogo
+from .fragmentos import (
+    clave_conjunto, obtener_cacheado, obtener_fragmento, obtener_fragmentos, sello_conjunto, sello_ticket,
+)
+from .condicional import con_validador, etag_pagina, no_modificada
+from .asincrono import en_paralelo, transmitir
+from .routers import leer_de_replica
+from . import adjuntos, export, grafo, rollups
 
 
-@login_required
-def dashboard(request):
-    """Dashboard principal con estadísticas y filtros"""
-    # Contadores generales
-    total_tickets = Ticket.objects.count()
-    tickets_pendientes = Ticket.objects.filter(estado__nombre='Pendiente').count()
-    tickets_en_proceso = Ticket.objects.filter(estado__nombre='En Proceso').count()
-    tickets_cerrados = Ticket.objects.filter(estado__nombre='Cerrado').count()
-    
-    # Tickets por prioridad
-    tickets_criticos = Ticket.objects.filter(prioridad='Crítica').count()
-    tickets_alta = Ticket.objects.filter(prioridad='Alta').count()
-    
-    # Tickets por categoría
-    tickets_por_categoria = Categoria.objects.annotate(
-        total=Count('ticket')
-    ).filter(total__gt=0).values('nombre', 'total')
-    
-    # Tickets por data center
-    tickets_por_dc = DataCenter.objects.annotate(
-        total=Count('ticket')
-    ).filter(total__gt=0).values('nombre', 'total')
-    
-    # Filtrar tickets según el parámetro GET
-    filtro = request.GET.get('filtro', 'todos')
-    valor = request.GET.get('valor', '')
-    tickets_filtrados = Ticket.objects.select_related(
-        'estado', 'categoria', 'proveedor', 'dc'
-    )
-    
+TAMANO_PAGINA_DASHBOARD = 10
+TAMANO_PAGINA_OBSERVACIONES = 20
+
+
+def filtrar_dashboard(queryset, filtro, valor):
+    """Aplica el filtro de las tarjetas del dashboard (parámetros filtro/valor)"""
     if filtro == 'pendiente':
-        tickets_filtrados = tickets_filtrados.filter(estado__nombre='Pendiente')
+        queryset = queryset.filter(estado__nombre='Pendiente')
     elif filtro == 'proceso':
-        tickets_filtrados = tickets_filtrados.filter(estado__nombre='En Proceso')
+        queryset = queryset.filter(estado__nombre='En Proceso')
     elif filtro == 'cerrado':
-        tickets_filtrados = tickets_filtrados.filter(estado__nombre='Cerrado')
+        queryset = queryset.filter(estado__nombre='Cerrado')
     elif filtro == 'critico':
-        tickets_filtrados = tickets_filtrados.filter(prioridad='Crítica')
+        queryset = queryset.filter(prioridad='Crítica')
     elif filtro == 'alta':
-        tickets_filtrados = tickets_filtrados.filter(prioridad='Alta')
+        queryset = queryset.filter(prioridad='Alta')
     elif filtro == 'categoria' and valor:
-        tickets_filtrados = tickets_filtrados.filter(categoria__nombre=valor)
+        queryset = queryset.filter(categoria__nombre=valor)
     elif filtro == 'dc' and valor:
-        tickets_filtrados = tickets_filtrados.filter(dc__nombre=valor)
-    
-    tickets_filtrados = tickets_filtrados.order_by('-fecha_inicio')
-    
-    context = {
-        'total_tickets': total_tickets,
-        'tickets_pendientes': tickets_pendientes,
-        'tickets_en_proceso': tickets_en_proceso,
-        'tickets_cerrados': tickets_cerrados,
-        'tickets_criticos': tickets_criticos,
-        'tickets_alta': tickets_alta,
-        'tickets_por_categoria': tickets_por_categoria,
-        'tickets_por_dc': tickets_por_dc,
-        'tickets_filtrados': tickets_filtrados,
+        queryset = queryset.filter(dc__nombre=valor)
+    elif filtro == 'sla_vencido':
+        queryset = queryset.filter(pk__in=tickets_por_nivel(['vencido']))
+    elif filtro == 'sla_riesgo':
+        queryset = queryset.filter(pk__in=tickets_por_nivel(NIVELES_RIESGO))
+    return queryset
+
+
+def total_filtro(stats, filtro, valor, sla=None):
+    """Total de tickets del filtro leído desde el snapshot de estadísticas"""
+    contadores = {
+        'pendiente': 'tickets_pendientes',
+        'proceso': 'tickets_en_proceso',
+        'cerrado': 'tickets_cerrados',
+        'critico': 'tickets_criticos',
+        'alta': 'tickets_alta',
     }
-    return render(request, 'tickets/dashboard.html', context)
+    if filtro in contadores:
+        return stats[contadores[filtro]]
+    if filtro == 'categoria' and valor:
+        return sum(c['total'] for c in stats['tickets_por_categoria'] if c['nombre'] == valor)
+    if filtro == 'dc' and valor:
+        return sum(d['total'] for d in stats['tickets_por_dc'] if d['nombre'] == valor)
+    if filtro == 'sla_vencido':
+        return (sla or obtener_resumen_sla())['vencido']
+    if filtro == 'sla_riesgo':
+        return (sla or obtener_resumen_sla())['en_riesgo']
+    return stats['total_tickets']
 
 
-class TicketListView(LoginRequiredMixin, ListView):
-    """Listado de tickets con filtros"""
+@login_required
+@leer_de_replica
+async def dashboard(request):
+    """Dashboard principal con estadísticas y filtros"""
+    # La tabla se carga por páginas desde dashboard_tickets
+    filtro = request.GET.get('filtro', 'todos')
+    valor = request.GET.get('valor', '')
+    # La versión se lee antes que el snapshot (ver fragmentos.obtener_fragmento)
+    clave = await sync_to_async(clave_conjunto)('dashboard', filtro, valor)
+    
+    # Contadores y desgloses (snapshot cacheado, una sola consulta) y el
+    # resumen de SLA se leen a la vez
+    stats, sla = await en_paralelo(obtener_estadisticas, obtener_resumen_sla)
+    # Las tarjetas no duran más que el snapshot del que salen
+    tarjetas = await sync_to_async(obtener_cacheado)(
+        clave, lambda: renderizar_tarjetas(stats, filtro, valor), ttl=CACHE_TTL,
+    )
+    
+    context = dict(
+        stats, total_filtrado=total_filtro(stats, filtro, valor, sla), sla=sla, tarjetas=tarjetas,
+    )
+    # TemplateResponse: el render (sesión, mensajes) corre en el hilo síncrono
+    return TemplateResponse(request, 'tickets/dashboard.html', context)
+
+
+def renderizar_tarjetas(stats, filtro, valor):
+    """Tarjetas del dashboard que solo dependen del snapshot y el filtro activo"""
+    context = dict(stats, filtro=filtro, valor=valor)
+    return {
+        'kpis': render_to_string('tickets/_dashboard_kpis.html', context),
+        'alertas': render_to_string('tickets/_dashboard_alertas.html', context),
+        'categorias': render_to_string('tickets/_dashboard_desglose.html', dict(
+            context, titulo='Por Categoría', tipo='categoria', items=stats['tickets_por_categoria'],
+        )),
+        'data_centers': render_to_string('tickets/_dashboard_desglose.html', dict(
+            context, titulo='Por Data Center', tipo='dc', items=stats['tickets_por_dc'],
+        )),
+    }
+
+
+# Columnas ordenables de la tabla del dashboard
+COLUMNAS_DASHBOARD = {
+    'codigo': 'codigo',
+    'titulo': 'titulo',
+    'estado': 'estado__nombre',
+    'prioridad': 'prioridad',
+    'dc': 'dc__nombre',
+    'fecha': 'fecha_inicio',
+}
+
+
+@login_required
+@leer_de_replica
+def dashboard_tickets(request):
+    """Página JSON de la tabla del dashboard: filtro, búsqueda y orden en servidor"""
+    filtro = request.GET.get('filtro', 'todos')
+    valor = request.GET.get('valor', '')
+    busqueda = request.GET.get('q', '').strip()
+    orden = request.GET.get('sort', 'fecha')
+    descendente = request.GET.get('dir', 'desc') == 'desc'
+    campo = COLUMNAS_DASHBOARD.get(orden, 'fecha_inicio')
+    
+    queryset = filtrar_dashboard(Ticket.objects.all(), filtro, valor)
+    if busqueda:
+        queryset = queryset.filter(
+            Q(codigo__icontains=busqueda) | Q(titulo__icontains=busqueda)
+        )
+    
+    try:
+        filas, siguiente = paginar_keyset(
+            queryset.values(*set(COLUMNAS_DASHBOARD.values()), 'id'),
+            campo, descendente,
+            cursor=request.GET.get('cursor'),
+            por_pagina=TAMANO_PAGINA_DASHBOARD,
+        )
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    if busqueda:
+        total = queryset.count()
+    else:
+        total = total_filtro(obtener_estadisticas(), filtro, valor)
+    
+    resultados = [{
+        'id': fila['id'],
+        'url': reverse('ticket_detail', args=[fila['id']]),
+        'codigo': fila['codigo'],
+        'titulo': fila['titulo'],
+        'estado': fila['estado__nombre'],
+        'prioridad': fila['prioridad'],
+        'prioridad_badge': Ticket.PRIORIDAD_BADGES.get(fila['prioridad'], 'badge-medium'),
+        'dc': fila['dc__nombre'],
+        'fecha': fila['fecha_inicio'],
+    } for fila in filas]
+    return JsonResponse({'results': resultados, 'next': siguiente, 'total': total})
+
+
+# Filtros del listado: parámetro GET -> lookup
+FILTROS_LISTADO = {
+    'estado': 'estado_id',
+    'categoria': 'categoria_id',
+    'prioridad': 'prioridad',
+    'dc': 'dc_id',
+}
+
+
+def filtrar_listado(queryset, params):
+    """
+    Aplica los filtros del listado de tickets (estado, categoria, prioridad,
+    dc y búsqueda q) y su orden: relevancia si hay búsqueda, si no fecha.
+    """
+    for parametro, lookup in FILTROS_LISTADO.items():
+        valor = params.get(parametro)
+        if valor:
+            queryset = queryset.filter(**{lookup: valor})
+    
+    busqueda = params.get('q')
+    if busqueda:
+        # Índice invertido ordenado por relevancia (ver tickets/search.py)
+        queryset = buscar(queryset, busqueda, incluir_observaciones=bool(params.get('obs')))
+        if 'relevancia' in queryset.query.annotations:
+            return queryset.order_by('-relevancia', '-fecha_inicio')
+    
+    return queryset.order_by('-fecha_inicio')
+
+
+# Catálogos con autocompletado: modelo y campos buscados por prefijo
+AUTOCOMPLETAR = {
+    'elementos': (Elemento, ('nombre', 'tipo')),
+    'usuarios': (Usuario, ('nombre', 'correo')),
+}
+LIMITE_AUTOCOMPLETAR = 20
+
+
+@login_required
+def autocompletar(request, catalogo):
+    """Opciones que comienzan con ``q`` para los selects con autocompletado"""
+    if catalogo not in AUTOCOMPLETAR:
+        raise Http404('Catálogo no disponible')
+    modelo, campos = AUTOCOMPLETAR[catalogo]
+    texto = request.GET.get('q', '').strip()
+    if len(texto) < 2:
+        return JsonResponse({'results': []})
+    
+    condicion = Q()
+    for campo in campos:
+        condicion |= Q(**{f'{campo}__istartswith': texto})
+    queryset = modelo.objects.filter(condicion).only('id', *campos).order_by(campos[0])
+    resultados = [
+        {'id': obj.pk, 'text': str(obj)} for obj in queryset[:LIMITE_AUTOCOMPLETAR]
+    ]
+    return JsonResponse({'results': resultados})
+
+
+def catalogos_listado():
+    """Catálogos de los selects de filtro del listado"""
+    return {
+        'estados': catalogo('estados'),
+        'categorias': catalogo('categorias'),
+        'data_centers': catalogo('data_centers'),
+    }
+
+
+@method_decorator([login_required, leer_de_replica], name='get')
+class TicketListView(ListView):
+    """Listado de tickets con filtros (vista async)"""
     model = Ticket
     template_name = 'tickets/ticket_list.html'
     context_object_name = 'tickets'
     paginate_by = 15
+    # 'cursor': keyset sobre (fecha_inicio, id); 'offset': Paginator de Django
+    paginacion = settings.TICKET_LIST_PAGINATION
     
     def get_queryset(self):
         queryset = Ticket.objects.select_related(
             'estado', 'categoria', 'proveedor', 'dc', 'usuario_asignado'
         )
-        
-        # Filtros
-        estado = self.request.GET.get('estado')
-        categoria = self.request.GET.get('categoria')
-        prioridad = self.request.GET.get('prioridad')
-        dc = self.request.GET.get('dc')
-        busqueda = self.request.GET.get('q')
-        
-        if estado:
-            queryset = queryset.filter(estado_id=estado)
-        if categoria:
-            queryset = queryset.filter(categoria_id=categoria)
-        if prioridad:
-            queryset = queryset.filter(prioridad=prioridad)
-        if dc:
-            queryset = queryset.filter(dc_id=dc)
-        if busqueda:
-            queryset = queryset.filter(
-                Q(codigo__icontains=busqueda) | 
-                Q(titulo__icontains=busqueda) |
-                Q(descripcion__icontains=busqueda)
+        self.filtros = {campo: self.request.GET.get(campo) for campo in FILTROS_LISTADO}
+        self.busqueda = self.request.GET.get('q')
+        return filtrar_listado(queryset, self.request.GET)
+    
+    def usa_cursor(self):
+        # Los resultados de búsqueda se ordenan por relevancia, no por fecha
+        return self.paginacion == 'cursor' and not self.busqueda
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usa_cursor():
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            pagina = pagina_keyset(
+                queryset, 'fecha_inicio', descendente=True,
+                despues=self.request.GET.get('cursor'),
+                antes=self.request.GET.get('antes'),
+                por_pagina=page_size,
             )
-        
-        return queryset.order_by('-fecha_inicio')
+        except CursorInvalido:
+            raise Http404('Cursor inválido')
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
+    
+    async def get(self, request, *args, **kwargs):
+        # Sin búsqueda el listado solo cambia con la versión del conjunto de
+        # tickets; la relevancia depende también de las observaciones
+        etag = None
+        if not request.GET.get('q'):
+            etag, respuesta = await sync_to_async(self.revalidar)()
+            if respuesta is not None:
+                return respuesta
+        # buscar() puede consultar los términos del índice al armar el queryset
+        self.object_list = await sync_to_async(self.get_queryset)()
+        # Página, conteo y catálogos son consultas independientes
+        context, total, catalogos = await en_paralelo(
+            self.cargar_pagina, self.contar_resultados, catalogos_listado,
+        )
+        context.update(catalogos)
+        if total is not None:
+            context['total_resultados'] = total
+        response = self.render_to_response(context)
+        if etag is not None:
+            response = await sync_to_async(con_validador)(request, response, etag)
+        return response
+    
+    def revalidar(self):
+        """ETag del listado y la respuesta 304 si el cliente ya tiene esa versión"""
+        etag = etag_pagina(self.request, 'listado', sello_conjunto())
+        return etag, no_modificada(self.request, etag)
+    
+    def cargar_pagina(self):
+        """Contexto con la página ya evaluada (y su conteo si la paginación es offset)"""
+        context = self.get_context_data()
+        context['object_list'] = context[self.context_object_name] = list(context['object_list'])
+        # Filas cacheadas por ticket y versión: solo se renderizan las que cambiaron
+        context['filas'] = obtener_fragmentos('fila', context['object_list'], renderizar_fila)
+        if context['paginator'] is not None:
+            context['total_resultados'] = context['paginator'].count
+        return context
+    
+    def contar_resultados(self):
+        """Total para la paginación por cursor; la offset lo obtiene con la página"""
+        if self.usa_cursor():
+            return contar_tickets(self.filtros, self.object_list)
+        return None
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['estados'] = Estado.objects.all()
-        context['categorias'] = Categoria.objects.all()
-        context['data_centers'] = DataCenter.objects.all()
         context['prioridades'] = ['Baja', 'Media', 'Alta', 'Crítica']
+        
+        # Parámetros de filtro a conservar en los enlaces de paginación
+        params = self.request.GET.copy()
+        for clave in ('page', 'cursor', 'antes'):
+            params.pop(clave, None)
+        context['filtros_query'] = params.urlencode()
+        context['paginacion_cursor'] = self.usa_cursor()
         return context
 
 
+def renderizar_fila(ticket):
+    return render_to_string('tickets/_ticket_fila.html', {'ticket': ticket})
+
+
+@login_required
+def exportar_tickets(request):
+    """Exporta en streaming los tickets del listado con sus filtros (CSV o XLSX)"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'xlsx'):
+        raise Http404('Formato no soportado')
+    
+    queryset = filtrar_listado(Ticket.objects.all(), request.GET).values('id', *export.CAMPOS)
+    if request.GET.get('q'):
+        # Ordenado por relevancia: el resultado de una búsqueda es acotado
+        filas = queryset.iterator(chunk_size=2000)
+    else:
+        filas = iterar_keyset(queryset, 'fecha_inicio', descendente=True, lote=2000)
+    
+    nombre = f"tickets_{timezone.localdate():%Y%m%d}.{formato}"
+    if formato == 'xlsx':
+        response = StreamingHttpResponse(
+            export.filas_xlsx(filas),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        response = StreamingHttpResponse(export.filas_csv(filas), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return transmitir(request, response)
+
+
+@login_required
+def reporte_tiempos(request):
+    """
+    Tiempo promedio por estado y MTTR entre ``desde`` y ``hasta`` (YYYY-MM-DD,
+    por defecto los últimos 30 días), agrupados opcionalmente con ``por``
+    (categoria, dc, proveedor o prioridad). Lee solo los rollups diarios.
+    """
+    por = request.GET.get('por') or None
+    if por and por not in rollups.DIMENSIONES:
+        return JsonResponse({'error': 'Dimensión no soportada'}, status=400)
+    hasta = parse_date(request.GET.get('hasta', '')) or timezone.localdate()
+    desde = parse_date(request.GET.get('desde', '')) or hasta - timedelta(days=30)
+    return JsonResponse({
+        'desde': desde,
+        'hasta': hasta,
+        'tiempos': rollups.tiempos_por_estado(desde, hasta, por),
+        'mttr': rollups.mttr(desde, hasta, por),
+    })
+
+
+@method_decorator(leer_de_replica, name='get')
 class TicketDetailView(LoginRequiredMixin, DetailView):
-    """Detalle de un ticket con observaciones"""
+    """
+    Vista 360 del ticket: datos, observaciones, historial de estados, SLA,
+    asignaciones, adjuntos y relaciones. Las relaciones se cargan con
+    Prefetch (cantidad de consultas fija, ver tests) y las secciones
+    renderizadas se cachean por ticket y versión (ver fragmentos.py).
+    """
     model = Ticket
     template_name = 'tickets/ticket_detail.html'
     context_object_name = 'ticket'
@@ -129,15 +414,152 @@ class TicketDetailView(LoginRequiredMixin, DetailView):
         return Ticket.objects.select_related(
             'estado', 'categoria', 'proveedor', 'dc', 
             'elemento', 'usuario_creador', 'usuario_asignado'
+        ).annotate(
+            total_observaciones=total_observaciones()
+        ).prefetch_related(
+            Prefetch('historial_estados', queryset=EstadoHistorico.objects.select_related(
+                'estado', 'usuario').order_by('-fecha_cambio', '-id')),
+            Prefetch('sla', queryset=SlaControl.objects.order_by('-fecha_creacion', '-id')),
+            Prefetch('asignaciones', queryset=Asignacion.objects.select_related(
+                'usuario').order_by('-activo', '-fecha_asignacion')),
+            Prefetch('archivos', queryset=ArchivoAdjunto.objects.select_related(
+                'usuario').order_by('-fecha_subida', '-id')),
+            Prefetch('tickets_hijos', queryset=RelacionTicket.objects.select_related(
+                'ticket_hijo__estado').order_by('id')),
+            Prefetch('tickets_padres', queryset=RelacionTicket.objects.select_related(
+                'ticket_padre__estado').order_by('id')),
         )
     
+    def get(self, request, *args, **kwargs):
+        self.object = None
+        # El sello cambia con el ticket o cualquiera de sus relaciones
+        # (observaciones incluidas): si no cambió, 304 sin consultas ni render
+        etag = etag_pagina(request, 'detalle', sello_ticket(kwargs['pk']))
+        respuesta = no_modificada(request, etag)
+        if respuesta is not None:
+            return respuesta
+        secciones = obtener_fragmento('detalle', kwargs['pk'], self.renderizar_secciones)
+        context = self.get_context_data(
+            ticket={'pk': kwargs['pk'], 'codigo': secciones['codigo']},
+            secciones=secciones,
+        )
+        return con_validador(request, self.render_to_response(context), etag)
+    
+    def renderizar_secciones(self):
+        """Renderiza las secciones cacheables (sin datos del usuario ni CSRF)"""
+        ticket = self.get_object()
+        # Solo las últimas observaciones; las anteriores se piden por cursor
+        pagina = pagina_observaciones(ticket.pk)
+        context = {
+            'ticket': ticket,
+            'observaciones': pagina,
+            'observaciones_siguiente': pagina.cursor_siguiente,
+        }
+        return {
+            'codigo': ticket.codigo,
+            'total_observaciones': ticket.total_observaciones,
+            'cabecera': render_to_string('tickets/_ticket_cabecera.html', context),
+            'info': render_to_string('tickets/_ticket_info.html', context),
+            'timeline': render_to_string('tickets/_ticket_timeline.html', context),
+            'relaciones': render_to_string('tickets/_ticket_relaciones.html', context),
+        }
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['observaciones'] = self.object.observaciones.select_related('usuario').order_by('-fecha')
         context['form_observacion'] = ObservacionForm()
         return context
 
 
+def total_observaciones():
+    """Subconsulta COUNT(*) de observaciones por ticket, para annotate()"""
+    conteo = (
+        Observacion.objects.filter(ticket=OuterRef('pk'))
+        .order_by().values('ticket').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(conteo, output_field=IntegerField()), 0)
+
+
+def pagina_observaciones(ticket_id, cursor=None):
+    """Página del timeline ordenada por (fecha, id) descendente"""
+    return pagina_keyset(
+        Observacion.objects.filter(ticket_id=ticket_id).select_related('usuario'),
+        'fecha', descendente=True, despues=cursor,
+        por_pagina=TAMANO_PAGINA_OBSERVACIONES,
+    )
+
+
+@login_required
+def observaciones_ticket(request, pk):
+    """Observaciones más antiguas del timeline, como fragmento HTML por cursor"""
+    try:
+        pagina = pagina_observaciones(pk, request.GET.get('cursor'))
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    html = render_to_string('tickets/_observaciones.html', {'observaciones': pagina}, request)
+    return JsonResponse({'html': html, 'next': pagina.cursor_siguiente})
+
+
+@login_required
+def impacto_ticket(request, pk):
+    """
+    Análisis de impacto: todos los tickets bloqueados por el ticket, directa
+    o transitivamente, en una respuesta. ``tipo`` (repetible) elige los tipos
+    de relación a seguir y ``profundidad`` limita los niveles.
+    """
+    ticket = get_object_or_404(Ticket.objects.values('id', 'codigo', 'titulo'), pk=pk)
+    tipos = request.GET.getlist('tipo') or grafo.TIPOS_BLOQUEO
+    validos = {tipo for tipo, _ in RelacionTicket.TIPO_CHOICES}
+    if not set(tipos) <= validos:
+        return JsonResponse({'error': 'Tipo de relación no soportado'}, status=400)
+    profundidad = request.GET.get('profundidad')
+    if profundidad is not None:
+        if not profundidad.isdigit():
+            return JsonResponse({'error': 'Profundidad inválida'}, status=400)
+        profundidad = int(profundidad)
+
+    bloqueados, ciclos = grafo.impacto(pk, tipos, profundidad)
+    datos = {
+        fila['id']: fila for fila in Ticket.objects.filter(pk__in=bloqueados).order_by().values(
+            'id', 'codigo', 'titulo', 'prioridad', 'estado__nombre',
+        )
+    }
+    return JsonResponse({
+        'ticket': ticket,
+        'total': len(datos),
+        'bloqueados': [{
+            'id': ticket_id,
+            'codigo': datos[ticket_id]['codigo'],
+            'titulo': datos[ticket_id]['titulo'],
+            'prioridad': datos[ticket_id]['prioridad'],
+            'estado': datos[ticket_id]['estado__nombre'],
+            'profundidad': nivel,
+            'bloqueado_por': anterior,
+            'tipo': tipo,
+        } for ticket_id, (nivel, anterior, tipo) in bloqueados.items() if ticket_id in datos],
+        'ciclos': ciclos,
+    })
+
+
+LARGO_BORRADOR = 1000
+
+
+@login_required
+def duplicados_ticket(request):
+    """
+    Tickets abiertos parecidos al borrador (``titulo``, ``descripcion``) para
+    el formulario de alta; ``excluir`` omite el ticket en edición
+    """
+    titulo = request.GET.get('titulo', '').strip()[:LARGO_BORRADOR]
+    descripcion = request.GET.get('descripcion', '').strip()[:LARGO_BORRADOR]
+    excluir = request.GET.get('excluir', '')
+    if len(titulo) < 4:
+        return JsonResponse({'results': []})
+    sugerencias = sugerir_duplicados(titulo, descripcion, excluir=int(excluir) if excluir.isdigit() else None)
+    for sugerencia in sugerencias:
+        sugerencia['url'] = reverse('ticket_detail', args=[sugerencia['id']])
+    return JsonResponse({'results': sugerencias})
+
+
 class TicketCreateView(PuedeCrearMixin, LoginRequiredMixin, CreateView):
     """Crear nuevo ticket - Requiere rol: Super Admin, Administrador, Operador"""
     model = Ticket
@@ -174,3 +596,79 @@ def agregar_observacion(request, pk):
             messages.success(request, 'Observación agregada correctamente.')
     
     return redirect('ticket_detail', pk=pk)
+
+
+@csrf_exempt
+@login_required
+def subir_adjunto(request, pk):
+    """
+    Sube un adjunto al ticket. El manejador de subida se cambia antes de
+    leer el cuerpo, por eso el CSRF se valida en la vista interna. Bajo
+    ASGI Django ya leyó el cuerpo a un temporal: en producción esta ruta la
+    atienden workers WSGI (k8s/deployment-subidas.yaml).
+    """
+    request.upload_handlers = [adjuntos.AdjuntoUploadHandler(request)]
+    return _subir_adjunto(request, pk)
+
+
+@csrf_protect
+@puede_editar_tickets
+def _subir_adjunto(request, pk):
+    ticket = get_object_or_404(Ticket.objects.only('id'), pk=pk)
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        if request.upload_handlers[0].excedido:
+            messages.error(request, 'El archivo supera el tamaño máximo de '
+                           f'{filesizeformat(adjuntos.TAMANO_MAXIMO)}.')
+        elif archivo is None:
+            messages.error(request, 'Seleccione un archivo.')
+        else:
+            adjuntos.guardar_adjunto(ticket, archivo, request.usuario_id, request.POST.get('descripcion'))
+            messages.success(request, 'Archivo adjuntado correctamente.')
+    return redirect('ticket_detail', pk=pk)
+
+
+@login_required
+def descargar_adjunto(request, pk):
+    """Descarga un adjunto por bloques; admite un rango (Range / If-Range)"""
+    adjunto = get_object_or_404(
+        ArchivoAdjunto.objects.only('nombre_archivo', 'tipo_mime', 'ruta_almacenamiento'), pk=pk,
+    )
+    ruta = adjuntos.ruta_absoluta(adjunto.ruta_almacenamiento)
+    if ruta is None or not ruta.is_file():
+        raise Http404('Archivo no disponible')
+
+    # El contenido no cambia: el hash es un ETag fuerte
+    etag = f'"{ruta.name}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    tamano = ruta.stat().st_size
+    rango = None
+    if request.headers.get('If-Range', etag) == etag:
+        rango = adjuntos.parsear_rango(request.headers.get('Range'), tamano)
+    if rango is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamano}'
+        return response
+
+    archivo = open(ruta, 'rb')
+    opciones = {
+        'as_attachment': True,
+        'filename': adjunto.nombre_archivo,
+        'content_type': adjunto.tipo_mime or 'application/octet-stream',
+    }
+    if rango is None:
+        response = FileResponse(archivo, **opciones)
+    else:
+        inicio, fin = rango
+        archivo.seek(inicio)
+        response = FileResponse(adjuntos.TramoArchivo(archivo, fin - inicio + 1), status=206, **opciones)
+        response['Content-Length'] = fin - inicio + 1
+        response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    response.block_size = adjuntos.BLOQUE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return transmitir(request, response)